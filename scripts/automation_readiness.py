@@ -2,7 +2,7 @@
 """
 Check if automation criteria are met for V2 transition.
 
-Usage: python scripts/automation_readiness.py
+Usage: python scripts/automation_readiness.py [--rebuild]
 
 Criteria:
 1. >= 1,000 validated Bo2 pairs
@@ -10,16 +10,38 @@ Criteria:
 3. Override rate < 5% in last 100 items
 
 Output: Status report to stdout.
+
+Criteria 1 and 3 are read from materialized counters in
+metadata/human-approvals/readiness_counters.json, so the report is O(1):
+- validated_items / validated_pairs: Bo2 items whose latest decision has a human
+  choice and a passing Q-matrix alignment, and their count
+- recent_overrides: rolling window of the last 100 override flags
+- approvals_bytes: size of approvals.jsonl the counters reflect
+human_validate.py updates them with each decision (record_decision). If
+approvals.jsonl has changed size behind their back, or with --rebuild, they are
+rebuilt from the approvals log and the Bo2 log (merged lazily with the
+append-only decision overlay, see bo2_log.py). Both paths fold decisions in
+through fold_validated_pair, so a re-decided item counts once, by its latest
+decision, either way.
 """
 
+import argparse
 import json
+import os
 import sys
+from collections import deque
+from datetime import datetime, timezone
 from pathlib import Path
 
+sys.path.insert(0, str(Path(__file__).parent))
+from bo2_log import iter_bo2_entries
+
 ROOT = Path(__file__).parent.parent
-BO2_LOG_PATH = ROOT / "metadata" / "bo2-generation-logs" / "bo2_logs.jsonl"
 APPROVAL_LOG_PATH = ROOT / "metadata" / "human-approvals" / "approvals.jsonl"
 REWARD_MODEL_PATH = ROOT / "metadata" / "calibration" / "reward-model-metrics.json"
+COUNTERS_PATH = ROOT / "metadata" / "human-approvals" / "readiness_counters.json"
+
+OVERRIDE_WINDOW = 100
 
 
 def load_jsonl(path: Path) -> list[dict]:
@@ -38,16 +60,103 @@ def load_jsonl(path: Path) -> list[dict]:
     return entries
 
 
-def check_criterion_1() -> tuple[bool, int]:
+def is_validated_pair(decision: dict) -> bool:
+    """A decision that yields a validated Bo2 pair."""
+    return decision.get("human_choice") is not None and bool(decision.get("q_matrix_alignment_pass", False))
+
+
+def fold_validated_pair(validated: set, item_id: str, human_validation: dict):
+    """Apply an item's latest decision to the set of items with a validated Bo2 pair."""
+    if is_validated_pair(human_validation):
+        validated.add(item_id)
+    else:
+        validated.discard(item_id)
+
+
+def is_override(decision: dict) -> bool:
+    """A decision that overrides the pipeline (rejects both candidates)."""
+    return decision.get("rejection_reason") is not None
+
+
+def _approvals_size() -> int:
+    return APPROVAL_LOG_PATH.stat().st_size if APPROVAL_LOG_PATH.exists() else 0
+
+
+def save_counters(counters: dict):
+    """Atomically write the readiness counters."""
+    COUNTERS_PATH.parent.mkdir(parents=True, exist_ok=True)
+    counters["updated_at"] = datetime.now(timezone.utc).isoformat()
+    temp_path = COUNTERS_PATH.with_suffix(".tmp")
+    with open(temp_path, "w") as f:
+        json.dump(counters, f, indent=2)
+    os.replace(temp_path, COUNTERS_PATH)
+
+
+def rebuild_counters() -> dict:
+    """Recompute the counters from the Bo2 and approvals logs and save them."""
+    validated = set()
+    for entry in iter_bo2_entries():
+        if entry.get("log_type") == "Bo2_generation" and entry.get("item_id"):
+            fold_validated_pair(validated, entry["item_id"], entry.get("human_validation") or {})
+
+    approvals_bytes = _approvals_size()
+    recent = deque(maxlen=OVERRIDE_WINDOW)
+    for entry in load_jsonl(APPROVAL_LOG_PATH):
+        recent.append(int(is_override(entry.get("decision", {}))))
+
+    counters = {"validated_items": sorted(validated), "validated_pairs": len(validated),
+                "recent_overrides": list(recent), "approvals_bytes": approvals_bytes}
+    save_counters(counters)
+    return counters
+
+
+def load_counters(rebuild: bool = False) -> dict:
+    """Load the counters, rebuilding them if missing or stale."""
+    if not rebuild and COUNTERS_PATH.exists():
+        try:
+            with open(COUNTERS_PATH) as f:
+                counters = json.load(f)
+            if "validated_items" in counters and counters.get("approvals_bytes") == _approvals_size():
+                return counters
+        except (json.JSONDecodeError, OSError):
+            pass
+    return rebuild_counters()
+
+
+def record_decision(item_id: str, decision: dict, is_bo2: bool, approvals_start: int, approvals_end: int):
+    """Fold one human decision into the counters.
+
+    approvals_start/approvals_end are the byte range of the decision's line in
+    approvals.jsonl. If the counters don't end exactly at approvals_start, they
+    missed other writes and are rebuilt instead (which includes this decision).
+    Only Bo2 items count towards validated pairs, as in rebuild_counters.
+    """
+    counters = None
+    if COUNTERS_PATH.exists():
+        try:
+            with open(COUNTERS_PATH) as f:
+                counters = json.load(f)
+        except (json.JSONDecodeError, OSError):
+            counters = None
+    if counters is None or "validated_items" not in counters or counters.get("approvals_bytes") != approvals_start:
+        rebuild_counters()
+        return
+
+    if is_bo2:
+        validated = set(counters["validated_items"])
+        fold_validated_pair(validated, item_id, decision)
+        counters["validated_items"] = sorted(validated)
+        counters["validated_pairs"] = len(validated)
+    recent = deque(counters["recent_overrides"], maxlen=OVERRIDE_WINDOW)
+    recent.append(int(is_override(decision)))
+    counters["recent_overrides"] = list(recent)
+    counters["approvals_bytes"] = approvals_end
+    save_counters(counters)
+
+
+def check_criterion_1(counters: dict) -> tuple[bool, int]:
     """Check: >= 1,000 validated Bo2 pairs with q_matrix_alignment_pass."""
-    entries = load_jsonl(BO2_LOG_PATH)
-    validated_count = 0
-    for entry in entries:
-        if entry.get("log_type") != "Bo2_generation":
-            continue
-        hv = entry.get("human_validation", {})
-        if hv.get("human_choice") is not None and hv.get("q_matrix_alignment_pass", False):
-            validated_count += 1
+    validated_count = counters["validated_pairs"]
     return validated_count >= 1000, validated_count
 
 
@@ -61,32 +170,27 @@ def check_criterion_2() -> tuple[bool, float | None]:
     return agreement >= 0.85, agreement
 
 
-def check_criterion_3() -> tuple[bool, float]:
+def check_criterion_3(counters: dict) -> tuple[bool, float]:
     """Check: Override rate < 5% in last 100 items."""
-    entries = load_jsonl(APPROVAL_LOG_PATH)
-    if not entries:
-        return False, 0.0
-
-    recent = entries[-100:]
-    if len(recent) == 0:
+    recent = counters["recent_overrides"]
+    if not recent:
         return False, 0.0
 
-    overrides = 0
-    for entry in recent:
-        decision = entry.get("decision", {})
-        if decision.get("rejection_reason") is not None:
-            overrides += 1
-
-    rate = overrides / len(recent)
+    rate = sum(recent) / len(recent)
     return rate < 0.05, rate
 
 
 def main():
+    parser = argparse.ArgumentParser(description="Check automation readiness criteria")
+    parser.add_argument("--rebuild", action="store_true", help="Rebuild the readiness counters from the logs")
+    args = parser.parse_args()
+    counters = load_counters(rebuild=args.rebuild)
+
     print("=" * 60)
     print("PRISM V8 - Automation Readiness Report")
     print("=" * 60)
 
-    c1_pass, c1_count = check_criterion_1()
+    c1_pass, c1_count = check_criterion_1(counters)
     status1 = "PASS" if c1_pass else "FAIL"
     print(f"\n[{status1}] Criterion 1: Validated Bo2 pairs >= 1,000")
     print(f"       Current: {c1_count} / 1,000")
@@ -100,7 +204,7 @@ def main():
         print(f"\n[{status2}] Criterion 2: Reward model agreement >= 85%")
         print(f"       Current: {c2_agreement * 100:.1f}%")
 
-    c3_pass, c3_rate = check_criterion_3()
+    c3_pass, c3_rate = check_criterion_3(counters)
     status3 = "PASS" if c3_pass else "FAIL"
     print(f"\n[{status3}] Criterion 3: Override rate < 5% in last 100 items")
     print(f"       Current: {c3_rate * 100:.1f}%")
@@ -0,0 +1,102 @@
+#!/usr/bin/env python3
+"""
+Message-batch backends for the daily conversion scripts.
+
+The cron scripts are latency-insensitive, so with --batch they gather every
+request of a pipeline wave (all Stage 1 calls, then all Stage 2 calls, ...),
+submit them as one batch job, poll until it ends and fan the results back into
+the normal stage logic.
+
+BatchBackend is the interface; AnthropicBatchBackend implements it over the
+Message Batches API. To test without the real service, point the client at a
+local stand-in batch server with --batch-base-url.
+"""
+
+import abc
+import time
+from collections.abc import Callable
+
+MAX_BATCH_REQUESTS = 10000
+BATCH_POLL_SECONDS = 30
+MAX_BATCH_RETRIES = 3
+
+
+class BatchBackend(abc.ABC):
+    """Interface for submitting message batches and collecting their results."""
+
+    @abc.abstractmethod
+    def submit(self, requests: dict[str, dict]) -> str:
+        """Submit {custom_id: message params} and return a batch ID."""
+
+    @abc.abstractmethod
+    def is_done(self, batch_id: str) -> bool:
+        """Return True once every request in the batch has finished."""
+
+    @abc.abstractmethod
+    def results(self, batch_id: str) -> dict[str, tuple[str | None, object]]:
+        """Return {custom_id: (response text, usage)}, with None text for errored requests."""
+
+
+class AnthropicBatchBackend(BatchBackend):
+    """Backend for the Anthropic Message Batches API."""
+
+    def __init__(self, client):
+        self.client = client
+
+    def submit(self, requests: dict[str, dict]) -> str:
+        batch = self.client.messages.batches.create(requests=[
+            {"custom_id": custom_id, "params": params} for custom_id, params in requests.items()
+        ])
+        return batch.id
+
+    def is_done(self, batch_id: str) -> bool:
+        return self.client.messages.batches.retrieve(batch_id).processing_status == "ended"
+
+    def results(self, batch_id: str) -> dict[str, tuple[str | None, object]]:
+        results = {}
+        for entry in self.client.messages.batches.results(batch_id):
+            if entry.result.type == "succeeded":
+                message = entry.result.message
+                results[entry.custom_id] = (message.content[0].text, message.usage)
+            else:
+                results[entry.custom_id] = (None, None)
+        return results
+
+
+def run_batch(backend: BatchBackend, requests: dict[str, dict],
+              poll_seconds: float = BATCH_POLL_SECONDS,
+              on_result: Callable[[str, str | None, object], None] | None = None) -> dict[str, str | None]:
+    """Submit requests in size-bounded batches, wait for them and collect results.
+
+    Errored requests are resubmitted up to MAX_BATCH_RETRIES times; any still
+    failing map to None, like call_api after exhausting its retries. Each
+    result's (custom_id, text, usage) is passed to on_result if given.
+    """
+    results = {}
+    pending = dict(requests)
+    for attempt in range(MAX_BATCH_RETRIES + 1):
+        if not pending:
+            break
+        if attempt:
+            print(f"  Batch retry {attempt}/{MAX_BATCH_RETRIES}: {len(pending)} errored request(s)")
+        ids = list(pending)
+        batch_ids = []
+        for start in range(0, len(ids), MAX_BATCH_REQUESTS):
+            chunk = {custom_id: pending[custom_id] for custom_id in ids[start:start + MAX_BATCH_REQUESTS]}
+            batch_id = backend.submit(chunk)
+            print(f"  Submitted batch {batch_id} ({len(chunk)} request(s))")
+            batch_ids.append(batch_id)
+
+        for batch_id in batch_ids:
+            while not backend.is_done(batch_id):
+                time.sleep(poll_seconds)
+            for custom_id, (text, usage) in backend.results(batch_id).items():
+                results[custom_id] = text
+                if on_result:
+                    on_result(custom_id, text, usage)
+
+        pending = {custom_id: pending[custom_id] for custom_id in ids if results.get(custom_id) is None}
+
+    for custom_id in requests:
+        results.setdefault(custom_id, None)
+    return results
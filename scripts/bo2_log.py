@@ -0,0 +1,181 @@
+#!/usr/bin/env python3
+"""
+Bo2 generation log with an append-only human-decision overlay.
+
+Usage: python scripts/bo2_log.py compact
+       python scripts/bo2_log.py status
+
+run_eqjs_to_ainative.py appends generation entries to
+metadata/bo2-generation-logs/bo2_logs.jsonl. Human decisions are not patched
+into that file; human_validate.py appends one line per decision to
+human_decisions.jsonl next to it ({item_id, human_validation, rlvr_triple}),
+so a decision costs one append however large the log grows.
+
+Readers (convert_bo2_to_dpo.py, automation_readiness.py) stream the base log
+through iter_bo2_entries(), which overlays the latest decision per item_id.
+
+`compact` folds the overlay back into bo2_logs.jsonl: the overlay is first
+renamed to human_decisions.compacting.jsonl (new decisions go to a fresh
+overlay meanwhile), the merged log is written to a temp file and swapped in
+with os.replace, and only then is the renamed overlay removed. An interrupted
+compaction is finished by the next one; readers merge both overlay files.
+Run it between conversion runs, as it rewrites bo2_logs.jsonl.
+"""
+
+import argparse
+import json
+import os
+from datetime import datetime, timezone
+from pathlib import Path
+
+ROOT = Path(__file__).parent.parent
+BO2_LOG_DIR = ROOT / "metadata" / "bo2-generation-logs"
+BO2_LOG_PATH = BO2_LOG_DIR / "bo2_logs.jsonl"
+DECISIONS_PATH = BO2_LOG_DIR / "human_decisions.jsonl"
+COMPACTING_PATH = BO2_LOG_DIR / "human_decisions.compacting.jsonl"
+
+
+def _iter_jsonl(path: Path):
+    """Yield the parsed lines of a JSONL file, skipping blank or torn lines."""
+    if not path.exists():
+        return
+    with open(path) as f:
+        for line in f:
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                yield json.loads(line)
+            except json.JSONDecodeError:
+                continue
+
+
+def iter_log_from(offset: int = 0):
+    """Yield (offset, next_offset, entry) for Bo2 log lines from a byte offset.
+
+    Stops before a trailing line that is still being written (no newline yet).
+    """
+    if not BO2_LOG_PATH.exists():
+        return
+    with open(BO2_LOG_PATH, "rb") as f:
+        f.seek(offset)
+        while True:
+            line = f.readline()
+            if not line.endswith(b"\n"):
+                return
+            next_offset = offset + len(line)
+            if line.strip():
+                try:
+                    yield offset, next_offset, json.loads(line)
+                except json.JSONDecodeError:
+                    pass
+            offset = next_offset
+
+
+def read_entry_at(offset: int) -> dict | None:
+    """Read the Bo2 log entry that starts at a byte offset."""
+    with open(BO2_LOG_PATH, "rb") as f:
+        f.seek(offset)
+        try:
+            return json.loads(f.readline())
+        except json.JSONDecodeError:
+            return None
+
+
+def append_decision(item_id: str, human_validation: dict, rlvr_triple: dict | None = None):
+    """Append one human decision to the overlay."""
+    BO2_LOG_DIR.mkdir(parents=True, exist_ok=True)
+    record = {
+        "item_id": item_id,
+        "human_validation": human_validation,
+        "rlvr_triple": rlvr_triple,
+        "recorded_at": datetime.now(timezone.utc).isoformat(),
+    }
+    line = (json.dumps(record) + "\n").encode()
+    fd = os.open(DECISIONS_PATH, os.O_RDWR | os.O_APPEND | os.O_CREAT, 0o644)
+    try:
+        size = os.fstat(fd).st_size
+        if size and os.pread(fd, 1, size - 1) != b"\n":
+            # Terminate a line torn by an interrupted write so it can't swallow this one.
+            line = b"\n" + line
+        os.write(fd, line)
+        os.fsync(fd)
+    finally:
+        os.close(fd)
+
+
+def load_decisions() -> dict[str, dict]:
+    """Latest overlay decision per item_id (a half-finished compaction's first)."""
+    decisions = {}
+    for path in (COMPACTING_PATH, DECISIONS_PATH):
+        for record in _iter_jsonl(path):
+            if record.get("item_id"):
+                decisions[record["item_id"]] = record
+    return decisions
+
+
+def apply_decision(entry: dict, decision: dict) -> dict:
+    """Return a copy of a log entry with a decision folded in."""
+    merged = dict(entry)
+    merged["human_validation"] = decision["human_validation"]
+    if decision.get("rlvr_triple"):
+        merged["rlvr_triple"] = decision["rlvr_triple"]
+    return merged
+
+
+def iter_bo2_entries(decisions: dict[str, dict] | None = None):
+    """Stream Bo2 log entries with the decision overlay merged in."""
+    if decisions is None:
+        decisions = load_decisions()
+    for entry in _iter_jsonl(BO2_LOG_PATH):
+        decision = decisions.get(entry.get("item_id"))
+        yield apply_decision(entry, decision) if decision else entry
+
+
+def compact() -> dict:
+    """Fold the decision overlay into bo2_logs.jsonl atomically. Returns counts."""
+    if DECISIONS_PATH.exists() and not COMPACTING_PATH.exists():
+        os.replace(DECISIONS_PATH, COMPACTING_PATH)
+    decisions = {}
+    for record in _iter_jsonl(COMPACTING_PATH):
+        if record.get("item_id"):
+            decisions[record["item_id"]] = record
+    counts = {"decisions": len(decisions), "entries": 0, "updated": 0}
+    if not decisions:
+        COMPACTING_PATH.unlink(missing_ok=True)
+        return counts
+
+    if BO2_LOG_PATH.exists():
+        temp_path = BO2_LOG_PATH.with_name(f".{BO2_LOG_PATH.name}.{os.getpid()}.tmp")
+        with open(temp_path, "w") as f:
+            for entry in _iter_jsonl(BO2_LOG_PATH):
+                counts["entries"] += 1
+                decision = decisions.get(entry.get("item_id"))
+                if decision:
+                    entry = apply_decision(entry, decision)
+                    counts["updated"] += 1
+                f.write(json.dumps(entry) + "\n")
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(temp_path, BO2_LOG_PATH)
+    COMPACTING_PATH.unlink()
+    return counts
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Bo2 log decision overlay")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    subparsers.add_parser("compact", help="Fold human decisions into bo2_logs.jsonl")
+    subparsers.add_parser("status", help="Show pending overlay size")
+    args = parser.parse_args()
+
+    if args.command == "compact":
+        counts = compact()
+        print(f"Compacted {counts['decisions']} decision(s) into {counts['entries']} log entries "
+              f"({counts['updated']} updated)")
+    else:
+        print(f"Pending decisions in overlay: {len(load_decisions())}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,718 @@
+#!/usr/bin/env python3
+"""
+MML-EM item calibration for GPCM and NRM items (V8 manual §6.1 Phases B/C).
+
+Usage: python scripts/calibrate_items.py [--sessions GLOB] [--responses FILE.jsonl]
+                                         [--workers N] [--output-dir DIR] [--dry-run]
+       python scripts/calibrate_items.py --simulate ITEMS STUDENTS [--items-per-student K]
+
+Responses are read from the §8.1 session logs in metadata/diagnostic-sessions/
+(T1 item + T1T2 joint score 0-3, T3/T4 items + maps_to category; routing_LoK
+carries no NRM response) and/or a JSONL file of
+{"student_id", "item_id", "response", "tier"?, "concept_id"?}.
+
+Bock-Aitkin marginal maximum likelihood on the 40-point grid of eap_scoring.py,
+with θ ~ N(0, 1) fixing the scale:
+- E-step (vectorised): log-likelihood rows of every response are summed per
+  student, giving each student's posterior over the grid; posteriors are then
+  summed per (item, category) into expected counts R[k, q].
+- M-step (one task per item, ProcessPoolExecutor): Newton-Raphson on
+  Σ R[k,q] log P_k(θ_q). Both models are multinomial logits that are linear
+  in their free parameters, so the objective is concave:
+    GPCM  logit_k = a·k·θ - c_k         (α = a, β and d_steps recovered from c)
+    NRM   logit_k = a_k θ + c_k         (a, c centred to sum to zero)
+  A weak normal prior (sd PRIOR_SD, slopes centred on 1 for GPCM) keeps items
+  with sparse or degenerate categories finite.
+An NRM item's categories are its pathway's maps_to values (and any already in
+its §8.2 record), not only those observed, so the record covers every option
+a student can pick. A category nobody has chosen yet enters the M-step with
+zero counts: its parameters rest on the prior alone, and the record lists it
+under unobserved_categories.
+EM stops when no parameter moves more than --tolerance or at --max-iter.
+
+Items with fewer than MIN_RESPONSES responses are not estimated; they enter
+the E-step at their current parameters (§8.2 record, else cold-start LLTM).
+Estimated items are labelled B_online (< OPERATIONAL_RESPONSES) or
+C_operational and written to metadata/calibration/item-params/{item_id}.json
+in the §8.2 shape, keeping any other sections already in the record. Standard
+errors come from the M-step information at convergence (delta method for
+β/d_steps). Fit statistics compare each response with its category
+probabilities predicted from the student's other responses: infit/outfit MNSQ
+and an RMSEA over deciles of that rest-score EAP θ (adjacent deciles are merged
+until every category expects MIN_EXPECTED_COUNT responses, so a thin item
+isn't judged on a handful of responses per bin). Poor fit (infit > 1.3, or
+RMSEA > 0.05 once an item has OPERATIONAL_RESPONSES responses) and
+|β - LLTM β| > 1.5 are reported and flagged in the record.
+
+--simulate generates a synthetic cohort and reports timing and parameter
+recovery (records are only written with --output-dir).
+
+Requires numpy (see eap_scoring.py).
+"""
+
+import argparse
+import json
+import os
+import sys
+import time
+from collections import defaultdict
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime, timezone
+from functools import lru_cache
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent))
+from eap_scoring import GRID, GRID_POINTS, ROUTING_LOK, gpcm_table, nrm_table
+from calibration_io import add_cohort_arguments, iter_jsonl, load_sessions, write_record
+
+import numpy as np
+
+ROOT = Path(__file__).parent.parent
+ITEM_PARAMS_DIR = ROOT / "metadata" / "calibration" / "item-params"
+AINATIVE_DIR = ROOT / "ai-native"
+
+MIN_RESPONSES = 50
+OPERATIONAL_RESPONSES = 200
+DEFAULT_MAX_ITER = 500
+DEFAULT_TOLERANCE = 1e-4
+NEWTON_MAX_ITER = 25
+NEWTON_TOLERANCE = 1e-6
+PRIOR_SD = 2.0
+MIN_GPCM_SLOPE = 0.05
+LLTM_DEVIATION_LIMIT = 1.5
+RMSEA_LIMIT = 0.05
+INFIT_LIMIT = 1.3
+FIT_BINS = 10
+MIN_EXPECTED_COUNT = 5  # per category, in every RMSEA bin
+CHUNK_RESPONSES = 200_000
+GPCM_CATEGORIES = [0, 1, 2, 3]
+DEFAULT_D_STEPS = [-0.5, 0.0, 0.5]
+
+THETA_PRIOR = np.exp(-0.5 * GRID ** 2)
+THETA_PRIOR /= THETA_PRIOR.sum()
+LOG_THETA_PRIOR = np.log(THETA_PRIOR)
+
+
+# ═══════════════════════════════════════════════════════════════
+# MODELS (free parameter vector w <-> §8.2 parameters)
+# ═══════════════════════════════════════════════════════════════
+
+def design_at(model: str, n_categories: int, theta: np.ndarray) -> np.ndarray:
+    """Design tensor X (categories, len(theta), free params): logits = X @ w."""
+    k = n_categories
+    theta = np.asarray(theta, dtype=float)
+    if model == "GPCM":
+        x = np.zeros((k, len(theta), k))
+        for cat in range(1, k):
+            x[cat, :, 0] = cat * theta
+            x[cat, :, cat] = -1.0
+        return x
+    # Effect coding: category slopes/intercepts sum to zero
+    contrast = np.vstack([np.eye(k - 1), -np.ones(k - 1)])
+    x = np.zeros((k, len(theta), 2 * (k - 1)))
+    x[:, :, :k - 1] = contrast[:, None, :] * theta[None, :, None]
+    x[:, :, k - 1:] = contrast[:, None, :]
+    return x
+
+
+@lru_cache(maxsize=None)
+def design(model: str, n_categories: int) -> np.ndarray:
+    """Design tensor on the quadrature grid."""
+    return design_at(model, n_categories, GRID)
+
+
+def prior_mean(model: str, n_categories: int) -> np.ndarray:
+    mean = np.zeros(design(model, n_categories).shape[2])
+    if model == "GPCM":
+        mean[0] = 1.0
+    return mean
+
+
+def log_probs(model: str, n_categories: int, w: np.ndarray) -> np.ndarray:
+    """Log category probabilities on the grid, shape (categories, grid points)."""
+    logits = design(model, n_categories) @ w
+    logits -= logits.max(axis=0)
+    return logits - np.log(np.exp(logits).sum(axis=0))
+
+
+def gpcm_to_w(alpha: float, beta: float, d_steps: list[float]) -> np.ndarray:
+    b = beta - np.asarray(d_steps, dtype=float)
+    return np.concatenate([[alpha], np.cumsum(alpha * b)])
+
+
+def gpcm_from_w(w: np.ndarray) -> np.ndarray:
+    """(alpha, beta, d_1..d_{K-1}) from w = (a, c_1..c_{K-1})."""
+    alpha = w[0]
+    b = np.diff(np.concatenate([[0.0], w[1:]])) / alpha
+    beta = b.mean()
+    return np.concatenate([[alpha, beta], beta - b])
+
+
+def nrm_to_w(slopes: list[float], intercepts: list[float]) -> np.ndarray:
+    a = np.asarray(slopes, dtype=float)
+    c = np.asarray(intercepts, dtype=float)
+    return np.concatenate([(a - a.mean())[:-1], (c - c.mean())[:-1]])
+
+
+def nrm_from_w(w: np.ndarray) -> np.ndarray:
+    """(a_1..a_K, c_1..c_K) from the effect-coded w."""
+    half = len(w) // 2
+    a, c = w[:half], w[half:]
+    return np.concatenate([a, [-a.sum()], c, [-c.sum()]])
+
+
+def natural_params(model: str, w: np.ndarray) -> np.ndarray:
+    return gpcm_from_w(w) if model == "GPCM" else nrm_from_w(w)
+
+
+# ═══════════════════════════════════════════════════════════════
+# M-STEP (runs in worker processes)
+# ═══════════════════════════════════════════════════════════════
+
+def _objective(x: np.ndarray, counts: np.ndarray, w: np.ndarray, mean: np.ndarray) -> float:
+    logits = x @ w
+    logits -= logits.max(axis=0)
+    logp = logits - np.log(np.exp(logits).sum(axis=0))
+    return float((counts * logp).sum() - 0.5 * ((w - mean) ** 2).sum() / PRIOR_SD ** 2)
+
+
+def _gradient_hessian(x: np.ndarray, counts: np.ndarray, w: np.ndarray, mean: np.ndarray):
+    logits = x @ w
+    logits -= logits.max(axis=0)
+    p = np.exp(logits)
+    p /= p.sum(axis=0)
+    n_q = counts.sum(axis=0)
+    n_params = x.shape[2]
+    x_flat = x.reshape(-1, n_params)
+    x_bar = np.einsum("kq,kqp->qp", p, x)
+    grad = (counts - n_q * p).reshape(-1) @ x_flat - (w - mean) / PRIOR_SD ** 2
+    weighted = (n_q * p).reshape(-1, 1) * x_flat
+    second = weighted.T @ x_flat - (n_q[:, None] * x_bar).T @ x_bar
+    hessian = -second - np.eye(len(w)) / PRIOR_SD ** 2
+    return grad, hessian
+
+
+def newton_fit(x: np.ndarray, counts: np.ndarray, w: np.ndarray, mean: np.ndarray,
+               min_slope: float | None = None) -> np.ndarray:
+    """Maximise Σ counts·log P for a multinomial logit with logits = x @ w.
+
+    x: (categories, nodes, params); counts: (categories, nodes). With min_slope,
+    w[0] is kept at or above it. Returns the fitted w.
+    """
+    w = w.copy()
+    current = _objective(x, counts, w, mean)
+    for _ in range(NEWTON_MAX_ITER):
+        grad, hessian = _gradient_hessian(x, counts, w, mean)
+        step = np.linalg.solve(hessian, -grad)
+        scale = 1.0
+        while True:
+            candidate = w + scale * step
+            if min_slope is not None:
+                candidate[0] = max(candidate[0], min_slope)
+            value = _objective(x, counts, candidate, mean)
+            if value >= current - 1e-12 or scale < 1e-4:
+                break
+            scale /= 2
+        moved = np.abs(candidate - w).max()
+        w, current = candidate, value
+        if moved < NEWTON_TOLERANCE:
+            break
+    return w
+
+
+def parameter_covariance(x: np.ndarray, counts: np.ndarray, w: np.ndarray, mean: np.ndarray) -> np.ndarray:
+    """Inverse of the (penalised) information at w."""
+    _, hessian = _gradient_hessian(x, counts, w, mean)
+    return np.linalg.inv(-hessian)
+
+
+def m_step(task: tuple) -> tuple[np.ndarray, np.ndarray, np.ndarray | None]:
+    """Maximise one item's expected log-likelihood.
+
+    task = (model, n_categories, w, counts[, want_cov]).
+    Returns (w, log probability table, covariance of w or None).
+    """
+    model, n_categories, w, counts, *rest = task
+    want_cov = bool(rest and rest[0])
+    x = design(model, n_categories)
+    mean = prior_mean(model, n_categories)
+    w = newton_fit(x, counts, w, mean, MIN_GPCM_SLOPE if model == "GPCM" else None)
+    cov = parameter_covariance(x, counts, w, mean) if want_cov else None
+    return w, log_probs(model, n_categories, w), cov
+
+
+# ═══════════════════════════════════════════════════════════════
+# RESPONSE DATA
+# ═══════════════════════════════════════════════════════════════
+
+class ResponseData:
+    """Long-format responses indexed for the vectorised E-step."""
+
+    def __init__(self):
+        self.items = {}  # item_id -> {"model", "categories", "tier", "concept_id"}
+        self._students = {}
+        self._triples = []  # (student index, item_id, category)
+
+    def add(self, student_id: str, item_id: str, category, tier: str | None = None,
+            concept_id: str | None = None):
+        if category is None or category == ROUTING_LOK:
+            return
+        model = "GPCM" if tier in (None, "T1", "T1T2") and isinstance(category, int) else "NRM"
+        spec = self.items.setdefault(item_id, {"model": model, "categories": [], "tier": tier,
+                                               "concept_id": concept_id})
+        if spec["model"] == "GPCM":
+            spec["categories"] = GPCM_CATEGORIES
+        elif category not in spec["categories"]:
+            spec["categories"].append(category)
+        student = self._students.setdefault(student_id, len(self._students))
+        self._triples.append((student, item_id, category))
+
+    def add_session(self, record: dict):
+        cascade = record.get("cascade", {})
+        student, concept = record.get("student_id"), record.get("concept_id")
+        if cascade.get("T1_item_id"):
+            self.add(student, cascade["T1_item_id"], cascade.get("T1T2_joint_score"), "T1", concept)
+        for tier in ("T3", "T4"):
+            if cascade.get(f"{tier}_item_id"):
+                self.add(student, cascade[f"{tier}_item_id"], cascade.get(f"{tier}_maps_to"), tier, concept)
+
+    def seed_categories(self, categories: dict[str, list]):
+        """Give NRM items every category they can take, not only those observed so far."""
+        for item_id, spec in self.items.items():
+            known = [c for c in categories.get(item_id, []) if c != ROUTING_LOK]
+            if spec["model"] == "NRM" and known:
+                spec["categories"] = known + [c for c in spec["categories"] if c not in known]
+
+    @property
+    def n_students(self) -> int:
+        return len(self._students)
+
+    def arrays(self, item_ids: list[str]):
+        """(student, item index, category index) int arrays for the given item order."""
+        item_index = {item_id: i for i, item_id in enumerate(item_ids)}
+        category_index = {item_id: {c: k for k, c in enumerate(self.items[item_id]["categories"])}
+                          for item_id in item_ids}
+        students = np.fromiter((s for s, _, _ in self._triples), dtype=np.int64, count=len(self._triples))
+        items = np.fromiter((item_index[i] for _, i, _ in self._triples), dtype=np.int64,
+                            count=len(self._triples))
+        categories = np.fromiter((category_index[i][c] for _, i, c in self._triples), dtype=np.int64,
+                                 count=len(self._triples))
+        return students, items, categories
+
+
+def load_response_file(data: ResponseData, path: Path):
+    for r in iter_jsonl(path):
+        data.add(r["student_id"], r["item_id"], r["response"], r.get("tier"), r.get("concept_id"))
+
+
+# ═══════════════════════════════════════════════════════════════
+# START VALUES
+# ═══════════════════════════════════════════════════════════════
+
+def load_records(item_params_dir: Path = ITEM_PARAMS_DIR) -> dict[str, dict]:
+    records = {}
+    if item_params_dir.exists():
+        for path in sorted(item_params_dir.glob("*.json")):
+            with open(path) as f:
+                record = json.load(f)
+            records[record["item_id"]] = record
+    return records
+
+
+def load_lltm_params(ainative_dir: Path = AINATIVE_DIR) -> dict[str, dict]:
+    """Cold-start GPCM parameters per T1 item from ai-native calibration_config."""
+    params = {}
+    for path in sorted(ainative_dir.glob("*/*_ainative.json")):
+        with open(path) as f:
+            data = json.load(f)
+        lltm = data.get("calibration_config", {}).get("lltm_predicted_params")
+        if data.get("source_eqjs_id") and lltm:
+            params[data["source_eqjs_id"]] = lltm
+    return params
+
+
+def load_nrm_categories(ainative_dir: Path = AINATIVE_DIR, records: dict | None = None) -> dict[str, list]:
+    """Categories of every T3/T4 item: its pathway's maps_to values, then any in its §8.2 record."""
+    categories = defaultdict(list)
+    for path in sorted(ainative_dir.glob("*/*_ainative.json")):
+        with open(path) as f:
+            data = json.load(f)
+        candidates = data.get("candidates", {})
+        pathway = candidates.get(f"pathway_{candidates.get('selected_candidate') or 'A'}", {})
+        for tier, key in (("T3", "T3_probe"), ("T4", "T4_transfer")):
+            options = (pathway.get(key) or {}).get("options", {})
+            maps_to = [o.get("maps_to") for o in options.values()]
+            categories[f"{data.get('source_eqjs_id')}_{tier}"] = [c for c in dict.fromkeys(maps_to)
+                                                                 if c and c != ROUTING_LOK]
+    for item_id, record in (records or {}).items():
+        for c in record.get("parameters", {}).get("category_slopes", {}):
+            if c not in categories[item_id]:
+                categories[item_id].append(c)
+    return dict(categories)
+
+
+def start_w(spec: dict, record: dict | None, lltm: dict | None) -> np.ndarray:
+    """Initial free parameters from a §8.2 record, the LLTM prediction or defaults."""
+    params = (record or {}).get("parameters", {})
+    categories = spec["categories"]
+    if spec["model"] == "GPCM":
+        source = params if params.get("model", "GPCM") == "GPCM" and "alpha" in params else lltm
+        source = source or {"alpha": 1.0, "beta": 0.0, "d_steps": DEFAULT_D_STEPS}
+        return gpcm_to_w(source["alpha"], source["beta"], source["d_steps"])
+    slopes = params.get("category_slopes", {})
+    intercepts = params.get("category_intercepts", {})
+    return nrm_to_w([slopes.get(c, 1.0 if c == "Mastery" else -0.5) for c in categories],
+                    [intercepts.get(c, 0.0) for c in categories])
+
+
+# ═══════════════════════════════════════════════════════════════
+# EM
+# ═══════════════════════════════════════════════════════════════
+
+def _segment_sums(values_for, order: np.ndarray, keys: np.ndarray, out: np.ndarray):
+    """out[key] += Σ values over responses, in chunks of responses sorted by key."""
+    for start in range(0, len(order), CHUNK_RESPONSES):
+        chunk = order[start:start + CHUNK_RESPONSES]
+        chunk_keys = keys[chunk]
+        boundaries = np.flatnonzero(np.diff(chunk_keys)) + 1
+        starts = np.concatenate([[0], boundaries])
+        out[chunk_keys[starts]] += np.add.reduceat(values_for(chunk), starts, axis=0)
+
+
+class Calibrator:
+    """Bock-Aitkin MML-EM over a ResponseData set."""
+
+    def __init__(self, data: ResponseData, records: dict, lltm: dict, workers: int | None = None):
+        self.data = data
+        self.item_ids = sorted(data.items)
+        self.specs = [data.items[i] for i in self.item_ids]
+        self.records = records
+        self.lltm = lltm
+        self.workers = workers
+        self.students, item_idx, category_idx = data.arrays(self.item_ids)
+
+        sizes = np.array([len(s["categories"]) for s in self.specs])
+        self.offsets = np.concatenate([[0], np.cumsum(sizes)[:-1]])
+        self.rows = self.offsets[item_idx] + category_idx
+        self.n_responses = np.bincount(item_idx, minlength=len(self.item_ids))
+        self.free = self.n_responses >= MIN_RESPONSES
+        self.by_student = np.argsort(self.students, kind="stable")
+        self.by_row = np.argsort(self.rows, kind="stable")
+        self.n_rows = int(sizes.sum())
+        self.row_counts = np.bincount(self.rows.astype(np.int64), minlength=self.n_rows)
+
+        self.w = [start_w(s, records.get(i), lltm.get(i)) for i, s in zip(self.item_ids, self.specs)]
+        self.log_table = np.vstack([log_probs(s["model"], len(s["categories"]), w)
+                                    for s, w in zip(self.specs, self.w)])
+        self.cov = [None] * len(self.item_ids)
+        self.posterior = None
+        self.log_likelihood = None
+        self.iterations = 0
+
+    def e_step(self) -> np.ndarray:
+        """Student posteriors (students, grid) and expected counts (table rows, grid)."""
+        loglik = np.zeros((self.data.n_students, GRID_POINTS))
+        _segment_sums(lambda chunk: self.log_table[self.rows[chunk]], self.by_student, self.students, loglik)
+        loglik += LOG_THETA_PRIOR
+        top = loglik.max(axis=1, keepdims=True)
+        posterior = np.exp(loglik - top)
+        marginal = posterior.sum(axis=1, keepdims=True)
+        posterior /= marginal
+        self.posterior = posterior
+        self.log_likelihood = float((np.log(marginal) + top).sum())
+
+        counts = np.zeros((self.n_rows, GRID_POINTS))
+        _segment_sums(lambda chunk: posterior[self.students[chunk]], self.by_row, self.rows, counts)
+        return counts
+
+    def _tasks(self, counts: np.ndarray, want_cov: bool = False):
+        for i in np.flatnonzero(self.free):
+            spec = self.specs[i]
+            k = len(spec["categories"])
+            start = self.offsets[i]
+            yield i, (spec["model"], k, self.w[i], counts[start:start + k], want_cov)
+
+    def run(self, max_iter: int = DEFAULT_MAX_ITER, tolerance: float = DEFAULT_TOLERANCE,
+            verbose: bool = True) -> bool:
+        """Iterate EM to convergence. Returns True if converged."""
+        if not self.free.any():
+            self.e_step()
+            return True
+        n_free = int(self.free.sum())
+        chunksize = max(1, n_free // ((self.workers or os.cpu_count() or 1) * 4))
+        with ProcessPoolExecutor(max_workers=self.workers) as pool:
+            for iteration in range(1, max_iter + 1):
+                counts = self.e_step()
+                indices, tasks = zip(*self._tasks(counts))
+                moved = 0.0
+                for i, (w, table, _cov) in zip(indices, pool.map(m_step, tasks, chunksize=chunksize)):
+                    moved = max(moved, float(np.abs(w - self.w[i]).max()))
+                    self.w[i] = w
+                    self.log_table[self.offsets[i]:self.offsets[i] + len(table)] = table
+                self.iterations = iteration
+                if verbose and (iteration == 1 or iteration % 10 == 0):
+                    print(f"  EM iteration {iteration}: log-likelihood {self.log_likelihood:.2f}, "
+                          f"max change {moved:.5f}")
+                if moved < tolerance:
+                    break
+
+            counts = self.e_step()
+            indices, tasks = zip(*self._tasks(counts, want_cov=True))
+            for i, (_w, _table, cov) in zip(indices, pool.map(m_step, tasks, chunksize=chunksize)):
+                self.cov[i] = cov
+        return moved < tolerance
+
+    # ─── Output ───
+
+    def standard_errors(self, i: int) -> np.ndarray:
+        """Delta-method SEs of the natural parameters of item i."""
+        model, w, cov = self.specs[i]["model"], self.w[i], self.cov[i]
+        base = natural_params(model, w)
+        jacobian = np.empty((len(base), len(w)))
+        for j in range(len(w)):
+            step = np.zeros_like(w)
+            step[j] = 1e-6
+            jacobian[:, j] = (natural_params(model, w + step) - base) / 1e-6
+        return np.sqrt(np.clip(np.einsum("ij,jk,ik->i", jacobian, cov, jacobian), 0, None))
+
+    def fit_statistics(self, i: int) -> dict:
+        """Infit/outfit MNSQ and RMSEA over rest-score θ deciles for item i."""
+        spec = self.specs[i]
+        start, k = self.offsets[i], len(spec["categories"])
+        mask = self.rows[self.by_row] - start
+        responses = self.by_row[(mask >= 0) & (mask < k)]
+        observed = self.rows[responses] - start
+        # Posterior predictive from the student's other responses (this one divided out),
+        # so the item's own response can't pull the expectation or the θ bin towards itself
+        table = np.exp(self.log_table[start:start + k])
+        rest = self.posterior[self.students[responses]] / table[observed]
+        rest /= rest.sum(axis=1, keepdims=True)
+        probs = rest @ table.T
+        q = rest @ GRID
+
+        if spec["model"] == "GPCM":
+            scores = np.arange(k)
+            expected = probs @ scores
+            variance = probs @ scores ** 2 - expected ** 2
+            residual = (observed - expected) ** 2
+        else:
+            indicator = np.eye(k)[observed]
+            residual = ((indicator - probs) ** 2).sum(axis=1)
+            variance = 1 - (probs ** 2).sum(axis=1)
+        variance = np.maximum(variance, 1e-9)
+        outfit = float((residual / variance).mean())
+        infit = float(residual.sum() / variance.sum())
+
+        bins = np.minimum((np.argsort(np.argsort(q, kind="stable")) * FIT_BINS) // len(q), FIT_BINS - 1)
+        exp_bins = np.zeros((FIT_BINS, k))
+        obs_bins = np.zeros((FIT_BINS, k))
+        np.add.at(exp_bins, bins, probs)
+        np.add.at(obs_bins, (bins, observed), 1)
+        # Merge adjacent deciles until each category's expected count reaches MIN_EXPECTED_COUNT;
+        # a short tail is folded into the last merged bin
+        groups, exp_run, obs_run = [], np.zeros(k), np.zeros(k)
+        for b in range(FIT_BINS):
+            exp_run, obs_run = exp_run + exp_bins[b], obs_run + obs_bins[b]
+            if exp_run.min() >= MIN_EXPECTED_COUNT:
+                groups.append((exp_run, obs_run))
+                exp_run, obs_run = np.zeros(k), np.zeros(k)
+        if exp_run.any():
+            if groups:
+                groups[-1] = (groups[-1][0] + exp_run, groups[-1][1] + obs_run)
+            else:
+                groups.append((exp_run, obs_run))
+        chi2 = sum(float(((o - e) ** 2 / np.maximum(e, 1e-9)).sum()) for e, o in groups)
+        df = len(groups) * (k - 1) - len(self.w[i])
+        # Too few merged bins to leave any degrees of freedom: no RMSEA
+        rmsea = round(float(np.sqrt(max(chi2 - df, 0.0) / (df * max(len(q) - 1, 1)))), 4) if df > 0 else None
+        return {"RMSEA": rmsea, "infit_MNSQ": round(infit, 4), "outfit_MNSQ": round(outfit, 4)}
+
+    def records_out(self) -> list[dict]:
+        """§8.2 records for every estimated item."""
+        now = datetime.now(timezone.utc).isoformat()
+        out = []
+        for i in np.flatnonzero(self.free):
+            item_id, spec = self.item_ids[i], self.specs[i]
+            values = natural_params(spec["model"], self.w[i])
+            se = self.standard_errors(i)
+            categories = spec["categories"]
+            if spec["model"] == "GPCM":
+                parameters = {
+                    "model": "GPCM",
+                    "alpha": round(float(values[0]), 4),
+                    "beta": round(float(values[1]), 4),
+                    "d_steps": [round(float(v), 4) for v in values[2:]],
+                    "standard_errors": {
+                        "alpha": round(float(se[0]), 4),
+                        "beta": round(float(se[1]), 4),
+                        "d_steps": [round(float(v), 4) for v in se[2:]],
+                    },
+                }
+            else:
+                k = len(categories)
+                parameters = {
+                    "model": "NRM",
+                    "category_slopes": {c: round(float(v), 4) for c, v in zip(categories, values[:k])},
+                    "category_intercepts": {c: round(float(v), 4) for c, v in zip(categories, values[k:])},
+                    "standard_errors": {
+                        "slopes": {c: round(float(v), 4) for c, v in zip(categories, se[:k])},
+                        "intercepts": {c: round(float(v), 4) for c, v in zip(categories, se[k:])},
+                    },
+                }
+                unobserved = [c for j, c in enumerate(categories) if not self.row_counts[self.offsets[i] + j]]
+                if unobserved:
+                    parameters["unobserved_categories"] = unobserved
+            n = int(self.n_responses[i])
+            fit = self.fit_statistics(i)
+            record = dict(self.records.get(item_id, {}))
+            record.update({
+                "item_id": item_id,
+                "tier": spec["tier"] or record.get("tier"),
+                "concept_id": spec["concept_id"] or record.get("concept_id"),
+                "calibration_phase": "C_operational" if n >= OPERATIONAL_RESPONSES else "B_online",
+                "n_responses": n,
+                "parameters": parameters,
+                "fit_statistics": fit,
+                "calibrated_at": now,
+            })
+            flags = []
+            # RMSEA on fewer than OPERATIONAL_RESPONSES responses is mostly sampling noise
+            poor_rmsea = n >= OPERATIONAL_RESPONSES and fit["RMSEA"] is not None and fit["RMSEA"] > RMSEA_LIMIT
+            if poor_rmsea or fit["infit_MNSQ"] > INFIT_LIMIT:
+                flags.append("Poor model-data fit")
+            lltm = self.lltm.get(item_id)
+            if spec["model"] == "GPCM" and lltm and abs(parameters["beta"] - lltm["beta"]) > LLTM_DEVIATION_LIMIT:
+                flags.append(f"Empirical beta deviates {abs(parameters['beta'] - lltm['beta']):.2f} "
+                             f"from LLTM prediction")
+            if flags:
+                record["review_flags"] = flags
+            else:
+                record.pop("review_flags", None)
+            out.append(record)
+        return out
+
+
+# ═══════════════════════════════════════════════════════════════
+# SIMULATION
+# ═══════════════════════════════════════════════════════════════
+
+def simulate_data(n_items: int, n_students: int, items_per_student: int, seed: int = 0):
+    """Synthetic cohort: a third GPCM T1 items, the rest 3-category NRM items."""
+    rng = np.random.default_rng(seed)
+    truth = {}
+    tables = []
+    for i in range(n_items):
+        if i % 3 == 0:
+            alpha, beta = rng.uniform(0.7, 1.8), rng.normal(0, 0.8)
+            d_steps = sorted(rng.normal(0, 0.6, 3), reverse=True)
+            d_steps = list(np.asarray(d_steps) - np.mean(d_steps))
+            truth[f"SIM-{i:05d}"] = ("GPCM", GPCM_CATEGORIES, [alpha, beta, *d_steps])
+            tables.append(gpcm_table(alpha, beta, d_steps))
+        else:
+            slopes = rng.normal(0, 0.8, 3)
+            intercepts = rng.normal(0, 0.6, 3)
+            slopes, intercepts = slopes - slopes.mean(), intercepts - intercepts.mean()
+            truth[f"SIM-{i:05d}"] = ("NRM", ["M1", "M2", "Mastery"], [*slopes, *intercepts])
+            tables.append(nrm_table(slopes, intercepts))
+    item_ids = list(truth)
+
+    padded = np.zeros((n_items, 4, GRID_POINTS))
+    for i, table in enumerate(tables):
+        padded[i, :len(table)] = table
+    cumulative = padded.cumsum(axis=1)
+
+    theta = rng.normal(size=n_students)
+    theta_index = np.abs(GRID[None, :] - theta[:, None]).argmin(axis=1)
+    stride = max(n_items // items_per_student, 1)
+    if stride % 3 == 0:
+        stride += 1  # every student meets both GPCM and NRM items
+    chosen = (rng.integers(n_items, size=(n_students, 1)) + stride * np.arange(items_per_student)) % n_items
+    draws = rng.random(chosen.shape)
+    picked = (cumulative[chosen, :, theta_index[:, None]] < draws[..., None]).sum(axis=2)
+
+    data = ResponseData()
+    for s in range(n_students):
+        for i, k in zip(chosen[s], picked[s]):
+            model, categories, _ = truth[item_ids[i]]
+            data.add(f"S{s}", item_ids[i], categories[min(k, len(categories) - 1)],
+                     "T1" if model == "GPCM" else "T3")
+    return data, truth
+
+
+def report_recovery(calibrator: Calibrator, truth: dict):
+    errors = defaultdict(list)
+    for i in np.flatnonzero(calibrator.free):
+        item_id, spec = calibrator.item_ids[i], calibrator.specs[i]
+        estimate = natural_params(spec["model"], calibrator.w[i])
+        true = np.asarray(truth[item_id][2])
+        if spec["model"] == "GPCM":
+            errors["alpha"].append(estimate[0] - true[0])
+            errors["beta"].append(estimate[1] - true[1])
+        else:
+            k = len(spec["categories"])
+            order = [truth[item_id][1].index(c) for c in spec["categories"]]
+            errors["nrm_slopes"].extend(estimate[:k] - true[:k][order])
+    for name, values in errors.items():
+        values = np.asarray(values)
+        print(f"  {name}: bias {values.mean():+.3f}, RMSE {np.sqrt((values ** 2).mean()):.3f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="MML-EM calibration of GPCM/NRM items (V8 §6.1)")
+    add_cohort_arguments(parser, responses_help="Additional long-format responses JSONL",
+                         simulate_help="Calibrate a synthetic cohort and report parameter recovery",
+                         dry_run_help="Calibrate but don't write records", items_per_student=9)
+    parser.add_argument("--workers", type=int, help="M-step worker processes (default: CPU count)")
+    parser.add_argument("--max-iter", type=int, default=DEFAULT_MAX_ITER)
+    parser.add_argument("--tolerance", type=float, default=DEFAULT_TOLERANCE)
+    parser.add_argument("--output-dir", type=str, help=f"Record directory (default: {ITEM_PARAMS_DIR})")
+    args = parser.parse_args()
+
+    started = time.perf_counter()
+    if args.simulate:
+        data, truth = simulate_data(*args.simulate, args.items_per_student)
+        records, lltm = {}, {}
+        output_dir = Path(args.output_dir) if args.output_dir else None
+    else:
+        data, truth = ResponseData(), None
+        load_sessions(data, args.sessions)
+        if args.responses:
+            load_response_file(data, Path(args.responses))
+        records, lltm = load_records(), load_lltm_params()
+        data.seed_categories(load_nrm_categories(AINATIVE_DIR, records))
+        output_dir = None if args.dry_run else Path(args.output_dir) if args.output_dir else ITEM_PARAMS_DIR
+
+    if not data.items:
+        print("No responses found. Nothing to calibrate.")
+        return
+    calibrator = Calibrator(data, records, lltm, args.workers)
+    n_free = int(calibrator.free.sum())
+    print(f"Loaded {len(calibrator.rows)} response(s) from {data.n_students} student(s) on "
+          f"{len(calibrator.item_ids)} item(s) in {time.perf_counter() - started:.1f}s; "
+          f"{n_free} item(s) with >= {MIN_RESPONSES} responses")
+    if not n_free:
+        print("Nothing to calibrate.")
+        return
+
+    converged = calibrator.run(args.max_iter, args.tolerance)
+    results = calibrator.records_out()
+    elapsed = time.perf_counter() - started
+    print(f"EM {'converged' if converged else 'stopped without converging'} after "
+          f"{calibrator.iterations} iteration(s); {len(results)} item(s) calibrated in {elapsed:.1f}s")
+
+    phases = defaultdict(int)
+    for record in results:
+        phases[record["calibration_phase"]] += 1
+        for flag in record.get("review_flags", []):
+            print(f"  REVIEW {record['item_id']}: {flag}")
+        if output_dir:
+            write_record(output_dir, record)
+    print(f"  phases: {dict(phases)}")
+    if truth:
+        report_recovery(calibrator, truth)
+    if output_dir:
+        print(f"Records written to {output_dir}")
+
+
+if __name__ == "__main__":
+    main()
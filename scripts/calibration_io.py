@@ -0,0 +1,83 @@
+#!/usr/bin/env python3
+"""
+Shared file I/O for the calibration and monitoring scripts.
+
+calibrate_items.py, two_tier_ifa.py, mixture_irt.py, dif_audit.py, lltm.py and
+qmatrix_monitor.py all read the §8.1 session logs and write parameter, state
+or report files under metadata/. This module holds the common pieces:
+
+- iter_jsonl / iter_session_records / load_sessions: stream records from a
+  JSONL file, or from every session log matching a glob in SESSION_LOG_DIR
+  (skipping blank lines), into any response container with add_session().
+- write_json / write_jsonl / write_record: atomic writes (temp file, then
+  os.replace), so a concurrent reader such as session_server.py never sees a
+  half-written file.
+- add_cohort_arguments: the --sessions / --responses / --dry-run / --simulate
+  ITEMS STUDENTS / --items-per-student flags of the batch calibrators
+  (TESTLETS / --testlets-per-student for two_tier_ifa.py).
+"""
+
+import argparse
+import json
+import os
+from pathlib import Path
+
+ROOT = Path(__file__).parent.parent
+SESSION_LOG_DIR = ROOT / "metadata" / "diagnostic-sessions"
+SESSION_PATTERN = "*_sessions.jsonl"
+
+
+def iter_jsonl(path: Path):
+    """Yield the records of a JSONL file, skipping blank lines."""
+    with open(path) as f:
+        for line in f:
+            if line.strip():
+                yield json.loads(line)
+
+
+def iter_session_records(pattern: str = SESSION_PATTERN, log_dir: Path = SESSION_LOG_DIR):
+    """Yield every session record from the logs matching pattern, file by file."""
+    for path in sorted(log_dir.glob(pattern)):
+        yield from iter_jsonl(path)
+
+
+def load_sessions(data, pattern: str = SESSION_PATTERN):
+    """Add every logged session to a response container (anything with add_session)."""
+    for record in iter_session_records(pattern):
+        data.add_session(record)
+
+
+def write_json(path: Path, data):
+    path.parent.mkdir(parents=True, exist_ok=True)
+    temp_path = path.with_suffix(".tmp")
+    with open(temp_path, "w") as f:
+        json.dump(data, f, indent=2)
+    os.replace(temp_path, path)
+
+
+def write_jsonl(path: Path, records: list[dict]):
+    path.parent.mkdir(parents=True, exist_ok=True)
+    temp_path = path.with_suffix(".tmp")
+    with open(temp_path, "w") as f:
+        for record in records:
+            f.write(json.dumps(record) + "\n")
+    os.replace(temp_path, path)
+
+
+def write_record(output_dir: Path, record: dict):
+    """Write one §8.2 item record to output_dir/<item_id>.json."""
+    write_json(output_dir / f"{record['item_id']}.json", record)
+
+
+def add_cohort_arguments(parser: argparse.ArgumentParser, responses_help: str, simulate_help: str,
+                         dry_run_help: str, items_per_student: int, unit: str = "items"):
+    """Flags shared by the batch calibrators: data sources, --dry-run and --simulate.
+
+    unit names what --simulate generates and each student answers ("items" or "testlets").
+    """
+    parser.add_argument("--sessions", type=str, default=SESSION_PATTERN,
+                        help="Glob of session logs in metadata/diagnostic-sessions/")
+    parser.add_argument("--responses", type=str, help=responses_help)
+    parser.add_argument("--dry-run", action="store_true", help=dry_run_help)
+    parser.add_argument("--simulate", type=int, nargs=2, metavar=(unit.upper(), "STUDENTS"), help=simulate_help)
+    parser.add_argument(f"--{unit}-per-student", type=int, default=items_per_student)
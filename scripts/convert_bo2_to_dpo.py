@@ -3,109 +3,329 @@
 Convert Bo2 generation logs to DPO training triples.
 
 Usage: python scripts/convert_bo2_to_dpo.py --output FILE
+       python scripts/convert_bo2_to_dpo.py --output-dir DIR [--max-shard-mb N]
 
 Filters:
 - Only entries with human_choice not null
 - Only entries with q_matrix_alignment_pass == true
 
-Output: JSONL with {prompt, chosen, rejected, reason_category, reason_text}
+Output: JSONL with {item_id, prompt, chosen, rejected, reason_category, reason_text},
+at most one triple per item_id (its latest generation entry and decision).
+
+Human decisions are read from the append-only overlay merged over the Bo2 log
+(see bo2_log.py). Entries are streamed; only the qualifying triples are held.
+
+--output FILE writes a full export of every validated item.
+
+--output-dir DIR exports incrementally: only decisions newer than the last
+export are appended, to size-bounded shards dpo-00000.jsonl, dpo-00001.jsonl, ...
+The watermark is kept in DIR/export_state.json:
+- decision_watermark: latest validation_timestamp already exported
+- log_offset / log_inode: how far bo2_logs.jsonl has been scanned
+- item_offsets: byte offset of each item's generation entry in the log
+- exported: the shard holding each exported item's triple
+- shard / shard_bytes: the current shard and its committed length
+A run reads only the log lines appended since the last run plus the decision
+overlay, then seeks directly to the entries of newly decided items. After
+`bo2_log.py compact` rewrites the log, the next run rescans it once and skips
+decisions at or below the watermark.
+
+A re-decided item replaces its earlier triple: the shards holding superseded
+triples are rewritten without them (temp file + os.replace) before anything is
+appended. The state file is the commit record. It is saved after the rewrites
+and again after the appends are fsynced; a run first truncates the current
+shard back to shard_bytes and deletes any later shard, which drops lines a
+crashed run appended without committing, and their decisions, still above the
+watermark, are exported again.
 """
 
 import argparse
 import json
+import os
 import sys
 from pathlib import Path
 
-ROOT = Path(__file__).parent.parent
-BO2_LOG_PATH = ROOT / "metadata" / "bo2-generation-logs" / "bo2_logs.jsonl"
+sys.path.insert(0, str(Path(__file__).parent))
+from bo2_log import BO2_LOG_PATH, apply_decision, iter_bo2_entries, iter_log_from, load_decisions, read_entry_at
 
+STATE_FILE = "export_state.json"
+SHARD_PATTERN = "dpo-{:05d}.jsonl"
+DEFAULT_MAX_SHARD_MB = 64
 
-def load_bo2_logs() -> list[dict]:
-    """Load all Bo2 generation log entries."""
-    if not BO2_LOG_PATH.exists():
-        return []
-    entries = []
-    with open(BO2_LOG_PATH) as f:
-        for line in f:
-            line = line.strip()
-            if line:
-                entries.append(json.loads(line))
-    return entries
-
-
-def convert_to_dpo_triples(entries: list[dict]) -> list[dict]:
-    """Filter and convert Bo2 log entries to DPO triples."""
-    triples = []
-    skipped_no_choice = 0
-    skipped_no_alignment = 0
 
-    for entry in entries:
-        if entry.get("log_type") != "Bo2_generation":
+def entry_to_triple(entry: dict, stats: dict | None = None) -> dict | None:
+    """Convert one Bo2 log entry to a DPO triple, or None if it doesn't qualify."""
+    if entry.get("log_type") != "Bo2_generation":
+        return None
+
+    hv = entry.get("human_validation") or {}
+    human_choice = hv.get("human_choice")
+    if human_choice is None:
+        if stats is not None:
+            stats["skipped_no_choice"] += 1
+        return None
+
+    if not hv.get("q_matrix_alignment_pass", False):
+        if stats is not None:
+            stats["skipped_no_alignment"] += 1
+        return None
+
+    winner_key = human_choice
+    loser_key = "B" if winner_key == "A" else "A"
+
+    generation = entry.get("generation", {})
+    winner_data = generation.get(f"candidate_{winner_key}", {})
+    loser_data = generation.get(f"candidate_{loser_key}", {})
+
+    prompt_parts = [
+        f"Item: {entry.get('item_id', 'unknown')}",
+        f"Core concept: {entry.get('seed_concept', '')}",
+        f"Diagram mechanism: {entry.get('diagram_mechanism', 'N/A')}",
+        f"Q-Matrix: {json.dumps(entry.get('stage1_output', {}).get('q_matrix', {}))}",
+        f"Transfer domains: {json.dumps(entry.get('stage1_output', {}).get('transfer_domains', []))}",
+    ]
+
+    return {
+        "item_id": entry.get("item_id"),
+        "prompt": "\n".join(prompt_parts),
+        "chosen": json.dumps(winner_data),
+        "rejected": json.dumps(loser_data),
+        "reason_category": hv.get("rejection_reason"),
+        "reason_text": hv.get("rejection_explanation"),
+    }
+
+
+def new_stats() -> dict:
+    return {"entries": 0, "triples": 0, "skipped_no_choice": 0, "skipped_no_alignment": 0}
+
+
+def print_stats(stats: dict):
+    print(f"Processed {stats['entries']} log entries:")
+    print(f"  Valid triples: {stats['triples']}")
+    if stats.get("replaced"):
+        print(f"  Replaced (re-decided items): {stats['replaced']}")
+    print(f"  Skipped (no human choice): {stats['skipped_no_choice']}")
+    print(f"  Skipped (alignment fail): {stats['skipped_no_alignment']}")
+
+
+class ShardWriter:
+    """Append JSONL lines to size-bounded shard files in a directory."""
+
+    def __init__(self, output_dir: Path, max_bytes: int, shard: int = 0):
+        self.output_dir = output_dir
+        self.max_bytes = max_bytes
+        self.shard = shard
+        self._file = None
+
+    @property
+    def size(self) -> int:
+        path = self._path()
+        return self._file.tell() if self._file else (path.stat().st_size if path.exists() else 0)
+
+    def _path(self) -> Path:
+        return self.output_dir / SHARD_PATTERN.format(self.shard)
+
+    def write(self, record: dict):
+        line = json.dumps(record) + "\n"
+        size = self.size
+        if size and size + len(line.encode()) > self.max_bytes:
+            self.close()
+            self.shard += 1
+        if self._file is None:
+            self._file = open(self._path(), "a")
+        self._file.write(line)
+
+    def close(self):
+        if self._file:
+            self._file.flush()
+            os.fsync(self._file.fileno())
+            self._file.close()
+            self._file = None
+
+
+def load_export_state(output_dir: Path) -> dict:
+    path = output_dir / STATE_FILE
+    if path.exists():
+        with open(path) as f:
+            state = json.load(f)
+        # State written before triples were keyed by item_id: trust the shards as they are
+        state.setdefault("exported", {})
+        state.setdefault("shard", 0)
+        if "shard_bytes" not in state:
+            current = output_dir / SHARD_PATTERN.format(state["shard"])
+            state["shard_bytes"] = current.stat().st_size if current.exists() else 0
+        return state
+    return {"decision_watermark": "", "log_offset": 0, "log_inode": None, "item_offsets": {},
+            "exported": {}, "shard": 0, "shard_bytes": 0}
+
+
+def save_export_state(output_dir: Path, state: dict):
+    path = output_dir / STATE_FILE
+    temp_path = path.with_suffix(".tmp")
+    with open(temp_path, "w") as f:
+        json.dump(state, f)
+    os.replace(temp_path, path)
+
+
+def recover_shards(output_dir: Path, state: dict):
+    """Drop shard lines appended after the last committed state."""
+    current = output_dir / SHARD_PATTERN.format(state["shard"])
+    if current.exists() and current.stat().st_size > state["shard_bytes"]:
+        os.truncate(current, state["shard_bytes"])
+    shard = state["shard"] + 1
+    while (output_dir / SHARD_PATTERN.format(shard)).exists():
+        (output_dir / SHARD_PATTERN.format(shard)).unlink()
+        shard += 1
+
+
+def remove_triples(output_dir: Path, state: dict, item_ids: set):
+    """Rewrite the shards holding these items' triples without them."""
+    shards = {state["exported"][item_id] for item_id in item_ids if item_id in state["exported"]}
+    for shard in sorted(shards):
+        path = output_dir / SHARD_PATTERN.format(shard)
+        if not path.exists():
             continue
+        temp_path = path.with_suffix(".tmp")
+        with open(path) as src, open(temp_path, "w") as dst:
+            for line in src:
+                if json.loads(line).get("item_id") not in item_ids:
+                    dst.write(line)
+            dst.flush()
+            os.fsync(dst.fileno())
+        os.replace(temp_path, path)
+    for item_id in item_ids:
+        state["exported"].pop(item_id, None)
+    current = output_dir / SHARD_PATTERN.format(state["shard"])
+    state["shard_bytes"] = current.stat().st_size if current.exists() else 0
+
+
+def _decision_time(human_validation: dict | None) -> str:
+    return (human_validation or {}).get("validation_timestamp") or ""
+
+
+def export_incremental(output_dir: Path, max_bytes: int) -> dict:
+    """Append triples for decisions newer than the watermark to sharded output."""
+    output_dir.mkdir(parents=True, exist_ok=True)
+    state = load_export_state(output_dir)
+    recover_shards(output_dir, state)
+    watermark = state["decision_watermark"]
+    stats = new_stats()
+
+    # Scan only what was appended to the log since the last run (all of it after a compaction)
+    inode = BO2_LOG_PATH.stat().st_ino if BO2_LOG_PATH.exists() else None
+    size = BO2_LOG_PATH.stat().st_size if BO2_LOG_PATH.exists() else 0
+    if inode != state["log_inode"] or size < state["log_offset"]:
+        state.update({"log_offset": 0, "log_inode": inode, "item_offsets": {}})
 
-        hv = entry.get("human_validation", {})
-        human_choice = hv.get("human_choice")
-        if human_choice is None:
-            skipped_no_choice += 1
+    pending = {}
+    for offset, next_offset, entry in iter_log_from(state["log_offset"]):
+        state["log_offset"] = next_offset
+        item_id = entry.get("item_id")
+        if entry.get("log_type") != "Bo2_generation" or not item_id:
             continue
+        state["item_offsets"][item_id] = offset
+        decided_at = _decision_time(entry.get("human_validation"))
+        if decided_at > watermark:
+            pending[item_id] = (decided_at, None)
 
-        if not hv.get("q_matrix_alignment_pass", False):
-            skipped_no_alignment += 1
+    # Overlay decisions supersede anything already folded into the log
+    for item_id, decision in load_decisions().items():
+        decided_at = _decision_time(decision.get("human_validation"))
+        if decided_at > watermark:
+            pending[item_id] = (decided_at, decision)
+
+    triples = []
+    decided = {}
+    for item_id, (decided_at, decision) in sorted(pending.items(), key=lambda kv: kv[1][0]):
+        offset = state["item_offsets"].get(item_id)
+        if offset is None:
+            continue  # Decision for an item with no Bo2 log entry
+        entry = read_entry_at(offset)
+        if entry is None:
             continue
+        if decision:
+            entry = apply_decision(entry, decision)
+        decided[item_id] = decided_at
+        stats["entries"] += 1
+        triple = entry_to_triple(entry, stats)
+        if triple is not None:
+            triples.append(triple)
+            stats["triples"] += 1
 
-        winner_key = human_choice
-        loser_key = "B" if winner_key == "A" else "A"
+    # A new decision supersedes the item's exported triple, whether or not it still qualifies
+    superseded = set(decided) & set(state["exported"])
+    if superseded:
+        remove_triples(output_dir, state, superseded)
+        save_export_state(output_dir, state)
+    stats["replaced"] = len(superseded)
 
-        generation = entry.get("generation", {})
-        winner_data = generation.get(f"candidate_{winner_key}", {})
-        loser_data = generation.get(f"candidate_{loser_key}", {})
+    writer = ShardWriter(output_dir, max_bytes, state["shard"])
+    try:
+        for triple in triples:
+            writer.write(triple)
+            state["exported"][triple["item_id"]] = writer.shard
+    finally:
+        writer.close()
 
-        prompt_parts = [
-            f"Item: {entry.get('item_id', 'unknown')}",
-            f"Core concept: {entry.get('seed_concept', '')}",
-            f"Diagram mechanism: {entry.get('diagram_mechanism', 'N/A')}",
-            f"Q-Matrix: {json.dumps(entry.get('stage1_output', {}).get('q_matrix', {}))}",
-            f"Transfer domains: {json.dumps(entry.get('stage1_output', {}).get('transfer_domains', []))}",
-        ]
+    if decided:
+        state["decision_watermark"] = max(state["decision_watermark"], *decided.values())
+    state["shard"] = writer.shard
+    state["shard_bytes"] = writer.size
+    save_export_state(output_dir, state)
+    return stats
 
-        triples.append({
-            "prompt": "\n".join(prompt_parts),
-            "chosen": json.dumps(winner_data),
-            "rejected": json.dumps(loser_data),
-            "reason_category": hv.get("rejection_reason"),
-            "reason_text": hv.get("rejection_explanation"),
-        })
 
-    print(f"Processed {len(entries)} log entries:")
-    print(f"  Valid triples: {len(triples)}")
-    print(f"  Skipped (no human choice): {skipped_no_choice}")
-    print(f"  Skipped (alignment fail): {skipped_no_alignment}")
+def export_full(output_path: Path) -> dict:
+    """Write one triple per item, from its latest log entry, to one output file."""
+    stats = new_stats()
+    triples = {}
+    for entry in iter_bo2_entries():
+        stats["entries"] += 1
+        triple = entry_to_triple(entry, stats)
+        if entry.get("log_type") == "Bo2_generation":
+            triples.pop(entry.get("item_id"), None)
+            triples[entry.get("item_id")] = triple
+    triples = {item_id: triple for item_id, triple in triples.items() if triple is not None}
+    stats["triples"] = len(triples)
 
-    return triples
+    output_path.parent.mkdir(parents=True, exist_ok=True)
+    temp_path = output_path.with_name(f".{output_path.name}.tmp")
+    with open(temp_path, "w") as f:
+        for triple in triples.values():
+            f.write(json.dumps(triple) + "\n")
+    if stats["triples"]:
+        os.replace(temp_path, output_path)
+    else:
+        temp_path.unlink()
+    return stats
 
 
 def main():
     parser = argparse.ArgumentParser(description="Convert Bo2 logs to DPO training triples")
-    parser.add_argument("--output", type=str, required=True, help="Output JSONL file path")
+    output = parser.add_mutually_exclusive_group(required=True)
+    output.add_argument("--output", type=str, help="Output JSONL file path (full export)")
+    output.add_argument("--output-dir", type=str, help="Shard directory for incremental export")
+    parser.add_argument("--max-shard-mb", type=float, default=DEFAULT_MAX_SHARD_MB,
+                        help=f"Maximum shard size in MB for --output-dir (default: {DEFAULT_MAX_SHARD_MB})")
     args = parser.parse_args()
 
-    entries = load_bo2_logs()
-    if not entries:
+    if not BO2_LOG_PATH.exists():
         print("No Bo2 log entries found.")
         sys.exit(0)
 
-    triples = convert_to_dpo_triples(entries)
-    if not triples:
+    if args.output_dir:
+        stats = export_incremental(Path(args.output_dir), int(args.max_shard_mb * 1024 * 1024))
+        print_stats(stats)
+        print(f"\nAppended {stats['triples']} new DPO triples to {args.output_dir}")
+        return
+
+    stats = export_full(Path(args.output))
+    print_stats(stats)
+    if not stats["triples"]:
         print("No valid DPO triples generated.")
         sys.exit(0)
 
-    output_path = Path(args.output)
-    output_path.parent.mkdir(parents=True, exist_ok=True)
-    with open(output_path, "w") as f:
-        for triple in triples:
-            f.write(json.dumps(triple) + "\n")
-
-    print(f"\nWritten {len(triples)} DPO triples to {output_path}")
+    print(f"\nWritten {stats['triples']} DPO triples to {args.output}")
 
 
 if __name__ == "__main__":
@@ -0,0 +1,380 @@
+#!/usr/bin/env python3
+"""
+Batch DIF audit across the item pool (V8 manual §6.5).
+
+Usage: python scripts/dif_audit.py [--sessions GLOB] [--responses FILE.jsonl]
+                                   [--groups FILE.jsonl] [--thetas FILE.jsonl] [--dry-run]
+       python scripts/dif_audit.py --simulate ITEMS STUDENTS [--items-per-student K]
+
+Responses are dichotomised as in mixture_irt.py (T1 correct; T3/T4 Mastery)
+from the §8.1 session logs and/or a {"student_id", "item_id", "correct"}
+JSONL file. Each student's grouping variables (gender, medium of
+instruction, board of origin) come from the profile store (profile_store.py)
+and/or a {"student_id", "gender", "medium_of_instruction", "board_of_origin"}
+JSONL file (--groups). The matching θ is the student's
+mean theta_final over their sessions, or the primary θ written by
+two_tier_ifa.py --thetas.
+
+Every item with at least MIN_DIF_RESPONSES responses is audited against
+every grouping variable in one pass. Per variable, the largest level is the
+reference group and every other level with at least MIN_GROUP_RESPONSES
+responses on the item is a focal group; the item reports its worst focal
+group (by action, then Δ_MH).
+- Mantel-Haenszel: students are cut into N_STRATA θ quantile strata, and one
+  bincount builds the (item, stratum, group, correct) tables for all items.
+  From these come α_MH, the continuity-corrected MH χ², the ETS
+  Δ_MH = |2.35 ln α_MH| and its standard error (Robins-Breslow-Greenland
+  variance of ln α_MH).
+- Logistic regression (Swaminathan-Rogers): the models x ~ θ, x ~ θ + g and
+  x ~ θ + g + θg are fitted by Newton-Raphson for all items at once. Per-item
+  gradients and Hessians are bincount sums over the responses. Likelihood-
+  ratio tests (1 df each) give the uniform and nonuniform p-values.
+Actions follow the §6.5 thresholds with the ETS A/B/C significance rules, so
+small focal groups don't flag on noise:
+- REMOVE_FROM_POOL (C): Δ_MH >= 1.5 and significantly above 1.0 (one-sided
+  z = (Δ_MH - 1) / SE(Δ_MH) > ETS_C_Z).
+- FLAG_FOR_REVIEW (B): Δ_MH >= 1.0 and the MH χ² significant at MH_ALPHA,
+  but not C.
+- MONITOR (A): everything else.
+Even with these rules, a level with fewer than MIN_GROUP_RESPONSES responses
+on an item is not used as a focal group: with ~50 responses SE(Δ_MH) is
+above 1, and five focal groups per item would flag several percent of clean
+items.
+
+Output: every audited item's per-variable results are written to
+metadata/calibration/dif-audit/{date}_dif.jsonl. The §8.2 "dif_status" section
+({variable}_delta_mh, overall_action) is updated in records that already
+exist in metadata/calibration/item-params/.
+
+Requires numpy (see eap_scoring.py).
+"""
+
+import argparse
+import math
+import sys
+import time
+from collections import defaultdict
+from datetime import datetime, timezone
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent))
+from calibrate_items import ITEM_PARAMS_DIR, load_records
+from calibration_io import (add_cohort_arguments, iter_jsonl, iter_session_records, load_sessions, write_jsonl,
+                            write_record)
+from mixture_irt import BinaryResponses, load_response_file
+from profile_store import open_store
+from qmatrix_monitor import chi2_sf
+
+import numpy as np
+
+ROOT = Path(__file__).parent.parent
+DIF_DIR = ROOT / "metadata" / "calibration" / "dif-audit"
+
+# §8.2 key prefix -> student attribute
+GROUPING_VARS = {"gender": "gender", "medium": "medium_of_instruction", "board": "board_of_origin"}
+MIN_DIF_RESPONSES = 500
+MIN_GROUP_RESPONSES = 200  # focal n below which MH Δ is mostly noise
+N_STRATA = 10
+ETS_SCALE = 2.35
+MH_ALPHA = 0.05
+ETS_C_Z = 1.645  # one-sided 5% test of Δ_MH > 1.0
+ACTIONS = [(1.0, "MONITOR"), (1.5, "FLAG_FOR_REVIEW"), (math.inf, "REMOVE_FROM_POOL")]
+SEVERITY = {action: rank for rank, (_, action) in enumerate(ACTIONS)}
+NEWTON_MAX_ITER = 25
+NEWTON_TOLERANCE = 1e-6
+RIDGE = 1e-6
+
+
+def dif_action(delta_mh: float, p_value: float, delta_se: float) -> str:
+    """§6.5 action under the ETS A/B/C rules (see the module docstring)."""
+    if delta_mh >= ACTIONS[1][0] and (delta_mh - ACTIONS[0][0]) > ETS_C_Z * delta_se:
+        return ACTIONS[2][1]
+    if delta_mh >= ACTIONS[0][0] and p_value < MH_ALPHA:
+        return ACTIONS[1][1]
+    return ACTIONS[0][1]
+
+
+# ═══════════════════════════════════════════════════════════════
+# STUDENT DATA
+# ═══════════════════════════════════════════════════════════════
+
+def session_thetas(pattern: str) -> dict[str, float]:
+    """Mean theta_final per student over the session logs."""
+    sums = defaultdict(lambda: [0.0, 0])
+    for record in iter_session_records(pattern):
+        theta = (record.get("estimation", {}).get("theta_final") or {}).get("mean")
+        if theta is not None:
+            sums[record["student_id"]][0] += theta
+            sums[record["student_id"]][1] += 1
+    return {student_id: total / n for student_id, (total, n) in sums.items()}
+
+
+def load_thetas(path: Path) -> dict[str, float]:
+    return {r["student_id"]: r["theta"] for r in iter_jsonl(path)}
+
+
+def load_groups(student_ids, groups_file: Path | None = None) -> dict[str, dict]:
+    """Grouping attributes per student from the profiles, overridden by --groups."""
+    out = {}
+    store = open_store()
+    if store:
+        with store:
+            for student_id in student_ids:
+                profile = store.get(student_id)
+                if profile:
+                    out[student_id] = {field: profile.get(field) for field in GROUPING_VARS.values()}
+    if groups_file:
+        for r in iter_jsonl(groups_file):
+            out.setdefault(r["student_id"], {}).update(
+                {field: r[field] for field in GROUPING_VARS.values() if field in r})
+    return out
+
+
+# ═══════════════════════════════════════════════════════════════
+# BATCH TESTS
+# ═══════════════════════════════════════════════════════════════
+
+def mantel_haenszel(items: np.ndarray, strata: np.ndarray, focal: np.ndarray, correct: np.ndarray,
+                    n_items: int) -> dict[str, np.ndarray]:
+    """MH common odds ratio, Δ_MH with its standard error and χ² p-value for every item at once.
+
+    focal is 1 for focal-group responses and 0 for reference-group responses.
+    """
+    index = ((items * N_STRATA + strata) * 2 + focal) * 2 + correct
+    tables = np.bincount(index, minlength=n_items * N_STRATA * 4).reshape(n_items, N_STRATA, 2, 2)
+    ref_wrong, ref_right = tables[:, :, 0, 0], tables[:, :, 0, 1]
+    focal_wrong, focal_right = tables[:, :, 1, 0], tables[:, :, 1, 1]
+    n_ref, n_focal = ref_wrong + ref_right, focal_wrong + focal_right
+    right, wrong = ref_right + focal_right, ref_wrong + focal_wrong
+    total = n_ref + n_focal
+    with np.errstate(divide="ignore", invalid="ignore"):
+        numerator = np.where(total > 0, ref_right * focal_wrong / total, 0).sum(axis=1)
+        denominator = np.where(total > 0, ref_wrong * focal_right / total, 0).sum(axis=1)
+        log_alpha = np.log((numerator + 0.5) / (denominator + 0.5))
+        expected = np.where(total > 0, n_ref * right / total, 0).sum(axis=1)
+        variance = np.where(total > 1, n_ref * n_focal * right * wrong / (total ** 2 * (total - 1)), 0).sum(axis=1)
+        chi2 = (np.abs(ref_right.sum(axis=1) - expected) - 0.5).clip(0) ** 2 / variance
+        # Robins-Breslow-Greenland variance of ln α_MH
+        r = np.where(total > 0, ref_right * focal_wrong / total, 0)
+        q = np.where(total > 0, ref_wrong * focal_right / total, 0)
+        p_share = np.where(total > 0, (ref_right + focal_wrong) / total, 0)
+        q_share = 1 - p_share
+        r_sum, q_sum = r.sum(axis=1), q.sum(axis=1)
+        log_alpha_var = ((p_share * r).sum(axis=1) / (2 * r_sum ** 2)
+                         + (p_share * q + q_share * r).sum(axis=1) / (2 * r_sum * q_sum)
+                         + (q_share * q).sum(axis=1) / (2 * q_sum ** 2))
+    delta_se = np.where(np.isfinite(log_alpha_var), ETS_SCALE * np.sqrt(log_alpha_var), np.inf)
+    p_value = np.array([chi2_sf(c, 1) if np.isfinite(c) else 1.0 for c in chi2])
+    return {"log_alpha": log_alpha, "delta_mh": np.abs(ETS_SCALE * log_alpha), "delta_se": delta_se,
+            "p_value": p_value}
+
+
+def batched_logistic(items: np.ndarray, z: np.ndarray, y: np.ndarray, n_items: int) -> np.ndarray:
+    """Maximised log-likelihood of y ~ z (design columns) per item; all items at once."""
+    n_params = z.shape[1]
+    beta = np.zeros((n_items, n_params))
+    upper = np.triu_indices(n_params)
+    for _ in range(NEWTON_MAX_ITER):
+        eta = np.einsum("rp,rp->r", z, beta[items])
+        p = 1 / (1 + np.exp(-eta))
+        residual = y - p
+        weight = p * (1 - p)
+        grad = np.stack([np.bincount(items, residual * z[:, a], minlength=n_items) for a in range(n_params)], axis=1)
+        hessian = np.zeros((n_items, n_params, n_params))
+        for a, b in zip(*upper):
+            hessian[:, a, b] = hessian[:, b, a] = np.bincount(items, weight * z[:, a] * z[:, b], minlength=n_items)
+        hessian += RIDGE * np.eye(n_params)
+        step = np.linalg.solve(hessian, grad[..., None])[..., 0]
+        step = np.clip(step, -5, 5)  # separated groups would otherwise run off
+        beta += step
+        if np.abs(step).max() < NEWTON_TOLERANCE:
+            break
+    eta = np.einsum("rp,rp->r", z, beta[items])
+    loglik = y * eta - np.logaddexp(0, eta)
+    return np.bincount(items, loglik, minlength=n_items)
+
+
+def logistic_dif(items: np.ndarray, theta: np.ndarray, focal: np.ndarray, correct: np.ndarray,
+                 n_items: int) -> dict[str, np.ndarray]:
+    """Swaminathan-Rogers LR tests: uniform (θ + g vs θ) and nonuniform (+ θg vs θ + g)."""
+    ones = np.ones_like(theta)
+    g = focal.astype(float)
+    y = correct.astype(float)
+    ll_base = batched_logistic(items, np.column_stack([ones, theta]), y, n_items)
+    ll_uniform = batched_logistic(items, np.column_stack([ones, theta, g]), y, n_items)
+    ll_full = batched_logistic(items, np.column_stack([ones, theta, g, theta * g]), y, n_items)
+    return {
+        "uniform_p": np.array([chi2_sf(2 * d, 1) for d in ll_uniform - ll_base]),
+        "nonuniform_p": np.array([chi2_sf(2 * d, 1) for d in ll_full - ll_uniform]),
+    }
+
+
+class DIFAudit:
+    """All items × grouping variables, one batched pass per focal group."""
+
+    def __init__(self, data: BinaryResponses, thetas: dict[str, float], groups: dict[str, dict]):
+        self.item_ids = list(data.item_ids)
+        students, items, correct = data.arrays()
+        student_ids = list(data.student_ids)
+        theta = np.array([thetas.get(s, np.nan) for s in student_ids])
+        keep = ~np.isnan(theta[students])
+        self.students, self.items, self.correct = students[keep], items[keep], correct[keep]
+        self.theta = theta[self.students]
+        self.n_responses = np.bincount(self.items, minlength=len(self.item_ids))
+        self.audited = self.n_responses >= MIN_DIF_RESPONSES
+
+        # θ strata: quantiles over students with a θ
+        known = theta[~np.isnan(theta)]
+        edges = np.quantile(known, np.linspace(0, 1, N_STRATA + 1)[1:-1]) if len(known) else []
+        self.strata = np.searchsorted(edges, self.theta)
+
+        self.levels = {}
+        for prefix, field in GROUPING_VARS.items():
+            values = [(groups.get(s) or {}).get(field) for s in student_ids]
+            names = sorted({str(v) for v in values if v is not None})
+            index = {name: k for k, name in enumerate(names)}
+            codes = np.array([index[str(v)] if v is not None else -1 for v in values])
+            self.levels[prefix] = (names, codes[self.students])
+
+    def run(self) -> dict[str, dict]:
+        """Per item: {variable: result} for the worst focal group of each grouping variable."""
+        n_items = len(self.item_ids)
+        results = defaultdict(dict)
+        for prefix, (names, codes) in self.levels.items():
+            if len(names) < 2:
+                continue
+            reference = int(np.argmax(np.bincount(codes[codes >= 0], minlength=len(names))))
+            for level in range(len(names)):
+                if level == reference:
+                    continue
+                mask = ((codes == reference) | (codes == level)) & self.audited[self.items]
+                items, focal = self.items[mask], (codes[mask] == level).astype(np.int64)
+                n_focal = np.bincount(items, focal, minlength=n_items)
+                n_reference = np.bincount(items, 1 - focal, minlength=n_items)
+                eligible = (n_focal >= MIN_GROUP_RESPONSES) & (n_reference >= MIN_GROUP_RESPONSES)
+                if not eligible.any():
+                    continue
+                mh = mantel_haenszel(items, self.strata[mask], focal, self.correct[mask], n_items)
+                lr = logistic_dif(items, self.theta[mask], focal, self.correct[mask], n_items)
+                for i in np.flatnonzero(eligible):
+                    delta, p_value = float(mh["delta_mh"][i]), float(mh["p_value"][i])
+                    action = dif_action(delta, p_value, float(mh["delta_se"][i]))
+                    previous = results[self.item_ids[i]].get(prefix)
+                    if previous and (SEVERITY[previous["action"]], previous["delta_mh"]) >= (SEVERITY[action], delta):
+                        continue
+                    results[self.item_ids[i]][prefix] = {
+                        "reference": names[reference],
+                        "focal": names[level],
+                        "n_reference": int(n_reference[i]),
+                        "n_focal": int(n_focal[i]),
+                        "delta_mh": round(delta, 4),
+                        "delta_mh_se": round(float(mh["delta_se"][i]), 4),
+                        "mh_log_odds_ratio": round(float(mh["log_alpha"][i]), 4),
+                        "mh_p_value": round(p_value, 5),
+                        "lr_uniform_p": round(float(lr["uniform_p"][i]), 5),
+                        "lr_nonuniform_p": round(float(lr["nonuniform_p"][i]), 5),
+                        "action": action,
+                    }
+        return results
+
+
+def dif_status(item_results: dict, audited_at: str) -> dict:
+    """The §8.2 dif_status section for one item."""
+    status = {f"{prefix}_delta_mh": result["delta_mh"] for prefix, result in item_results.items()}
+    status["overall_action"] = max((r["action"] for r in item_results.values()), key=SEVERITY.get)
+    status["audited_at"] = audited_at
+    return status
+
+
+# ═══════════════════════════════════════════════════════════════
+# SIMULATION
+# ═══════════════════════════════════════════════════════════════
+
+def simulate_data(n_items: int, n_students: int, items_per_student: int, seed: int = 0):
+    """2PL cohort with random groupings; every 10th item is 0.8 logits harder for girls."""
+    rng = np.random.default_rng(seed)
+    a = rng.uniform(0.7, 2.0, n_items)
+    b = rng.normal(0, 1, n_items)
+    shifted = np.arange(n_items) % 10 == 0
+    theta = rng.normal(size=n_students)
+    gender = rng.choice(["F", "M"], n_students)
+    medium = rng.choice(["English", "Hindi", "Kannada"], n_students, p=[0.6, 0.3, 0.1])
+    board = rng.choice(["CBSE", "ICSE", "State"], n_students, p=[0.5, 0.2, 0.3])
+    stride = max(n_items // items_per_student, 1)
+    chosen = (rng.integers(n_items, size=(n_students, 1)) + stride * np.arange(items_per_student)) % n_items
+    difficulty = b[chosen] + 0.8 * (shifted[chosen] & (gender == "F")[:, None])
+    correct = rng.random(chosen.shape) < 1 / (1 + np.exp(-a[chosen] * (theta[:, None] - difficulty)))
+
+    data = BinaryResponses()
+    for s in range(n_students):
+        for i, x in zip(chosen[s], correct[s]):
+            data.add(f"S{s}", f"SIM-{i:05d}", bool(x))
+    thetas = {f"S{s}": float(theta[s] + rng.normal(0, 0.3)) for s in range(n_students)}
+    groups = {f"S{s}": {"gender": gender[s], "medium_of_instruction": medium[s], "board_of_origin": board[s]}
+              for s in range(n_students)}
+    return data, thetas, groups, {f"SIM-{i:05d}" for i in np.flatnonzero(shifted)}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Batch MH + logistic-regression DIF audit (V8 §6.5)")
+    add_cohort_arguments(parser, responses_help="Additional {student_id, item_id, correct} JSONL",
+                         simulate_help="Audit a synthetic cohort with known DIF items",
+                         dry_run_help="Audit but don't write results", items_per_student=20)
+    parser.add_argument("--groups", type=str, help="Grouping variables JSONL (overrides student profiles)")
+    parser.add_argument("--thetas", type=str, help="Matching θ JSONL {student_id, theta} (default: sessions)")
+    args = parser.parse_args()
+
+    started = time.perf_counter()
+    if args.simulate:
+        data, thetas, groups, truth = simulate_data(*args.simulate, args.items_per_student)
+    else:
+        data, truth = BinaryResponses(), None
+        load_sessions(data, args.sessions)
+        if args.responses:
+            load_response_file(data, Path(args.responses))
+        thetas = load_thetas(Path(args.thetas)) if args.thetas else session_thetas(args.sessions)
+        groups = load_groups(data.student_ids, Path(args.groups) if args.groups else None)
+
+    audit = DIFAudit(data, thetas, groups)
+    print(f"Loaded {len(audit.items)} matched response(s) from {len(data.student_ids)} student(s) on "
+          f"{len(audit.item_ids)} item(s) in {time.perf_counter() - started:.1f}s; "
+          f"{int(audit.audited.sum())} item(s) with >= {MIN_DIF_RESPONSES} responses")
+    started = time.perf_counter()
+    results = audit.run()
+    print(f"Audited {len(results)} item(s) in {time.perf_counter() - started:.1f}s")
+
+    audited_at = datetime.now(timezone.utc).isoformat()
+    actions = defaultdict(int)
+    statuses = {item_id: dif_status(item_results, audited_at) for item_id, item_results in results.items()}
+    for item_id, status in sorted(statuses.items()):
+        actions[status["overall_action"]] += 1
+        if status["overall_action"] != "MONITOR" and not truth:
+            print(f"  {status['overall_action']} {item_id}: "
+                  + ", ".join(f"{k} {v}" for k, v in status.items() if k.endswith("_delta_mh")))
+    print(f"  actions: {dict(actions)}")
+
+    if truth:
+        flagged = {item_id for item_id, status in statuses.items() if status["overall_action"] != "MONITOR"}
+        print(f"  {len(flagged & truth)} of {len(truth)} DIF items flagged; "
+              f"{len(flagged - truth)} of {len(statuses) - len(truth)} clean items flagged")
+        return
+    if args.dry_run or not results:
+        return
+
+    entries = [{"item_id": item_id, "n_responses": int(audit.n_responses[i]),
+                "results": results[item_id], "audited_at": audited_at}
+               for i, item_id in sorted(enumerate(audit.item_ids), key=lambda pair: pair[1])
+               if item_id in results]
+    report = DIF_DIR / f"{audited_at[:10]}_dif.jsonl"
+    write_jsonl(report, entries)
+    records = load_records()
+    updated = 0
+    for item_id, status in statuses.items():
+        if item_id in records:
+            write_record(ITEM_PARAMS_DIR, {**records[item_id], "dif_status": status})
+            updated += 1
+    print(f"Report written to {report}; dif_status updated in {updated} record(s)")
+
+
+if __name__ == "__main__":
+    main()
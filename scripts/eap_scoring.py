@@ -0,0 +1,269 @@
+#!/usr/bin/env python3
+"""
+Batch EAP scoring on the 40-point quadrature grid (V8 manual §5.4).
+
+Usage: python scripts/eap_scoring.py --responses FILE.jsonl [--output FILE.jsonl]
+       python scripts/eap_scoring.py --benchmark N
+
+Every item's category likelihoods are precomputed once on the grid
+(linspace(-4, 4, 40)) and stacked into one table of shape (categories, 40):
+- GPCM items (T1+T2 joint score 0-3): P(k | θ) ∝ exp(Σ_{v<=k} α(θ - β + d_v))
+- NRM items (T3/T4 categories):        P(k | θ) ∝ exp(a_k θ + c_k)
+A response is then just a row index into that table, so a whole cohort is
+updated with one gather and one multiply:
+    posterior = prior × table[rows];  posterior /= Σ posterior·Δ
+    θ̂ = Σ grid·posterior·Δ;  SE = sqrt(Σ (grid - θ̂)²·posterior·Δ)
+Rows of -1 leave the posterior unchanged (missing tier, routing_LoK).
+
+Item parameters are read from §8.2 calibration records in
+metadata/calibration/item-params/ ("parameters.model" GPCM or NRM) and, for
+items not yet calibrated, from the cold-start calibration_config of ai-native/
+files (GPCM {alpha, beta, d_steps}).
+
+Response file: one JSON object per student:
+  {"student_id", "prior": {"mean", "sd"}?, "t1t2": {"item_id", "score"},
+   "t3": {"item_id", "category"}?, "t4": {"item_id", "category"}?}
+Output: one JSON object per student with {mean, sd} after each phase.
+
+Requires numpy (not needed by the conversion cron scripts).
+"""
+
+import argparse
+import json
+import sys
+import time
+from pathlib import Path
+
+try:
+    import numpy as np
+except ImportError:
+    print("ERROR: numpy package not installed. Run: pip install numpy")
+    sys.exit(1)
+
+ROOT = Path(__file__).parent.parent
+ITEM_PARAMS_DIR = ROOT / "metadata" / "calibration" / "item-params"
+AINATIVE_DIR = ROOT / "ai-native"
+
+GRID_POINTS = 40
+GRID = np.linspace(-4.0, 4.0, GRID_POINTS)
+GRID_SPACING = GRID[1] - GRID[0]
+ROUTING_LOK = "routing_LoK"
+NO_RESPONSE = -1
+
+
+def gpcm_table(alpha: float, beta: float, d_steps: list[float], grid: np.ndarray = GRID) -> np.ndarray:
+    """GPCM category probabilities, shape (len(d_steps) + 1, len(grid))."""
+    steps = alpha * (grid[None, :] - beta + np.asarray(d_steps, dtype=float)[:, None])
+    logits = np.vstack([np.zeros_like(grid), np.cumsum(steps, axis=0)])
+    logits -= logits.max(axis=0)
+    probs = np.exp(logits)
+    return probs / probs.sum(axis=0)
+
+
+def nrm_table(slopes: list[float], intercepts: list[float], grid: np.ndarray = GRID) -> np.ndarray:
+    """NRM category probabilities, shape (len(slopes), len(grid))."""
+    logits = np.asarray(slopes, dtype=float)[:, None] * grid[None, :] \
+        + np.asarray(intercepts, dtype=float)[:, None]
+    logits -= logits.max(axis=0)
+    probs = np.exp(logits)
+    return probs / probs.sum(axis=0)
+
+
+class ItemBank:
+    """Precomputed category likelihood tables for a set of items.
+
+    All tables are stacked into self.table (total categories × grid points);
+    self.rows[item_id][category] is the row of that item's category.
+    """
+
+    def __init__(self):
+        self._tables = []
+        self._table = None
+        self._size = 0
+        self.rows = {}
+        self.models = {}
+
+    @property
+    def table(self) -> np.ndarray:
+        if self._table is None:
+            self._table = np.vstack(self._tables) if self._tables else np.ones((0, GRID_POINTS))
+        return self._table
+
+    def add_gpcm(self, item_id: str, alpha: float, beta: float, d_steps: list[float]):
+        table = gpcm_table(alpha, beta, d_steps)
+        self._add(item_id, "GPCM", list(range(table.shape[0])), table)
+
+    def add_nrm(self, item_id: str, slopes: dict[str, float], intercepts: dict[str, float]):
+        categories = list(slopes)
+        table = nrm_table([slopes[c] for c in categories], [intercepts[c] for c in categories])
+        self._add(item_id, "NRM", categories, table)
+
+    def _add(self, item_id: str, model: str, categories: list, table: np.ndarray):
+        self.rows[item_id] = {c: self._size + i for i, c in enumerate(categories)}
+        self.models[item_id] = model
+        self._tables.append(table)
+        self._size += table.shape[0]
+        self._table = None
+
+    def add_record(self, record: dict):
+        """Add an item from a §8.2 calibration record."""
+        params = record.get("parameters", {})
+        if params.get("model") == "NRM":
+            self.add_nrm(record["item_id"], params["category_slopes"], params["category_intercepts"])
+        else:
+            self.add_gpcm(record["item_id"], params["alpha"], params["beta"], params["d_steps"])
+
+    def row(self, item_id: str | None, category) -> int:
+        """Table row for a response, or NO_RESPONSE for a missing tier or routing_LoK."""
+        if item_id is None or category is None or category == ROUTING_LOK:
+            return NO_RESPONSE
+        return self.rows[item_id][category]
+
+
+def load_item_bank(item_params_dir: Path = ITEM_PARAMS_DIR, ainative_dir: Path = AINATIVE_DIR) -> ItemBank:
+    """Build the item bank from calibration records, falling back to cold-start params."""
+    bank = ItemBank()
+    if item_params_dir.exists():
+        for path in sorted(item_params_dir.glob("*.json")):
+            with open(path) as f:
+                bank.add_record(json.load(f))
+    if ainative_dir.exists():
+        for path in sorted(ainative_dir.glob("*/*_ainative.json")):
+            with open(path) as f:
+                data = json.load(f)
+            item_id = data.get("source_eqjs_id")
+            params = data.get("calibration_config", {}).get("lltm_predicted_params")
+            if item_id and params and item_id not in bank.rows:
+                bank.add_gpcm(item_id, params["alpha"], params["beta"], params["d_steps"])
+    return bank
+
+
+def gaussian_prior(mean, sd) -> np.ndarray:
+    """Gaussian prior densities on the grid, shape (N, grid points)."""
+    mean = np.atleast_1d(np.asarray(mean, dtype=float))[:, None]
+    sd = np.atleast_1d(np.asarray(sd, dtype=float))[:, None]
+    return np.exp(-0.5 * ((GRID[None, :] - mean) / sd) ** 2) / (sd * np.sqrt(2 * np.pi))
+
+
+def eap_summary(posterior: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+    """EAP theta and SE for each row of a normalised posterior."""
+    theta = posterior @ GRID * GRID_SPACING
+    se = np.sqrt(((GRID[None, :] - theta[:, None]) ** 2 * posterior).sum(axis=1) * GRID_SPACING)
+    return theta, se
+
+
+def eap_update(bank: ItemBank, prior: np.ndarray, rows: np.ndarray) -> dict:
+    """One EAP update for N students at once.
+
+    prior: (N, grid points) densities; rows: (N,) table rows (NO_RESPONSE keeps the prior).
+    Returns {"theta": (N,), "se": (N,), "posterior": (N, grid points)}.
+    """
+    rows = np.asarray(rows)
+    likelihood = np.ones_like(prior)
+    answered = rows != NO_RESPONSE
+    likelihood[answered] = bank.table[rows[answered]]
+    posterior = prior * likelihood
+    posterior /= posterior.sum(axis=1, keepdims=True) * GRID_SPACING
+    theta, se = eap_summary(posterior)
+    return {"theta": theta, "se": se, "posterior": posterior}
+
+
+def eap_update_gpcm(bank: ItemBank, prior: np.ndarray, item_ids: list[str], joint_scores) -> dict:
+    """Phase 1 (T1+T2) update with the GPCM joint score 0-3."""
+    rows = [bank.row(i, int(s) if s is not None else None) for i, s in zip(item_ids, joint_scores)]
+    return eap_update(bank, prior, np.array(rows, dtype=int))
+
+
+def eap_update_nrm(bank: ItemBank, prior: np.ndarray, item_ids: list, categories: list) -> dict:
+    """Phase 2/3 (T3, T4) update; routing_LoK and missing responses keep the prior."""
+    rows = [bank.row(i, c) for i, c in zip(item_ids, categories)]
+    return eap_update(bank, prior, np.array(rows, dtype=int))
+
+
+def score_cohort(bank: ItemBank, students: list[dict]) -> list[dict]:
+    """Run the §5.4 cascade (T1+T2 -> T3 -> T4) for a whole cohort."""
+    def tier(name: str, key: str):
+        ids = [(s.get(name) or {}).get("item_id") for s in students]
+        values = [(s.get(name) or {}).get(key) for s in students]
+        return ids, values
+
+    prior_mean = [s.get("prior", {}).get("mean", 0.0) for s in students]
+    prior_sd = [s.get("prior", {}).get("sd", 1.0) for s in students]
+    prior = gaussian_prior(prior_mean, prior_sd)
+
+    phase1 = eap_update_gpcm(bank, prior, *tier("t1t2", "score"))
+    t3_ids, t3_categories = tier("t3", "category")
+    phase2 = eap_update_nrm(bank, phase1["posterior"], t3_ids, t3_categories)
+    t4_ids, t4_categories = tier("t4", "category")
+    # routing_LoK at T3 skips T4
+    t4_categories = [None if c3 == ROUTING_LOK else c4 for c3, c4 in zip(t3_categories, t4_categories)]
+    phase3 = eap_update_nrm(bank, phase2["posterior"], t4_ids, t4_categories)
+
+    def estimate(phase: dict, i: int) -> dict:
+        return {"mean": round(float(phase["theta"][i]), 4), "sd": round(float(phase["se"][i]), 4)}
+
+    results = []
+    for i, student in enumerate(students):
+        results.append({
+            "student_id": student.get("student_id"),
+            "theta_prior": {"mean": prior_mean[i], "sd": prior_sd[i]},
+            "theta_post_T1T2": estimate(phase1, i),
+            "theta_post_T3": estimate(phase2, i),
+            "theta_post_T4": estimate(phase3, i),
+            "theta_final": estimate(phase3, i),
+        })
+    return results
+
+
+def benchmark(n_students: int, seed: int = 0):
+    """Score a synthetic cohort and print the timing."""
+    rng = np.random.default_rng(seed)
+    bank = ItemBank()
+    for i in range(50):
+        bank.add_gpcm(f"T1-{i}", rng.uniform(0.8, 1.6), rng.normal(), [-0.5, 0.0, 0.5])
+        categories = ["M1", "M2", "Mastery"]
+        bank.add_nrm(f"T3-{i}", dict(zip(categories, rng.uniform(-1, 1.5, 3))),
+                     dict(zip(categories, rng.normal(size=3))))
+    categories = ["M1", "M2", "Mastery", ROUTING_LOK]
+    students = [{
+        "student_id": f"S{s}",
+        "t1t2": {"item_id": f"T1-{rng.integers(50)}", "score": int(rng.integers(4))},
+        "t3": {"item_id": f"T3-{rng.integers(50)}", "category": categories[rng.integers(4)]},
+        "t4": {"item_id": f"T3-{rng.integers(50)}", "category": categories[rng.integers(3)]},
+    } for s in range(n_students)]
+
+    started = time.perf_counter()
+    score_cohort(bank, students)
+    elapsed = time.perf_counter() - started
+    print(f"Scored {n_students} students (3 phases) in {elapsed:.3f}s")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Batch EAP scoring (V8 §5.4)")
+    parser.add_argument("--responses", type=str, help="Student responses JSONL")
+    parser.add_argument("--output", type=str, help="Write results JSONL here instead of stdout")
+    parser.add_argument("--benchmark", type=int, help="Score a synthetic cohort of N students")
+    args = parser.parse_args()
+
+    if args.benchmark:
+        benchmark(args.benchmark)
+        return
+    if not args.responses:
+        parser.print_help()
+        sys.exit(1)
+
+    with open(args.responses) as f:
+        students = [json.loads(line) for line in f if line.strip()]
+    results = score_cohort(load_item_bank(), students)
+
+    lines = [json.dumps(r) for r in results]
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write("\n".join(lines) + "\n")
+        print(f"Scored {len(results)} student(s) -> {args.output}")
+    else:
+        print("\n".join(lines))
+
+
+if __name__ == "__main__":
+    main()
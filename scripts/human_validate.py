@@ -5,12 +5,14 @@ CLI tool for human validation of Bo2 items.
 Usage: python scripts/human_validate.py
 
 Interactive flow:
-1. Find items with approval_status == "awaiting_human_validation"
+1. Find items with approval_status == "awaiting_human_validation" (from the
+   pipeline manifest, see manifest.py)
 2. Display: original question, Q-matrix, candidate A, candidate B
 3. Prompt for selection, Q-matrix alignment, rejection reason
-4. Update ai-native JSON, copy to ai-native-ready if approved
+4. Update ai-native JSON and its manifest entry, copy to ai-native-ready if approved
 5. Generate RLVR triple if applicable
-6. Log everything to metadata/
+6. Log everything to metadata/ (Bo2 decisions go to an append-only overlay, see bo2_log.py)
+   and update the readiness counters (see automation_readiness.py)
 
 Validator ID is MANDATORY. Prompt at session start.
 """
@@ -21,28 +23,23 @@ import sys
 from datetime import datetime, timezone
 from pathlib import Path
 
+sys.path.insert(0, str(Path(__file__).parent))
+import manifest
+from automation_readiness import record_decision
+from bo2_log import append_decision
+
 ROOT = Path(__file__).parent.parent
 AINATIVE_DIR = ROOT / "ai-native"
 READY_DIR = ROOT / "ai-native-ready"
 EQJS_DIR = ROOT / "eqjs"
 APPROVAL_LOG = ROOT / "metadata" / "human-approvals"
-BO2_LOG_DIR = ROOT / "metadata" / "bo2-generation-logs"
 
 REJECTION_REASONS = ["Construct_Violation", "Dependency_Failure", "Scale_Misfit", "Other"]
 
 
-def find_pending_items() -> list[Path]:
+def find_pending_items(conn) -> list[Path]:
     """Find all items awaiting human validation."""
-    pending = []
-    for paper_dir in sorted(AINATIVE_DIR.iterdir()):
-        if not paper_dir.is_dir() or paper_dir.name == ".gitkeep":
-            continue
-        for f in sorted(paper_dir.glob("*_ainative.json")):
-            with open(f) as fh:
-                data = json.load(fh)
-            if data.get("approval_status") == "awaiting_human_validation":
-                pending.append(f)
-    return pending
+    return manifest.find_pending_review(conn)
 
 
 def load_eqjs_source(ainative_data: dict) -> dict | None:
@@ -179,51 +176,30 @@ def generate_rlvr_triple(ainative_data: dict, decision: dict) -> dict | None:
     }
 
 
-def write_approval_log(entry: dict):
-    """Append to the approvals log."""
+def write_approval_log(entry: dict) -> tuple[int, int]:
+    """Append to the approvals log. Returns the byte range of the new line."""
     APPROVAL_LOG.mkdir(parents=True, exist_ok=True)
     log_path = APPROVAL_LOG / "approvals.jsonl"
     with open(log_path, "a") as f:
+        start = f.tell()
         f.write(json.dumps(entry) + "\n")
+        return start, f.tell()
 
 
 def update_bo2_log(item_id: str, decision: dict, validator_id: str, rlvr: dict | None):
-    """Update the Bo2 log with human validation results."""
-    log_path = BO2_LOG_DIR / "bo2_logs.jsonl"
-    if not log_path.exists():
-        return
-
-    entries = []
-    with open(log_path) as f:
-        for line in f:
-            line = line.strip()
-            if line:
-                entries.append(json.loads(line))
-
-    updated = False
-    for entry in entries:
-        if entry.get("item_id") == item_id:
-            entry["human_validation"] = {
-                "human_choice": decision["human_choice"],
-                "rejection_reason": decision["rejection_reason"],
-                "rejection_explanation": decision["rejection_explanation"],
-                "q_matrix_alignment_pass": decision["q_matrix_alignment_pass"],
-                "q_matrix_alignment_notes": decision["q_matrix_alignment_notes"],
-                "validator_id": validator_id,
-                "validation_timestamp": datetime.now(timezone.utc).isoformat(),
-            }
-            if rlvr:
-                entry["rlvr_triple"] = rlvr
-            updated = True
-            break
-
-    if updated:
-        with open(log_path, "w") as f:
-            for entry in entries:
-                f.write(json.dumps(entry) + "\n")
-
-
-def process_item(ainative_path: Path, validator_id: str):
+    """Record the human validation result in the Bo2 log's decision overlay."""
+    append_decision(item_id, {
+        "human_choice": decision["human_choice"],
+        "rejection_reason": decision["rejection_reason"],
+        "rejection_explanation": decision["rejection_explanation"],
+        "q_matrix_alignment_pass": decision["q_matrix_alignment_pass"],
+        "q_matrix_alignment_notes": decision["q_matrix_alignment_notes"],
+        "validator_id": validator_id,
+        "validation_timestamp": datetime.now(timezone.utc).isoformat(),
+    }, rlvr)
+
+
+def process_item(ainative_path: Path, validator_id: str, conn):
     """Process a single item for human validation."""
     with open(ainative_path) as f:
         ainative_data = json.load(f)
@@ -244,6 +220,7 @@ def process_item(ainative_path: Path, validator_id: str):
         }
         with open(ainative_path, "w") as f:
             json.dump(ainative_data, f, indent=2)
+        manifest.record_ainative(conn, ainative_path, ainative_data["approval_status"])
 
         paper_code = ainative_path.parent.name
         ready_dir = READY_DIR / paper_code
@@ -261,14 +238,17 @@ def process_item(ainative_path: Path, validator_id: str):
         }
         with open(ainative_path, "w") as f:
             json.dump(ainative_data, f, indent=2)
+        manifest.record_ainative(conn, ainative_path, ainative_data["approval_status"])
         print(f"\n  REJECTED: {decision['rejection_reason']} - {decision['rejection_explanation']}")
 
-    write_approval_log({
+    approvals_start, approvals_end = write_approval_log({
         "timestamp": now, "item_id": item_id, "validator_id": validator_id,
         "decision": decision, "rlvr_generated": rlvr is not None,
         "output_file": str(ainative_path),
     })
     update_bo2_log(item_id, decision, validator_id, rlvr)
+    is_bo2 = ainative_data.get("candidates", {}).get("generation_type") == "Bo2"
+    record_decision(item_id, decision, is_bo2, approvals_start, approvals_end)
 
 
 def main():
@@ -281,7 +261,8 @@ def main():
         print("ERROR: Validator ID is mandatory.")
         sys.exit(1)
 
-    pending = find_pending_items()
+    conn = manifest.connect()
+    pending = find_pending_items(conn)
     if not pending:
         print("\nNo items awaiting human validation.")
         return
@@ -289,7 +270,7 @@ def main():
     print(f"\nFound {len(pending)} item(s) awaiting validation.")
     for i, path in enumerate(pending, 1):
         print(f"\n[{i}/{len(pending)}] {path.name}")
-        process_item(path, validator_id)
+        process_item(path, validator_id, conn)
         if i < len(pending):
             cont = input("\nContinue to next item? [y/n]: ").strip().lower()
             if cont != "y":
@@ -0,0 +1,199 @@
+#!/usr/bin/env python3
+"""
+Bulk importer for concatenated EQJS paper dumps (eqjs/asset_*_jsons.txt).
+
+Usage: python scripts/import_eqjs_dumps.py [DUMP ...] [--workers N] [--overwrite]
+
+Algorithm:
+1. Stream each dump object by object (never loading the whole file)
+2. Derive paper code and question number from metadata.id
+   (e.g. Ei_ASSET_Sci_38124_Q7 -> eqjs/Science_38124/Q7.json)
+3. Validate items in parallel with validate_eqjs on a worker pool
+4. Atomically write valid items to the eqjs/<paper>/Q<n>.json layout and
+   record them in the pipeline manifest (manifest.py)
+5. Log every object's outcome to metadata/conversion-logs/bulk-import/
+
+The dumps are hand-assembled, so the reader tolerates separators between
+objects and skips malformed objects by resyncing at the next top-level "{".
+Shared stimulus objects (stimulus_id, no metadata) are logged and skipped.
+"""
+
+import argparse
+import json
+import os
+import re
+import sys
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from datetime import datetime, timezone
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent))
+import manifest
+from validate_eqjs import validate_eqjs_data
+
+ROOT = Path(__file__).parent.parent
+EQJS_DIR = ROOT / "eqjs"
+LOG_DIR = ROOT / "metadata" / "conversion-logs" / "bulk-import"
+
+CHUNK_SIZE = 64 * 1024
+ITEM_ID_PATTERN = re.compile(r"^(?P<assessment>.+)_(?P<subject>[A-Za-z]+)_(?P<paper>[0-9A-Za-z]+)_Q(?P<qno>\d+)$")
+SUBJECT_NAMES = {"Sci": "Science"}
+
+
+def iter_dump_objects(path: Path, chunk_size: int = CHUNK_SIZE):
+    """Stream the top-level JSON objects of a dump.
+
+    Yields (index, obj, error): obj is None and error a message for objects that
+    fail to parse. Only the current object (plus one read chunk) is held in memory.
+    """
+    decoder = json.JSONDecoder()
+    buffer = ""
+    eof = False
+    index = 0
+    with open(path, encoding="utf-8", newline="") as f:
+        while True:
+            start = buffer.find("{")
+            if start == -1:
+                if eof:
+                    return
+                buffer = ""
+                chunk = f.read(chunk_size)
+                eof = not chunk
+                buffer += chunk
+                continue
+            buffer = buffer[start:]
+            try:
+                obj, end = decoder.raw_decode(buffer)
+            except json.JSONDecodeError as e:
+                # A later top-level "{" means this object is malformed, not just cut off.
+                resync = buffer.find("\n{", max(e.pos, 1))
+                if resync != -1:
+                    yield index, None, f"{e.msg} (object {index})"
+                    index += 1
+                    buffer = buffer[resync + 1:]
+                    continue
+                if eof:
+                    yield index, None, f"{e.msg} (object {index}, truncated at end of file)"
+                    return
+                chunk = f.read(chunk_size)
+                eof = not chunk
+                buffer += chunk
+                continue
+            yield index, obj, None
+            index += 1
+            buffer = buffer[end:]
+
+
+def derive_eqjs_path(item: dict) -> Path | None:
+    """Map an item's metadata.id to eqjs/<paper>/Q<n>.json, or None if it doesn't parse."""
+    item_id = item.get("metadata", {}).get("id", "")
+    match = ITEM_ID_PATTERN.match(item_id)
+    if not match:
+        return None
+    subject = SUBJECT_NAMES.get(match["subject"], match["subject"])
+    return EQJS_DIR / f"{subject}_{match['paper']}" / f"Q{int(match['qno'])}.json"
+
+
+def import_item(item: dict, eqjs_path: str, overwrite: bool = False) -> dict:
+    """Validate one item and atomically write it into place (runs in a worker)."""
+    path = Path(eqjs_path)
+    if path.exists() and not overwrite:
+        return {"status": "exists"}
+
+    validation = validate_eqjs_data(item)
+    if not validation["valid"]:
+        return {"status": "validation_failed", "errors": validation["errors"],
+                "warnings": validation["warnings"]}
+
+    path.parent.mkdir(parents=True, exist_ok=True)
+    temp_path = path.with_name(f".{path.name}.{os.getpid()}.tmp")
+    with open(temp_path, "w") as f:
+        json.dump(item, f, indent=2)
+    os.replace(temp_path, path)
+    return {"status": "success", "warnings": validation["warnings"]}
+
+
+def write_log(log_dir: Path, entry: dict):
+    """Append a log entry to the day's JSONL log file."""
+    log_dir.mkdir(parents=True, exist_ok=True)
+    date_str = datetime.now(timezone.utc).strftime("%Y-%m-%d")
+    log_path = log_dir / f"{date_str}_run.jsonl"
+    with open(log_path, "a") as f:
+        f.write(json.dumps(entry) + "\n")
+
+
+def import_dumps(dump_paths: list[Path], workers: int | None = None, overwrite: bool = False) -> dict:
+    """Stream, validate and write every item of the given dumps. Returns status counts."""
+    counts = {}
+    conn = manifest.connect()
+    max_pending = (workers or os.cpu_count() or 1) * 4
+
+    def record(entry: dict):
+        counts[entry["status"]] = counts.get(entry["status"], 0) + 1
+        if entry["status"] == "success":
+            manifest.record_eqjs(conn, Path(entry["output_file"]))
+        write_log(LOG_DIR, {"timestamp": datetime.now(timezone.utc).isoformat(), **entry})
+        if entry["status"] not in ("success", "exists"):
+            detail = entry.get("errors") or entry.get("reason", "")
+            print(f"  {entry.get('item_id') or entry['source']}: {entry['status']} {detail}")
+
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        pending = {}
+
+        def drain(block_until: int):
+            while len(pending) > block_until:
+                done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    entry = pending.pop(future)
+                    try:
+                        entry.update(future.result())
+                    except Exception as e:
+                        entry.update({"status": "error", "errors": [str(e)]})
+                    record(entry)
+
+        for dump_path in dump_paths:
+            print(f"Importing: {dump_path}")
+            source = dump_path.name
+            for index, item, error in iter_dump_objects(dump_path):
+                entry = {"source": source, "index": index}
+                if error:
+                    record({**entry, "status": "parse_error", "errors": [error]})
+                    continue
+                if "metadata" not in item and "stimulus_id" in item:
+                    record({**entry, "status": "skipped", "reason": "shared_stimulus",
+                            "stimulus_id": item.get("stimulus_id")})
+                    continue
+                entry["item_id"] = item.get("metadata", {}).get("id")
+                eqjs_path = derive_eqjs_path(item)
+                if eqjs_path is None:
+                    record({**entry, "status": "skipped", "reason": "unparseable_metadata_id"})
+                    continue
+                entry["output_file"] = str(eqjs_path)
+                pending[pool.submit(import_item, item, str(eqjs_path), overwrite)] = entry
+                drain(max_pending)
+        drain(0)
+
+    return counts
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Import concatenated EQJS paper dumps")
+    parser.add_argument("dumps", nargs="*", help="Dump files (default: eqjs/asset_*_jsons.txt)")
+    parser.add_argument("--workers", type=int, help="Validation worker processes (default: CPU count)")
+    parser.add_argument("--overwrite", action="store_true", help="Replace existing eqjs/<paper>/Q<n>.json files")
+    args = parser.parse_args()
+
+    dump_paths = [Path(d) for d in args.dumps] or sorted(EQJS_DIR.glob("asset_*_jsons.txt"))
+    if not dump_paths:
+        print("No dump files found.")
+        return
+
+    counts = import_dumps(dump_paths, args.workers, args.overwrite)
+    print("\nImport summary:")
+    for status, n in sorted(counts.items()):
+        print(f"  {status}: {n}")
+    sys.exit(0 if not counts.get("parse_error") and not counts.get("validation_failed") else 1)
+
+
+if __name__ == "__main__":
+    main()
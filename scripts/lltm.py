@@ -0,0 +1,360 @@
+#!/usr/bin/env python3
+"""
+LLTM cold-start parameters for the whole EQJS corpus (V8 manual §6.1 Phase A).
+
+Usage: python scripts/lltm.py fit [--apply] [--dry-run]
+       python scripts/lltm.py simulate [--items N]
+
+Design matrix (lltm_predict_parameters), one row per EQJS item:
+- cognitive_level        classification.cognitive_level, Bloom's 1-6
+- facility_probit        -Φ⁻¹(percent_correct / 100); the LLTM is linear on
+                         the logit/probit scale, so the facility index enters
+                         through the same probit the old single-feature
+                         heuristic used
+- n_prerequisites        len(semantic.prerequisites)
+- concept_complexity     len(semantic.concepts) (the curriculum has no
+                         complexity field; the number of concepts an item
+                         combines stands in for it)
+- num_reasoning_steps    len(solution.marking_scheme.breakdown)
+- domain=<subject>       one-hot of classification.subject
+Missing values are imputed at the feature mean.
+
+fit: the corpus is read once, the matrix is built column by column as
+arrays, and the weights are fitted by ridge regression on the standardised
+features against the calibrated β of every GPCM item with a §8.2 record in
+metadata/calibration/item-params/. The ridge pulls towards the heuristic
+(β = facility_probit, every other weight 0), so with no calibrated items the
+fit reproduces the heuristic, and the other features take over as
+calibration data accumulates. Outputs:
+- metadata/calibration/lltm-weights.json: feature names, means, sds,
+  weights and intercept
+- metadata/calibration/lltm-predictions.json: {item_id: {alpha, beta,
+  d_steps}} for every EQJS item
+--apply also rewrites calibration_config.lltm_predicted_params in every
+ai-native file that is still A_cold_start (and records it in the manifest).
+
+run_eqjs_to_ainative.py calls cold_start_params() for each new item: one dot
+product with the cached weights, in pure Python, so the conversion cron does
+not need numpy. Without a weights file it falls back to the heuristic.
+
+simulate: a synthetic corpus with known weights, to time the batch pass and
+check recovery.
+"""
+
+import argparse
+import json
+import math
+import sys
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent))
+from calibration_io import write_json
+
+try:
+    import numpy as np
+except ImportError:
+    np = None  # Only the batch fit needs it
+
+ROOT = Path(__file__).parent.parent
+EQJS_DIR = ROOT / "eqjs"
+AINATIVE_DIR = ROOT / "ai-native"
+ITEM_PARAMS_DIR = ROOT / "metadata" / "calibration" / "item-params"
+WEIGHTS_PATH = ROOT / "metadata" / "calibration" / "lltm-weights.json"
+PREDICTIONS_PATH = ROOT / "metadata" / "calibration" / "lltm-predictions.json"
+
+BLOOM_LEVELS = {"remember": 1, "understand": 2, "apply": 3, "analyze": 4, "analyse": 4,
+                "evaluate": 5, "create": 6}
+NUMERIC_FEATURES = ["cognitive_level", "facility_probit", "n_prerequisites", "concept_complexity",
+                    "num_reasoning_steps"]
+DOMAIN_PREFIX = "domain="
+DEFAULT_PERCENT_CORRECT = 50
+DEFAULT_ALPHA = 1.0  # Rasch assumption
+DEFAULT_D_STEPS = [-0.5, 0.0, 0.5]
+RIDGE = 10.0
+MIN_SD = 1e-6
+
+_WEIGHTS = None
+
+
+def qnorm(p: float) -> float:
+    """Approximate inverse normal CDF (probit) using rational approximation."""
+    if p <= 0:
+        return -3.0
+    if p >= 1:
+        return 3.0
+    if p == 0.5:
+        return 0.0
+    if p < 0.5:
+        t = math.sqrt(-2.0 * math.log(p))
+    else:
+        t = math.sqrt(-2.0 * math.log(1.0 - p))
+    c0, c1, c2 = 2.515517, 0.802853, 0.010328
+    d1, d2, d3 = 1.432788, 0.189269, 0.001308
+    result = t - (c0 + c1 * t + c2 * t * t) / (1.0 + d1 * t + d2 * t * t + d3 * t * t * t)
+    return -result if p < 0.5 else result
+
+
+def percent_correct(eqjs: dict):
+    classification = eqjs.get("classification", {})
+    value = classification.get("asset_percent_correct")
+    if value is None:
+        value = eqjs.get("assessment_metadata", {}).get("percent_correct")
+    return value
+
+
+def item_features(eqjs: dict) -> dict:
+    """Raw LLTM features of one EQJS item; None marks a missing value."""
+    classification = eqjs.get("classification", {})
+    semantic = eqjs.get("semantic", {})
+    level = classification.get("cognitive_level")
+    if isinstance(level, str):
+        level = BLOOM_LEVELS.get(level.strip().lower())
+    pct = percent_correct(eqjs)
+    breakdown = eqjs.get("solution", {}).get("marking_scheme", {}).get("breakdown")
+    return {
+        "cognitive_level": level,
+        "facility_probit": -qnorm(pct / 100.0) if pct is not None else None,
+        "n_prerequisites": len(semantic["prerequisites"]) if "prerequisites" in semantic else None,
+        "concept_complexity": len(semantic["concepts"]) if "concepts" in semantic else None,
+        "num_reasoning_steps": len(breakdown) if breakdown else None,
+        "domain": (classification.get("subject") or "").strip().lower() or None,
+    }
+
+
+def heuristic_params(eqjs: dict) -> dict:
+    """The single-feature heuristic: β = -Φ⁻¹(percent_correct)."""
+    pct = percent_correct(eqjs)
+    beta = -1.0 * qnorm((pct if pct is not None else DEFAULT_PERCENT_CORRECT) / 100.0)
+    return {"alpha": DEFAULT_ALPHA, "beta": round(beta, 4), "d_steps": list(DEFAULT_D_STEPS)}
+
+
+def load_weights(path: Path = WEIGHTS_PATH) -> dict | None:
+    """The cached LLTM weights, or None if none have been fitted."""
+    global _WEIGHTS
+    if _WEIGHTS is None and path.exists():
+        with open(path) as f:
+            _WEIGHTS = json.load(f)
+    return _WEIGHTS
+
+
+def predict_params(eqjs: dict, weights: dict) -> dict:
+    """LLTM-predicted GPCM parameters for one item from fitted weights (pure Python)."""
+    features = item_features(eqjs)
+    beta = weights["intercept"]
+    for name, mean, sd, w in zip(weights["features"], weights["means"], weights["sds"], weights["weights"]):
+        if name.startswith(DOMAIN_PREFIX):
+            value = float(features["domain"] == name[len(DOMAIN_PREFIX):])
+        else:
+            value = features[name]
+            if value is None:
+                continue  # imputed at the mean: standardised value 0
+        beta += w * (value - mean) / sd
+    return {"alpha": DEFAULT_ALPHA, "beta": round(beta, 4), "d_steps": list(DEFAULT_D_STEPS)}
+
+
+def cold_start_params(eqjs: dict) -> dict:
+    """calibration_config for a new item: cached LLTM weights if fitted, else the heuristic."""
+    weights = load_weights()
+    return {
+        "calibration_phase": "A_cold_start",
+        "lltm_predicted_params": predict_params(eqjs, weights) if weights else heuristic_params(eqjs),
+        "n_responses": 0,
+    }
+
+
+# ═══════════════════════════════════════════════════════════════
+# BATCH FIT (numpy)
+# ═══════════════════════════════════════════════════════════════
+
+def feature_matrix(features: list[dict]) -> tuple["np.ndarray", list[str], "np.ndarray"]:
+    """(items × features) matrix with mean imputation, the feature names, and the imputed means."""
+    columns, names = [], []
+    for name in NUMERIC_FEATURES:
+        column = np.array([f[name] if f[name] is not None else np.nan for f in features], dtype=float)
+        columns.append(column)
+        names.append(name)
+    domains = np.array([f["domain"] or "" for f in features])
+    for domain in sorted(set(domains) - {""}):
+        columns.append((domains == domain).astype(float))
+        names.append(DOMAIN_PREFIX + domain)
+    x = np.column_stack(columns) if columns else np.zeros((len(features), 0))
+    known = ~np.isnan(x)
+    means = np.where(known, x, 0.0).sum(axis=0) / np.maximum(known.sum(axis=0), 1)
+    x = np.where(known, x, means)
+    return x, names, means
+
+
+def fit_weights(x: "np.ndarray", names: list[str], means: "np.ndarray", rows: "np.ndarray",
+                y: "np.ndarray") -> dict:
+    """Ridge fit of β[rows] on features standardised over the corpus, shrunk towards the facility heuristic."""
+    sds = np.maximum(x.std(axis=0), MIN_SD)
+    z = (x - means) / sds
+    prior = np.zeros(len(names) + 1)
+    facility = names.index("facility_probit")
+    prior[0] = means[facility]
+    prior[1 + facility] = sds[facility]
+    design = np.column_stack([np.ones(len(rows)), z[rows]])
+    penalty = RIDGE * np.eye(len(prior))
+    penalty[0, 0] = 0.0  # the intercept is only anchored when there is no data at all
+    if len(y):
+        w = prior + np.linalg.solve(design.T @ design + penalty, design.T @ (y - design @ prior))
+        rmse = float(np.sqrt(((design @ w - y) ** 2).mean()))
+    else:
+        w, rmse = prior, None
+    return {
+        "features": names,
+        "means": [round(float(v), 6) for v in means],
+        "sds": [round(float(v), 6) for v in sds],
+        "intercept": round(float(w[0]), 6),
+        "weights": [round(float(v), 6) for v in w[1:]],
+        "n_items_fit": int(len(y)),
+        "rmse": round(rmse, 4) if rmse is not None else None,
+        "fitted_at": datetime.now(timezone.utc).isoformat(),
+    }
+
+
+def load_corpus(eqjs_dir: Path = EQJS_DIR) -> tuple[list[str], list[dict]]:
+    ids, items = [], []
+    for path in sorted(eqjs_dir.glob("*/*.json")):
+        with open(path) as f:
+            eqjs = json.load(f)
+        item_id = eqjs.get("metadata", {}).get("id")
+        if item_id:
+            ids.append(item_id)
+            items.append(eqjs)
+    return ids, items
+
+
+def calibrated_betas(item_params_dir: Path = ITEM_PARAMS_DIR) -> dict[str, float]:
+    out = {}
+    for path in sorted(item_params_dir.glob("*.json")) if item_params_dir.exists() else []:
+        with open(path) as f:
+            record = json.load(f)
+        params = record.get("parameters", {})
+        if params.get("model", "GPCM") == "GPCM" and "beta" in params:
+            out[record["item_id"]] = params["beta"]
+    return out
+
+
+def fit_corpus(ids: list[str], items: list[dict], betas: dict[str, float]) -> tuple[dict, dict]:
+    """Fit the weights and predict every item. Returns (weights, {item_id: params})."""
+    x, names, means = feature_matrix([item_features(eqjs) for eqjs in items])
+    index = {item_id: i for i, item_id in enumerate(ids)}
+    calibrated = [item_id for item_id in betas if item_id in index]
+    rows = np.array([index[item_id] for item_id in calibrated], dtype=int)
+    weights = fit_weights(x, names, means, rows, np.array([betas[i] for i in calibrated]))
+
+    z = (x - np.array(weights["means"])) / np.array(weights["sds"])
+    beta = weights["intercept"] + z @ np.array(weights["weights"])
+    predictions = {item_id: {"alpha": DEFAULT_ALPHA, "beta": round(float(b), 4), "d_steps": list(DEFAULT_D_STEPS)}
+                   for item_id, b in zip(ids, beta)}
+    if len(rows):
+        weights["rmse_heuristic"] = round(float(np.sqrt(((x[rows, names.index("facility_probit")]
+                                                          - np.array([betas[i] for i in calibrated])) ** 2).mean())), 4)
+    return weights, predictions
+
+
+def apply_to_ainative(predictions: dict) -> int:
+    """Refresh lltm_predicted_params in ai-native files still in cold start."""
+    import manifest
+
+    conn = manifest.connect()
+    updated = 0
+    for path in sorted(AINATIVE_DIR.glob("*/*_ainative.json")):
+        with open(path) as f:
+            data = json.load(f)
+        config = data.get("calibration_config", {})
+        params = predictions.get(data.get("source_eqjs_id"))
+        if not params or config.get("calibration_phase", "A_cold_start") != "A_cold_start":
+            continue
+        if config.get("lltm_predicted_params") == params:
+            continue
+        data["calibration_config"] = {**config, "calibration_phase": "A_cold_start", "lltm_predicted_params": params}
+        write_json(path, data)
+        manifest.record_ainative(conn, path, data.get("approval_status"))
+        updated += 1
+    return updated
+
+
+def simulate_corpus(n_items: int, seed: int = 0) -> tuple[list[str], list[dict], dict[str, float], dict]:
+    """Synthetic EQJS items; a third of them calibrated with β from known weights plus noise."""
+    rng = np.random.default_rng(seed)
+    subjects = ["biology", "chemistry", "physics", "mathematics"]
+    true = {"cognitive_level": 0.25, "facility_probit": 0.8, "n_prerequisites": 0.15,
+            "concept_complexity": 0.1, "num_reasoning_steps": 0.2}
+    domain_shift = {"biology": -0.2, "chemistry": 0.1, "physics": 0.3, "mathematics": 0.0}
+    levels = list(BLOOM_LEVELS)[:6]
+    ids, items, betas = [], [], {}
+    for i in range(n_items):
+        eqjs = {
+            "metadata": {"id": f"SIM-{i:06d}"},
+            "classification": {"subject": subjects[rng.integers(4)], "cognitive_level": levels[rng.integers(6)],
+                               "asset_percent_correct": int(rng.integers(10, 91))},
+            "semantic": {"prerequisites": ["p"] * int(rng.integers(0, 5)),
+                         "concepts": ["c"] * int(rng.integers(1, 5))},
+            "solution": {"marking_scheme": {"breakdown": [{}] * int(rng.integers(1, 5))}},
+        }
+        f = item_features(eqjs)
+        beta = sum(w * (f[n] - (3.5 if n == "cognitive_level" else 2.0 if n != "facility_probit" else 0.0))
+                   for n, w in true.items()) + domain_shift[f["domain"]]
+        ids.append(eqjs["metadata"]["id"])
+        items.append(eqjs)
+        if i % 3 == 0:
+            betas[eqjs["metadata"]["id"]] = beta + rng.normal(0, 0.3)
+    return ids, items, betas, true
+
+
+def main():
+    parser = argparse.ArgumentParser(description="LLTM cold-start fit over the EQJS corpus (V8 §6.1)")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    fit_parser = subparsers.add_parser("fit", help="Fit LLTM weights and predict every EQJS item")
+    fit_parser.add_argument("--apply", action="store_true",
+                            help="Also refresh lltm_predicted_params in cold-start ai-native files")
+    fit_parser.add_argument("--dry-run", action="store_true", help="Fit but don't write anything")
+    sim_parser = subparsers.add_parser("simulate", help="Fit a synthetic corpus with known weights")
+    sim_parser.add_argument("--items", type=int, default=50_000)
+    args = parser.parse_args()
+
+    if np is None:
+        print("ERROR: numpy package not installed. Run: pip install numpy")
+        sys.exit(1)
+
+    started = time.perf_counter()
+    if args.command == "simulate":
+        ids, items, betas, true = simulate_corpus(args.items)
+    else:
+        ids, items = load_corpus()
+        betas = calibrated_betas()
+    print(f"Loaded {len(ids)} EQJS item(s), {sum(i in betas for i in ids)} calibrated, "
+          f"in {time.perf_counter() - started:.1f}s")
+    if not ids:
+        print("Nothing to fit.")
+        return
+
+    started = time.perf_counter()
+    weights, predictions = fit_corpus(ids, items, betas)
+    print(f"Fitted {len(weights['features'])} feature weight(s) on {weights['n_items_fit']} item(s) and "
+          f"predicted {len(predictions)} item(s) in {time.perf_counter() - started:.2f}s")
+    for name, w, sd in zip(weights["features"], weights["weights"], weights["sds"]):
+        print(f"  {name:<24} {w / sd:+.3f} per unit")
+    if weights["rmse"] is not None:
+        print(f"  RMSE vs calibrated β: LLTM {weights['rmse']}, facility heuristic {weights['rmse_heuristic']}")
+
+    if args.command == "simulate":
+        for name, w in true.items():
+            estimate = weights["weights"][weights["features"].index(name)] / weights["sds"][weights["features"].index(name)]
+            print(f"  {name}: estimated {estimate:+.3f}, true {w:+.3f}")
+        return
+    if args.dry_run:
+        return
+    write_json(WEIGHTS_PATH, weights)
+    write_json(PREDICTIONS_PATH, predictions)
+    print(f"Weights written to {WEIGHTS_PATH}; predictions to {PREDICTIONS_PATH}")
+    if args.apply:
+        print(f"Updated {apply_to_ainative(predictions)} cold-start ai-native file(s)")
+
+
+if __name__ == "__main__":
+    main()
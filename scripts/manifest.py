@@ -0,0 +1,284 @@
+#!/usr/bin/env python3
+"""
+SQLite manifest of every item's pipeline state.
+
+Usage: python scripts/manifest.py reindex [--full]
+       python scripts/manifest.py status
+
+One row per item (paper_code + question number) records its stage, status,
+EQJS / AI-native file paths, content hashes and mtimes. The conversion scripts,
+the bulk importer and human_validate.py update it in a transaction whenever
+they write a file, and query it for "what needs converting" and "what is
+pending review" instead of walking eqjs/ and ai-native/ and parsing every file.
+
+Stages and statuses:
+- stage "eqjs":     status "awaiting_conversion"
+- stage "ainative": status is the file's approval_status
+                    (auto_approved, awaiting_human_validation, human_approved,
+                    rejected, failed_audit)
+
+The manifest is a derived index (metadata/pipeline-manifest.sqlite, not
+committed). It is built from disk the first time it is opened; run `reindex`
+after files change outside the scripts (e.g. a git pull). Reindexing skips
+files whose size and mtime are unchanged unless --full is given.
+"""
+
+import argparse
+import hashlib
+import json
+import re
+import sqlite3
+from datetime import datetime, timezone
+from pathlib import Path
+
+ROOT = Path(__file__).parent.parent
+EQJS_DIR = ROOT / "eqjs"
+AINATIVE_DIR = ROOT / "ai-native"
+MANIFEST_PATH = ROOT / "metadata" / "pipeline-manifest.sqlite"
+
+AWAITING_CONVERSION = "awaiting_conversion"
+PENDING_REVIEW = "awaiting_human_validation"
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS items (
+    item_id TEXT PRIMARY KEY,
+    paper_code TEXT NOT NULL,
+    qno INTEGER NOT NULL,
+    stage TEXT NOT NULL,
+    status TEXT NOT NULL,
+    eqjs_path TEXT,
+    eqjs_hash TEXT,
+    eqjs_size INTEGER,
+    eqjs_mtime REAL,
+    ainative_path TEXT,
+    ainative_hash TEXT,
+    ainative_size INTEGER,
+    ainative_mtime REAL,
+    updated_at TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS items_stage_status ON items (stage, status);
+"""
+
+EQJS_NAME = re.compile(r"^Q(\d+)\.json$")
+AINATIVE_NAME = re.compile(r"^Q(\d+)_ainative\.json$")
+
+
+def make_item_id(paper_code: str, qno: int) -> str:
+    """Manifest key for a question, e.g. Science_38124_Q7 (the --item format)."""
+    return f"{paper_code}_Q{qno}"
+
+
+def file_hash(path: Path) -> str:
+    """SHA-256 of a file's bytes."""
+    return hashlib.sha256(path.read_bytes()).hexdigest()
+
+
+def _relative(path: Path) -> str:
+    path = Path(path).resolve()
+    return str(path.relative_to(ROOT)) if path.is_relative_to(ROOT) else str(path)
+
+
+def _file_fields(path: Path, prefix: str) -> dict:
+    stat = path.stat()
+    return {
+        f"{prefix}_path": _relative(path),
+        f"{prefix}_hash": file_hash(path),
+        f"{prefix}_size": stat.st_size,
+        f"{prefix}_mtime": stat.st_mtime,
+    }
+
+
+def connect(path: Path | None = None) -> sqlite3.Connection:
+    """Open the manifest, creating it and indexing the trees on first use."""
+    path = Path(path or MANIFEST_PATH)
+    is_new = not path.exists()
+    path.parent.mkdir(parents=True, exist_ok=True)
+    conn = sqlite3.connect(path)
+    conn.row_factory = sqlite3.Row
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.executescript(SCHEMA)
+    if is_new:
+        reindex(conn)
+    return conn
+
+
+def _upsert(conn: sqlite3.Connection, paper_code: str, qno: int, stage: str, status: str,
+            fields: dict):
+    row = {
+        "item_id": make_item_id(paper_code, qno), "paper_code": paper_code, "qno": qno,
+        "stage": stage, "status": status, **fields,
+        "updated_at": datetime.now(timezone.utc).isoformat(),
+    }
+    columns = ", ".join(row)
+    placeholders = ", ".join(f":{c}" for c in row)
+    updates = ", ".join(f"{c} = excluded.{c}" for c in row if c != "item_id")
+    conn.execute(
+        f"INSERT INTO items ({columns}) VALUES ({placeholders}) "
+        f"ON CONFLICT(item_id) DO UPDATE SET {updates}",
+        row,
+    )
+
+
+def record_eqjs(conn: sqlite3.Connection, eqjs_path: Path):
+    """Record a written EQJS file. An item that is already converted keeps its stage."""
+    paper_code, qno = eqjs_path.parent.name, int(eqjs_path.stem[1:])
+    with conn:
+        existing = conn.execute("SELECT stage, status FROM items WHERE item_id = ?",
+                                (make_item_id(paper_code, qno),)).fetchone()
+        stage, status = (existing["stage"], existing["status"]) if existing and existing["stage"] != "eqjs" \
+            else ("eqjs", AWAITING_CONVERSION)
+        _upsert(conn, paper_code, qno, stage, status, _file_fields(eqjs_path, "eqjs"))
+
+
+def record_ainative(conn: sqlite3.Connection, ainative_path: Path, approval_status: str):
+    """Record a written AI-native file and its approval_status."""
+    paper_code, qno = ainative_path.parent.name, int(ainative_path.stem.split("_")[0][1:])
+    fields = _file_fields(ainative_path, "ainative")
+    eqjs_path = EQJS_DIR / paper_code / f"Q{qno}.json"
+    if eqjs_path.exists():
+        fields["eqjs_path"] = _relative(eqjs_path)
+    with conn:
+        _upsert(conn, paper_code, qno, "ainative", approval_status, fields)
+
+
+def find_unconverted(conn: sqlite3.Connection, item_filter: str | None = None) -> list[Path]:
+    """EQJS files that have no AI-native output yet, in paper/question order."""
+    query = "SELECT eqjs_path FROM items WHERE stage = 'eqjs' AND status = ?"
+    params = [AWAITING_CONVERSION]
+    if item_filter:
+        query += " AND item_id = ?"
+        params.append(item_filter)
+    rows = conn.execute(query + " ORDER BY paper_code, qno", params).fetchall()
+    return [ROOT / row["eqjs_path"] for row in rows]
+
+
+def find_by_status(conn: sqlite3.Connection, status: str) -> list[Path]:
+    """AI-native files with the given approval_status, in paper/question order."""
+    rows = conn.execute(
+        "SELECT ainative_path FROM items WHERE stage = 'ainative' AND status = ? "
+        "ORDER BY paper_code, qno", (status,),
+    ).fetchall()
+    return [ROOT / row["ainative_path"] for row in rows]
+
+
+def find_pending_review(conn: sqlite3.Connection) -> list[Path]:
+    """AI-native files awaiting human validation."""
+    return find_by_status(conn, PENDING_REVIEW)
+
+
+def has_eqjs(conn: sqlite3.Connection, paper_code: str, qno: int) -> bool:
+    """True if the manifest knows an EQJS file for this question."""
+    row = conn.execute("SELECT eqjs_path FROM items WHERE item_id = ?",
+                       (make_item_id(paper_code, qno),)).fetchone()
+    return bool(row and row["eqjs_path"])
+
+
+def _unchanged(row: sqlite3.Row | None, prefix: str, path: Path) -> bool:
+    if row is None or row[f"{prefix}_path"] != _relative(path):
+        return False
+    stat = path.stat()
+    return row[f"{prefix}_size"] == stat.st_size and row[f"{prefix}_mtime"] == stat.st_mtime
+
+
+def _scan(directory: Path, pattern: re.Pattern) -> dict[tuple[str, int], Path]:
+    found = {}
+    if not directory.exists():
+        return found
+    for paper_dir in sorted(directory.iterdir()):
+        if not paper_dir.is_dir():
+            continue
+        for f in paper_dir.iterdir():
+            match = pattern.match(f.name)
+            if match:
+                found[(paper_dir.name, int(match[1]))] = f
+    return found
+
+
+def reindex(conn: sqlite3.Connection, full: bool = False) -> dict:
+    """Rebuild the manifest from eqjs/ and ai-native/ in one transaction.
+
+    AI-native files are only re-parsed (for approval_status) when their size,
+    mtime or content hash changed, or when full is set. Returns change counts.
+    """
+    eqjs_files = _scan(EQJS_DIR, EQJS_NAME)
+    ainative_files = _scan(AINATIVE_DIR, AINATIVE_NAME)
+    existing = {row["item_id"]: row for row in conn.execute("SELECT * FROM items")}
+    counts = {"items": 0, "updated": 0, "removed": 0}
+
+    with conn:
+        for key in sorted(set(eqjs_files) | set(ainative_files)):
+            paper_code, qno = key
+            row = existing.pop(make_item_id(paper_code, qno), None)
+            counts["items"] += 1
+            eqjs_path, ainative_path = eqjs_files.get(key), ainative_files.get(key)
+
+            fields = {f"eqjs_{c}": None for c in ("path", "hash", "size", "mtime")}
+            fields.update({f"ainative_{c}": None for c in ("path", "hash", "size", "mtime")})
+            changed = row is None or full
+            if eqjs_path:
+                if not full and _unchanged(row, "eqjs", eqjs_path):
+                    fields.update({c: row[c] for c in fields if c.startswith("eqjs_")})
+                else:
+                    fields.update(_file_fields(eqjs_path, "eqjs"))
+                    changed = True
+            elif row is not None and row["eqjs_path"]:
+                changed = True
+
+            if ainative_path:
+                if not full and _unchanged(row, "ainative", ainative_path):
+                    fields.update({c: row[c] for c in fields if c.startswith("ainative_")})
+                    stage, status = row["stage"], row["status"]
+                else:
+                    fields.update(_file_fields(ainative_path, "ainative"))
+                    if not full and row is not None and row["ainative_hash"] == fields["ainative_hash"]:
+                        status = row["status"]
+                    else:
+                        with open(ainative_path) as f:
+                            status = json.load(f).get("approval_status", "unknown")
+                    stage = "ainative"
+                    changed = True
+            else:
+                stage, status = "eqjs", AWAITING_CONVERSION
+                if row is not None and row["stage"] != "eqjs":
+                    changed = True
+
+            if changed:
+                _upsert(conn, paper_code, qno, stage, status, fields)
+                counts["updated"] += 1
+
+        for item_id in existing:
+            conn.execute("DELETE FROM items WHERE item_id = ?", (item_id,))
+            counts["removed"] += 1
+
+    return counts
+
+
+def status_counts(conn: sqlite3.Connection) -> dict[str, int]:
+    """Number of items per (stage, status)."""
+    rows = conn.execute(
+        "SELECT stage, status, COUNT(*) AS n FROM items GROUP BY stage, status ORDER BY stage, status"
+    ).fetchall()
+    return {f"{row['stage']}/{row['status']}": row["n"] for row in rows}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Pipeline manifest index")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    reindex_parser = subparsers.add_parser("reindex", help="Rebuild the manifest from disk")
+    reindex_parser.add_argument("--full", action="store_true",
+                                help="Rehash and re-parse every file, ignoring size/mtime")
+    subparsers.add_parser("status", help="Print item counts per stage and status")
+    args = parser.parse_args()
+
+    conn = connect()
+    if args.command == "reindex":
+        counts = reindex(conn, full=args.full)
+        print(f"Indexed {counts['items']} item(s): {counts['updated']} updated, "
+              f"{counts['removed']} removed")
+    for key, n in status_counts(conn).items():
+        print(f"  {key}: {n}")
+    conn.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,281 @@
+#!/usr/bin/env python3
+"""
+D-optimal examinee selection for Phase B online calibration (V8 manual §6.1).
+
+Usage: python scripts/online_calibration.py status [--sessions GLOB]
+       python scripts/online_calibration.py simulate [--items N] [--waiting N] [--decisions N]
+
+An item in Phase B (fewer than OPERATIONAL_RESPONSES responses) should be
+routed to the waiting examinee whose response adds the most information about
+its parameters: d_optimal_select_examinee picks the θ maximising
+det(M + I(θ)), M the item's cumulative information matrix.
+
+Algorithm: both item models are multinomial logits linear in their free
+parameters w (calibrate_items.py), so one response at θ carries information
+I(θ) = U(θ)ᵀ U(θ), with rows U_k = √P_k (x_k - x̄) over the K categories (rank
+K - 1; rank one for a dichotomous item). By the matrix determinant lemma
+
+    det(M + Uᵀ U) = det(M) · det(I_K + U M⁻¹ Uᵀ)
+
+so with M⁻¹ held per item, every waiting examinee is scored at once from a
+(candidates, K, K) batch of small determinants; det(M) is common and drops out.
+Recording a response updates M⁻¹ by Woodbury and log det M by the same factor,
+so nothing is refactorised during a session. M starts from the M-step prior
+precision (PRIOR_SD), which keeps it invertible and makes M⁻¹ the covariance
+calibrate_items.py would report. When an item is re-estimated (Phase B batches
+at N = 50, 100, 150, 200), set_params() rebuilds M at the new parameters from
+the stored θs of its past responses.
+
+status: replays the §8.1 session logs (each response at the session's
+theta_final) against the current §8.2 records or cold-start LLTM parameters
+and prints the Phase B items with their response count, log det M and
+parameter standard errors.
+
+Scope: this module is the selector and its offline tools only. Nothing routes
+live traffic through it yet: session_server.py's DiagnosticService picks each
+student's next item by its own routing and never calls select_examinee or
+record_response, and there is no pool of waiting examinees to choose from.
+No selector state is persisted either, so status rebuilds every matrix from
+the session logs on each run. Hooking the selector into the session save path
+needs that examinee queue first.
+
+simulate: times routing decisions over a synthetic pool of Phase B items and
+waiting examinees, and checks the picks against the full per-candidate
+determinant of the §6.1 pseudocode.
+
+Requires numpy (see eap_scoring.py).
+"""
+
+import argparse
+import random
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent))
+from eap_scoring import ROUTING_LOK
+from calibrate_items import (AINATIVE_DIR, GPCM_CATEGORIES, OPERATIONAL_RESPONSES, PRIOR_SD, design_at, gpcm_to_w,
+                             load_lltm_params, load_records, nrm_to_w, start_w)
+from calibration_io import SESSION_LOG_DIR, SESSION_PATTERN, iter_session_records
+from telemetry import percentile
+
+import numpy as np
+
+SIM_MAX_PRELOAD = 150  # simulated items start with 0..149 past responses
+SIM_NAIVE_CHECKS = 20
+
+
+# ═══════════════════════════════════════════════════════════════
+# INFORMATION
+# ═══════════════════════════════════════════════════════════════
+
+def information_factors(model: str, n_categories: int, w: np.ndarray, theta) -> np.ndarray:
+    """Factors U (len(theta), categories, params) with I(θ) = Uᵀ U."""
+    x = design_at(model, n_categories, np.atleast_1d(theta))
+    logits = x @ w
+    logits -= logits.max(axis=0)
+    p = np.exp(logits)
+    p /= p.sum(axis=0)
+    x_bar = np.einsum("kn,knp->np", p, x)
+    u = np.sqrt(p)[:, :, None] * (x - x_bar[None])
+    return u.transpose(1, 0, 2)
+
+
+class OnlineItem:
+    """Cumulative information matrix of one Phase B item, updated per response."""
+
+    def __init__(self, item_id: str, model: str, categories: list, w: np.ndarray):
+        self.item_id = item_id
+        self.model = model
+        self.categories = list(categories)
+        self.thetas = []
+        self.set_params(w)
+
+    @property
+    def n_responses(self) -> int:
+        return len(self.thetas)
+
+    def factors(self, theta) -> np.ndarray:
+        return information_factors(self.model, len(self.categories), self.w, theta)
+
+    def set_params(self, w: np.ndarray):
+        """Re-centre on new parameters, rebuilding M from the past responses."""
+        self.w = np.asarray(w, dtype=float)
+        info = np.eye(len(self.w)) / PRIOR_SD ** 2
+        if self.thetas:
+            u = self.factors(self.thetas)
+            info += np.einsum("nkp,nkq->pq", u, u)
+        self.info = info
+        self.inverse = np.linalg.inv(info)
+        self.log_det = float(np.linalg.slogdet(info)[1])
+
+    def log_gains(self, thetas) -> np.ndarray:
+        """log det(M + I(θ)) - log det M for each candidate θ."""
+        u = self.factors(thetas)
+        g = u @ self.inverse @ u.transpose(0, 2, 1)
+        g += np.eye(g.shape[1])
+        return np.linalg.slogdet(g)[1]
+
+    def add(self, theta: float):
+        """Record one response at θ: Woodbury update of M⁻¹ and log det M."""
+        u = self.factors(theta)[0]
+        mu = self.inverse @ u.T
+        g = np.eye(len(u)) + u @ mu
+        self.inverse -= mu @ np.linalg.solve(g, mu.T)
+        self.info += u.T @ u
+        self.log_det += float(np.linalg.slogdet(g)[1])
+        self.thetas.append(float(theta))
+
+    def standard_errors(self) -> np.ndarray:
+        return np.sqrt(np.diag(self.inverse))
+
+
+class DOptimalSelector:
+    """Phase B items and d_optimal_select_examinee over waiting examinees.
+
+    Not wired into DiagnosticService (see the module docstring): callers build it
+    with from_sessions() and drive select_examinee/record_response themselves.
+    """
+
+    def __init__(self):
+        self.items = {}
+
+    def add_item(self, item_id: str, model: str, categories: list, w: np.ndarray) -> OnlineItem:
+        item = OnlineItem(item_id, model, categories, w)
+        self.items[item_id] = item
+        return item
+
+    def select_examinee(self, item_id: str, thetas) -> tuple[int, float]:
+        """Index of the candidate θ maximising det(M + I(θ)), and its log gain."""
+        gains = self.items[item_id].log_gains(thetas)
+        best = int(gains.argmax())
+        return best, float(gains[best])
+
+    def record_response(self, item_id: str, theta: float):
+        self.items[item_id].add(theta)
+
+    def phase_b(self) -> list[OnlineItem]:
+        return [item for item in self.items.values() if item.n_responses < OPERATIONAL_RESPONSES]
+
+    @classmethod
+    def from_sessions(cls, pattern: str = SESSION_PATTERN, records: dict | None = None,
+                      lltm: dict | None = None) -> "DOptimalSelector":
+        """Replay §8.1 session logs, each response at the session's theta_final."""
+        records = records or {}
+        lltm = lltm or {}
+        responses = {}
+        for record in iter_session_records(pattern):
+            theta = record.get("estimation", {}).get("theta_final", {}).get("mean")
+            cascade = record.get("cascade", {})
+            if theta is None:
+                continue
+            for tier, key in (("T1", "T1T2_joint_score"), ("T3", "T3_maps_to"), ("T4", "T4_maps_to")):
+                item_id, category = cascade.get(f"{tier}_item_id"), cascade.get(key)
+                if item_id and category is not None and category != ROUTING_LOK:
+                    responses.setdefault(item_id, (tier, []))[1].append((theta, category))
+
+        selector = cls()
+        for item_id, (tier, seen) in responses.items():
+            if tier == "T1":
+                spec = {"model": "GPCM", "categories": GPCM_CATEGORIES}
+            else:
+                slopes = records.get(item_id, {}).get("parameters", {}).get("category_slopes", {})
+                categories = list(slopes) or list(dict.fromkeys(c for _, c in seen))
+                if len(categories) < 2:
+                    continue
+                spec = {"model": "NRM", "categories": categories}
+            item = selector.add_item(item_id, spec["model"], spec["categories"],
+                                     start_w(spec, records.get(item_id), lltm.get(item_id)))
+            item.thetas = [theta for theta, _ in seen]
+            item.set_params(item.w)
+        return selector
+
+
+# ═══════════════════════════════════════════════════════════════
+# SIMULATION
+# ═══════════════════════════════════════════════════════════════
+
+def naive_select(item: OnlineItem, thetas: np.ndarray) -> int:
+    """§6.1 pseudocode: full determinant of M + I(θ) per candidate."""
+    best, best_det = None, -np.inf
+    for i, theta in enumerate(thetas):
+        u = item.factors(theta)[0]
+        det_new = np.linalg.slogdet(item.info + u.T @ u)[1]
+        if det_new > best_det:
+            best, best_det = i, det_new
+    return best
+
+
+def simulate(n_items: int, n_waiting: int, n_decisions: int, seed: int = 0):
+    rng = np.random.default_rng(seed)
+    py_rng = random.Random(seed)
+    selector = DOptimalSelector()
+    for i in range(n_items):
+        if i % 3 == 0:
+            k = int(rng.integers(3, 6))
+            slopes = np.sort(rng.normal(0, 1, k))
+            w = nrm_to_w(slopes, rng.normal(0, 0.5, k))
+            item = selector.add_item(f"SIM-{i:05d}_T3", "NRM", [f"c{c}" for c in range(k)], w)
+        else:
+            w = gpcm_to_w(rng.lognormal(0, 0.3), rng.normal(0, 1), sorted(rng.normal(0, 0.7, 3)))
+            item = selector.add_item(f"SIM-{i:05d}", "GPCM", GPCM_CATEGORIES, w)
+        item.thetas = list(rng.normal(0, 1, int(rng.integers(0, SIM_MAX_PRELOAD))))
+        item.set_params(item.w)
+
+    waiting = rng.normal(0, 1, n_waiting)
+    item_ids = list(selector.items)
+    latencies, agree, checked = [], 0, 0
+    naive_seconds = fast_seconds = 0.0
+    for decision in range(n_decisions):
+        item_id = py_rng.choice(item_ids)
+        reference = None
+        if decision % max(1, n_decisions // SIM_NAIVE_CHECKS) == 0:
+            started = time.perf_counter()
+            reference = naive_select(selector.items[item_id], waiting)
+            naive_seconds += time.perf_counter() - started
+        started = time.perf_counter()
+        best, _ = selector.select_examinee(item_id, waiting)
+        selector.record_response(item_id, waiting[best])
+        elapsed = time.perf_counter() - started
+        latencies.append(elapsed * 1000)
+        if reference is not None:
+            fast_seconds += elapsed
+            checked += 1
+            agree += reference == best
+        waiting[best] = rng.normal(0, 1)
+
+    drift = max(np.abs(item.inverse - np.linalg.inv(item.info)).max() for item in selector.items.values())
+    print(f"{n_decisions} routing decision(s) over {n_items} item(s) and {n_waiting} waiting examinee(s)")
+    print(f"  latency per decision: p50 {percentile(latencies, 50):.3f}ms, "
+          f"p95 {percentile(latencies, 95):.3f}ms, max {max(latencies):.3f}ms")
+    print(f"  full-determinant reference: {agree}/{checked} identical pick(s), "
+          f"{naive_seconds / max(fast_seconds, 1e-9):.0f}x slower")
+    print(f"  max |M⁻¹ (Woodbury) - inv(M)|: {drift:.2e}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="D-optimal examinee selection for Phase B online calibration")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    status_parser = subparsers.add_parser("status", help="Information accumulated by Phase B items")
+    status_parser.add_argument("--sessions", default=SESSION_PATTERN,
+                               help=f"Session log glob in {SESSION_LOG_DIR.relative_to(SESSION_LOG_DIR.parents[1])}")
+    sim_parser = subparsers.add_parser("simulate", help="Time routing decisions on a synthetic pool")
+    sim_parser.add_argument("--items", type=int, default=500)
+    sim_parser.add_argument("--waiting", type=int, default=5000)
+    sim_parser.add_argument("--decisions", type=int, default=2000)
+    args = parser.parse_args()
+
+    if args.command == "simulate":
+        simulate(args.items, args.waiting, args.decisions)
+        return
+
+    selector = DOptimalSelector.from_sessions(args.sessions, load_records(), load_lltm_params(AINATIVE_DIR))
+    items = sorted(selector.phase_b(), key=lambda item: item.n_responses)
+    print(f"{len(items)} Phase B item(s) of {len(selector.items)} with responses")
+    for item in items:
+        se = ", ".join(f"{s:.2f}" for s in item.standard_errors())
+        print(f"  {item.item_id:<24} {item.model} n={item.n_responses:<4} log det M {item.log_det:+.2f}  SE(w) [{se}]")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,483 @@
+#!/usr/bin/env python3
+"""
+Memory-mapped student profile store for §5.4 prior initialisation.
+
+Usage: python scripts/profile_store.py import FILE.jsonl [--capacity N]
+       python scripts/profile_store.py export [--output FILE.jsonl]
+       python scripts/profile_store.py stats
+       python scripts/profile_store.py simulate [--students N] [--workers N]
+
+initialize_prior() needs each student's last θ/SE at session start. Profiles
+live in one fixed-width file, metadata/student-profiles/profiles.dat, rather
+than a JSON file per student, so a lookup is one hash and one page of the
+memory map:
+
+  header   RECORD_SIZE bytes: magic, version, record size, capacity, count, moved
+  slot i   RECORD_SIZE bytes at (i + 1) · RECORD_SIZE; four slots per 4 KiB page
+           key hash, student_id, last θ/SE, last update, session count,
+           DIF grouping attributes (gender, medium_of_instruction,
+           board_of_origin), then CONCEPT_SLOTS × (concept_id, θ, SE, updated)
+
+Slots form an open-addressed hash table (blake2b of the student_id, linear
+probing). The file is created sparse, but hashing spreads students over
+nearly every page, so expect disk use close to (capacity + 1) · RECORD_SIZE
+once the table is even lightly loaded. A key is never removed once written,
+so probing reads the map without locking. student_ids must be strings of at
+most STUDENT_ID_BYTES bytes (validate_student_id); a concept_id longer than
+CONCEPT_ID_BYTES is stored as "#" + its blake2b hex digest (concept_key).
+- Reads take a shared fcntl lock on the slot; θ/SE updates an exclusive one,
+  so readers never see a half-written slot and concurrent writers in other
+  processes (session server, imports) do not lose updates.
+- Inserts claim a slot under an exclusive lock on the header. Past MAX_LOAD
+  the table is rehashed at twice the capacity into a new file under a lock
+  on the whole file, the old header is marked moved, and the new file
+  replaces it; other processes see the mark and reopen. Growth copies the
+  whole table and blocks every other caller until it finishes, so size
+  large stores up front (import --capacity); the session server makes all
+  store calls from a worker thread, never on its event loop.
+- Calls on one ProfileStore are serialised by a thread lock (fcntl locks
+  only exclude other processes).
+- A student's concept slots keep the CONCEPT_SLOTS most recently updated
+  concepts; the oldest is overwritten when a new concept arrives.
+
+import loads {"student_id", "last_theta_estimate"?, "last_theta_se"?,
+"gender"?, "medium_of_instruction"?, "board_of_origin"?, "concepts"?: {id:
+{"theta", "se"}}} lines (e.g. the metadata/student-profiles/profiles.jsonl of
+the implementation guide), merging into existing profiles (session counts
+add up). export writes every profile back in that shape.
+simulate times lookups and updates on a scratch store and checks that
+concurrent writer processes lose no updates.
+"""
+
+import argparse
+import fcntl
+import hashlib
+import json
+import math
+import mmap
+import os
+import random
+import struct
+import sys
+import tempfile
+import threading
+import time
+from multiprocessing import Process
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent))
+from telemetry import percentile
+
+ROOT = Path(__file__).parent.parent
+PROFILE_DIR = ROOT / "metadata" / "student-profiles"
+PROFILE_STORE_PATH = PROFILE_DIR / "profiles.dat"
+
+MAGIC = b"V8PROFS\0"
+VERSION = 1
+RECORD_SIZE = 1024
+DEFAULT_CAPACITY = 1 << 16
+MAX_LOAD = 0.7
+ATTRIBUTES = {"gender": 16, "medium_of_instruction": 24, "board_of_origin": 24}
+
+HEADER = struct.Struct("<8sIIQQI")
+MOVED_OFFSET = 8 + 4 + 4 + 8 + 8
+SLOT = struct.Struct("<Q48sdddI" + "".join(f"{n}s" for n in ATTRIBUTES.values()) + "H2x")
+CONCEPT = struct.Struct("<40sffd")
+CONCEPT_SLOTS = (RECORD_SIZE - SLOT.size) // CONCEPT.size
+STUDENT_ID_BYTES = 48
+CONCEPT_ID_BYTES = 40
+
+
+def key_hash(student_id: str) -> int:
+    """Non-zero 64-bit hash (zero marks an empty slot)."""
+    return int.from_bytes(hashlib.blake2b(student_id.encode(), digest_size=8).digest(), "little") | 1
+
+
+def _encode(value: str | None, size: int, field: str) -> bytes:
+    data = (value or "").encode()
+    if len(data) > size:
+        raise ValueError(f"{field} longer than {size} bytes: {value!r}")
+    return data
+
+
+def validate_student_id(student_id) -> str:
+    """The student_id if it can key the store, else ValueError."""
+    if not isinstance(student_id, str) or not student_id:
+        raise ValueError(f"student_id must be a non-empty string, got {student_id!r}")
+    if len(student_id.encode()) > STUDENT_ID_BYTES:
+        raise ValueError(f"student_id longer than {STUDENT_ID_BYTES} bytes: {student_id!r}")
+    return student_id
+
+
+def concept_key(concept_id: str) -> str:
+    """concept_id as stored: itself, or "#" + a 16-byte blake2b hex digest if too long."""
+    if len(concept_id.encode()) <= CONCEPT_ID_BYTES:
+        return concept_id
+    return "#" + hashlib.blake2b(concept_id.encode(), digest_size=16).hexdigest()
+
+
+def _decode(data: bytes) -> str:
+    return data.rstrip(b"\0").decode()
+
+
+def _number(value: float) -> float | None:
+    return None if math.isnan(value) else round(value, 4)
+
+
+class ProfileStore:
+    """Fixed-width, memory-mapped profiles keyed by student_id."""
+
+    def __init__(self, path: Path = PROFILE_STORE_PATH, writable: bool = False,
+                 capacity: int = DEFAULT_CAPACITY):
+        self.path = Path(path)
+        self.writable = writable
+        self._lock = threading.Lock()
+        if writable and not self.path.exists():
+            self._create(self.path, capacity)
+        self._open()
+
+    # ─── file handling ───
+
+    @staticmethod
+    def _create(path: Path, capacity: int):
+        if capacity & (capacity - 1):
+            raise ValueError(f"capacity must be a power of two, got {capacity}")
+        path.parent.mkdir(parents=True, exist_ok=True)
+        temp_path = path.with_suffix(".tmp")
+        with open(temp_path, "wb") as f:
+            f.write(HEADER.pack(MAGIC, VERSION, RECORD_SIZE, capacity, 0, 0))
+            f.truncate((capacity + 1) * RECORD_SIZE)
+        os.replace(temp_path, path)
+
+    def _open(self):
+        self._file = open(self.path, "r+b" if self.writable else "rb")
+        access = mmap.ACCESS_WRITE if self.writable else mmap.ACCESS_READ
+        self._map = mmap.mmap(self._file.fileno(), 0, access=access)
+        magic, version, record_size, capacity, _, _ = HEADER.unpack_from(self._map, 0)
+        if magic != MAGIC or version != VERSION or record_size != RECORD_SIZE:
+            raise ValueError(f"{self.path} is not a version {VERSION} profile store")
+        self.capacity = capacity
+
+    def _reopen_if_moved(self):
+        if self._map[MOVED_OFFSET]:
+            self.close()
+            self._open()
+
+    def close(self):
+        self._map.close()
+        self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def _range_lock(self, mode: int, offset: int, length: int):
+        fcntl.lockf(self._file, mode, length, offset)
+
+    def _unlock(self, offset: int, length: int):
+        fcntl.lockf(self._file, fcntl.LOCK_UN, length, offset)
+
+    @property
+    def count(self) -> int:
+        return HEADER.unpack_from(self._map, 0)[4]
+
+    # ─── slots ───
+
+    def _find(self, student_id: str, encoded: bytes) -> tuple[int, bool]:
+        """(slot offset, found): the student's slot, or the empty slot ending its probe."""
+        h = key_hash(student_id)
+        mask = self.capacity - 1
+        i = h & mask
+        while True:
+            offset = (i + 1) * RECORD_SIZE
+            stored = int.from_bytes(self._map[offset:offset + 8], "little")
+            if stored == 0:
+                return offset, False
+            if stored == h and self._map[offset + 8:offset + 8 + STUDENT_ID_BYTES].rstrip(b"\0") == encoded:
+                return offset, True
+            i = (i + 1) & mask
+
+    def _read(self, offset: int) -> dict:
+        fields = SLOT.unpack_from(self._map, offset)
+        _, student_id, theta, se, updated, n_sessions, *attributes, n_concepts = fields
+        profile = {
+            "student_id": _decode(student_id),
+            "last_theta_estimate": _number(theta),
+            "last_theta_se": _number(se),
+            "last_updated": None if math.isnan(updated) else updated,
+            "n_sessions": n_sessions,
+        }
+        profile.update({name: _decode(value) or None for name, value in zip(ATTRIBUTES, attributes)})
+        concepts = {}
+        for c in range(n_concepts):
+            concept_id, c_theta, c_se, c_updated = CONCEPT.unpack_from(self._map, offset + SLOT.size + c * CONCEPT.size)
+            concepts[_decode(concept_id)] = {"theta": _number(c_theta), "se": _number(c_se), "updated": c_updated}
+        profile["concepts"] = concepts
+        return profile
+
+    def get(self, student_id: str) -> dict | None:
+        """The student's profile (§5.4 load_student_history), or None."""
+        encoded = validate_student_id(student_id).encode()
+        with self._lock:
+            self._reopen_if_moved()
+            offset, found = self._find(student_id, encoded)
+            if not found:
+                return None
+            self._range_lock(fcntl.LOCK_SH, offset, RECORD_SIZE)
+            try:
+                return self._read(offset)
+            finally:
+                self._unlock(offset, RECORD_SIZE)
+
+    def _slot_for_update(self, student_id: str) -> int:
+        """Offset of the student's slot, inserting it if new; returns with the slot locked."""
+        encoded = validate_student_id(student_id).encode()
+        while True:
+            self._reopen_if_moved()
+            offset, found = self._find(student_id, encoded)
+            if not found:
+                offset = self._insert(student_id, encoded)
+                if offset is None:
+                    continue
+            self._range_lock(fcntl.LOCK_EX, offset, RECORD_SIZE)
+            if not self._map[MOVED_OFFSET]:
+                return offset
+            self._unlock(offset, RECORD_SIZE)
+
+    def _insert(self, student_id: str, encoded: bytes) -> int | None:
+        """Claim a slot under the header lock; None if the table moved meanwhile."""
+        self._range_lock(fcntl.LOCK_EX, 0, RECORD_SIZE)
+        try:
+            if self._map[MOVED_OFFSET]:
+                return None
+            offset, found = self._find(student_id, encoded)
+            if found:
+                return offset
+            if self.count + 1 > MAX_LOAD * self.capacity:
+                self._grow()
+                return None
+            empty = SLOT.pack(0, encoded, math.nan, math.nan, math.nan, 0, *(b"" for _ in ATTRIBUTES), 0)
+            self._map[offset + 8:offset + SLOT.size] = empty[8:]
+            self._map[offset:offset + 8] = key_hash(student_id).to_bytes(8, "little")
+            struct.pack_into("<Q", self._map, 24, self.count + 1)
+            return offset
+        finally:
+            self._unlock(0, RECORD_SIZE)
+
+    def _grow(self):
+        """Rehash into a table twice the size; the caller holds the header lock."""
+        self._range_lock(fcntl.LOCK_EX, 0, 0)
+        try:
+            temp_path = self.path.with_suffix(".grow")
+            self._create(temp_path, self.capacity * 2)
+            with ProfileStore(temp_path, writable=True) as bigger:
+                for offset in self._occupied():
+                    record = self._map[offset:offset + RECORD_SIZE]
+                    student_id = _decode(record[8:8 + STUDENT_ID_BYTES])
+                    target, _ = bigger._find(student_id, student_id.encode())
+                    bigger._map[target:target + RECORD_SIZE] = record
+                struct.pack_into("<Q", bigger._map, 24, self.count)
+                bigger._map.flush()
+            os.replace(temp_path, self.path)
+            self._map[MOVED_OFFSET] = 1
+            self._map.flush()
+        finally:
+            self._unlock(0, 0)
+
+    def _occupied(self):
+        for i in range(self.capacity):
+            offset = (i + 1) * RECORD_SIZE
+            if self._map[offset:offset + 8] != b"\0" * 8:
+                yield offset
+
+    # ─── updates ───
+
+    def update_theta(self, student_id: str, concept_id: str | None, theta: float, se: float,
+                     timestamp: float | None = None, sessions: int = 1):
+        """Record a session's final θ/SE as the student's and the concept's latest.
+
+        sessions is added to the session count (imports carry their own count).
+        """
+        timestamp = time.time() if timestamp is None else timestamp
+        concept = concept_key(concept_id).encode() if concept_id else None
+        with self._lock:
+            offset = self._slot_for_update(student_id)
+            try:
+                n_sessions, n_concepts = (struct.unpack_from("<I", self._map, offset + 80)[0],
+                                          struct.unpack_from("<H", self._map, offset + SLOT.size - 4)[0])
+                struct.pack_into("<dddI", self._map, offset + 56, theta, se, timestamp, n_sessions + sessions)
+                if concept is not None:
+                    base = offset + SLOT.size
+                    slots = [CONCEPT.unpack_from(self._map, base + c * CONCEPT.size) for c in range(n_concepts)]
+                    ids = [s[0].rstrip(b"\0") for s in slots]
+                    if concept in ids:
+                        c = ids.index(concept)
+                    elif n_concepts < CONCEPT_SLOTS:
+                        c = n_concepts
+                        struct.pack_into("<H", self._map, offset + SLOT.size - 4, n_concepts + 1)
+                    else:
+                        c = min(range(n_concepts), key=lambda k: slots[k][3])
+                    CONCEPT.pack_into(self._map, base + c * CONCEPT.size, concept, theta, se, timestamp)
+            finally:
+                self._unlock(offset, RECORD_SIZE)
+
+    def set_attributes(self, student_id: str, **attributes):
+        """Set DIF grouping attributes (gender, medium_of_instruction, board_of_origin)."""
+        unknown = set(attributes) - set(ATTRIBUTES)
+        if unknown:
+            raise ValueError(f"Unknown profile attribute(s): {sorted(unknown)}")
+        with self._lock:
+            offset = self._slot_for_update(student_id)
+            try:
+                position = offset + 84
+                for name, size in ATTRIBUTES.items():
+                    if name in attributes:
+                        self._map[position:position + size] = _encode(attributes[name], size, name).ljust(size, b"\0")
+                    position += size
+            finally:
+                self._unlock(offset, RECORD_SIZE)
+
+    # ─── bulk ───
+
+    def __iter__(self):
+        with self._lock:
+            self._reopen_if_moved()
+            self._range_lock(fcntl.LOCK_SH, 0, 0)
+            try:
+                for offset in self._occupied():
+                    yield self._read(offset)
+            finally:
+                self._unlock(0, 0)
+
+    def import_profiles(self, path: Path) -> int:
+        n = 0
+        with open(path) as f:
+            for r in map(json.loads, filter(str.strip, f)):
+                attributes = {name: r[name] for name in ATTRIBUTES if r.get(name) is not None}
+                if attributes:
+                    self.set_attributes(r["student_id"], **attributes)
+                concepts = sorted((r.get("concepts") or {}).items(), key=lambda kv: kv[1].get("updated") or 0)
+                updates = [(concept_id, c["theta"], c["se"], c.get("updated")) for concept_id, c in concepts]
+                if r.get("last_theta_estimate") is not None:
+                    updates.append((None, r["last_theta_estimate"], r.get("last_theta_se", 1.0), r.get("last_updated")))
+                for k, update in enumerate(updates):
+                    last = k == len(updates) - 1
+                    self.update_theta(r["student_id"], *update, sessions=r.get("n_sessions", 1) if last else 0)
+                n += 1
+        return n
+
+    def export(self, path: Path) -> int:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        temp_path = path.with_suffix(".tmp")
+        n = 0
+        with open(temp_path, "w") as f:
+            for profile in self:
+                f.write(json.dumps(profile) + "\n")
+                n += 1
+        os.replace(temp_path, path)
+        return n
+
+
+def open_store(path: Path = PROFILE_STORE_PATH, writable: bool = False) -> ProfileStore | None:
+    """The profile store, or None if it does not exist and is opened read-only."""
+    if not writable and not Path(path).exists():
+        return None
+    return ProfileStore(path, writable=writable)
+
+
+# ═══════════════════════════════════════════════════════════════
+# SIMULATION
+# ═══════════════════════════════════════════════════════════════
+
+def _hammer(path: Path, worker: int, n_updates: int, n_students: int):
+    rng = random.Random(worker)
+    with ProfileStore(path, writable=True) as store:
+        for _ in range(n_updates):
+            store.update_theta(f"SIM-{rng.randrange(n_students):07d}", f"C{rng.randrange(20)}",
+                               rng.gauss(0, 1), 0.3)
+
+
+def simulate(n_students: int, n_workers: int, seed: int = 0):
+    rng = random.Random(seed)
+    with tempfile.TemporaryDirectory() as tmp:
+        path = Path(tmp) / "profiles.dat"
+        started = time.perf_counter()
+        with ProfileStore(path, writable=True, capacity=1024) as store:
+            for s in range(n_students):
+                store.update_theta(f"SIM-{s:07d}", f"C{s % 20}", rng.gauss(0, 1), 0.4)
+            build = time.perf_counter() - started
+            print(f"Inserted {n_students} profile(s) in {build:.2f}s (capacity grew to {store.capacity}, "
+                  f"{path.stat().st_size / 2 ** 20:.0f} MiB file, "
+                  f"{path.stat().st_blocks * 512 / 2 ** 20:.0f} MiB on disk)")
+
+            reads, writes = [], []
+            for _ in range(20000):
+                student_id = f"SIM-{rng.randrange(n_students):07d}"
+                t = time.perf_counter()
+                store.get(student_id)
+                reads.append((time.perf_counter() - t) * 1e6)
+                t = time.perf_counter()
+                store.update_theta(student_id, f"C{rng.randrange(20)}", rng.gauss(0, 1), 0.3)
+                writes.append((time.perf_counter() - t) * 1e6)
+            print(f"  get:          p50 {percentile(reads, 50):.1f}us, p95 {percentile(reads, 95):.1f}us")
+            print(f"  update_theta: p50 {percentile(writes, 50):.1f}us, p95 {percentile(writes, 95):.1f}us")
+
+            t = time.perf_counter()
+            exported = store.export(Path(tmp) / "profiles.jsonl")
+            print(f"  export: {exported} profile(s) in {time.perf_counter() - t:.2f}s")
+            before = sum(p["n_sessions"] for p in store)
+
+        per_worker = 5000
+        workers = [Process(target=_hammer, args=(path, w, per_worker, n_students * 2)) for w in range(n_workers)]
+        t = time.perf_counter()
+        for w in workers:
+            w.start()
+        for w in workers:
+            w.join()
+        with ProfileStore(path) as store:
+            after = sum(p["n_sessions"] for p in store)
+            print(f"  {n_workers} concurrent writer(s), {n_workers * per_worker} update(s) in "
+                  f"{time.perf_counter() - t:.2f}s: {after - before} recorded, {store.count} profile(s)")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Memory-mapped student profile store")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    import_parser = subparsers.add_parser("import", help="Load profiles from JSONL")
+    import_parser.add_argument("file", type=str)
+    import_parser.add_argument("--capacity", type=int, default=DEFAULT_CAPACITY,
+                               help=f"Initial slots for a new store, a power of two (default: {DEFAULT_CAPACITY})")
+    export_parser = subparsers.add_parser("export", help="Write every profile as JSONL")
+    export_parser.add_argument("--output", type=str, default=str(PROFILE_DIR / "profiles.jsonl"))
+    subparsers.add_parser("stats", help="Size and load of the store")
+    sim_parser = subparsers.add_parser("simulate", help="Time lookups and updates on a scratch store")
+    sim_parser.add_argument("--students", type=int, default=200_000)
+    sim_parser.add_argument("--workers", type=int, default=4)
+    args = parser.parse_args()
+
+    if args.command == "simulate":
+        simulate(args.students, args.workers)
+        return
+    if args.command == "import":
+        with ProfileStore(PROFILE_STORE_PATH, writable=True, capacity=args.capacity) as store:
+            n = store.import_profiles(Path(args.file))
+            print(f"Imported {n} profile(s); {store.count} in {PROFILE_STORE_PATH.relative_to(ROOT)}")
+        return
+
+    store = open_store()
+    if store is None:
+        print(f"No profile store at {PROFILE_STORE_PATH.relative_to(ROOT)}")
+        return
+    with store:
+        if args.command == "export":
+            n = store.export(Path(args.output))
+            print(f"Exported {n} profile(s) to {args.output}")
+        else:
+            print(f"{store.count} profile(s) in {store.capacity} slot(s) "
+                  f"(load {store.count / store.capacity:.2f}, {CONCEPT_SLOTS} concept slot(s) each)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,99 @@
+#!/usr/bin/env python3
+"""
+Prompt-prefix caching for the large static system prompts.
+
+The working-state capsule (raw -> EQJS) and the four V8 stage prompts
+(EQJS -> AI-native) are resent verbatim on every call. Marking them with
+cache_control lets the API serve the prefix from its prompt cache: cache reads
+are billed at 10% of the input price, cache writes at 125%.
+
+Each prompt is sent unchanged as its own system block. The API ignores
+cache_control on a prefix shorter than MIN_CACHEABLE_TOKENS, so
+cached_system_prompt only marks a prompt whose estimated length clears the
+minimum; shorter ones (the capsule, the inline fallback stage prompts) are sent
+as plain text rather than paying the cache-write premium for nothing.
+
+PromptCacheStats accumulates the cache-read / cache-write / uncached input
+token counts from each response's usage, so each run can report what the
+prefix cache saved.
+"""
+
+CACHE_READ_PRICE = 0.1
+CACHE_WRITE_PRICE = 1.25
+MIN_CACHEABLE_TOKENS = 1024  # Sonnet's minimum cacheable prompt length
+CHARS_PER_TOKEN = 4  # rough estimate; JSON and markdown run denser
+
+
+def estimate_tokens(text: str) -> int:
+    """Rough token count of a prompt, at CHARS_PER_TOKEN characters per token."""
+    return len(text) // CHARS_PER_TOKEN
+
+
+def cached_system_prompt(system_prompt: str) -> list[dict]:
+    """Wrap a static system prompt as one block, marked cacheable if it is long enough."""
+    block = {"type": "text", "text": system_prompt}
+    if estimate_tokens(system_prompt) >= MIN_CACHEABLE_TOKENS:
+        block["cache_control"] = {"type": "ephemeral"}
+    return [block]
+
+
+class PromptCacheStats:
+    """Running totals of prompt-cache usage for one run."""
+
+    def __init__(self):
+        self.calls = 0
+        self.input_tokens = 0
+        self.cache_read_tokens = 0
+        self.cache_write_tokens = 0
+        self.output_tokens = 0
+        self.cached_latency = []
+        self.uncached_latency = []
+
+    def record(self, usage, latency: float | None = None):
+        """Add one response's usage (and optional wall latency in seconds)."""
+        if usage is None:
+            return
+        cache_read = getattr(usage, "cache_read_input_tokens", 0) or 0
+        self.calls += 1
+        self.input_tokens += getattr(usage, "input_tokens", 0) or 0
+        self.cache_read_tokens += cache_read
+        self.cache_write_tokens += getattr(usage, "cache_creation_input_tokens", 0) or 0
+        self.output_tokens += getattr(usage, "output_tokens", 0) or 0
+        if latency is not None:
+            (self.cached_latency if cache_read else self.uncached_latency).append(latency)
+
+    def summary(self) -> dict:
+        """Return the run's totals, including input tokens saved by the cache."""
+        total_input = self.input_tokens + self.cache_read_tokens + self.cache_write_tokens
+        saved = (1 - CACHE_READ_PRICE) * self.cache_read_tokens \
+            - (CACHE_WRITE_PRICE - 1) * self.cache_write_tokens
+        return {
+            "calls": self.calls,
+            "uncached_input_tokens": self.input_tokens,
+            "cache_read_input_tokens": self.cache_read_tokens,
+            "cache_creation_input_tokens": self.cache_write_tokens,
+            "output_tokens": self.output_tokens,
+            "cache_hit_rate": round(self.cache_read_tokens / total_input, 4) if total_input else 0.0,
+            "input_tokens_saved": round(saved),
+            "mean_latency_cached_s": _mean(self.cached_latency),
+            "mean_latency_uncached_s": _mean(self.uncached_latency),
+        }
+
+    def report(self):
+        """Print the run's prompt-cache summary."""
+        if not self.calls:
+            return
+        s = self.summary()
+        print(f"\nPrompt cache: {s['calls']} call(s)")
+        print(f"  Cache read: {s['cache_read_input_tokens']} tokens "
+              f"({s['cache_hit_rate'] * 100:.1f}% of input)")
+        print(f"  Cache write: {s['cache_creation_input_tokens']} tokens")
+        print(f"  Uncached input: {s['uncached_input_tokens']} tokens")
+        print(f"  Input tokens saved (price-weighted): {s['input_tokens_saved']}")
+        if s["mean_latency_cached_s"] is not None and s["mean_latency_uncached_s"] is not None:
+            print(f"  Mean latency: {s['mean_latency_cached_s']:.2f}s cached vs "
+                  f"{s['mean_latency_uncached_s']:.2f}s uncached")
+
+
+def _mean(values: list[float]) -> float | None:
+    return round(sum(values) / len(values), 3) if values else None
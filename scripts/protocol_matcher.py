@@ -0,0 +1,249 @@
+#!/usr/bin/env python3
+"""
+Multi-pattern protocol trigger matcher.
+
+Usage: python scripts/protocol_matcher.py [--text TEXT] [--audit [--dumps] [--output REPORT.json]]
+
+Every trigger of every protocol in protocols/protocol-registry.json is compiled
+into one Aho-Corasick automaton, built once per run. A single pass over the
+lower-cased, whitespace-normalised text finds every trigger occurrence. Hits are
+kept only on word boundaries ("flask" matches "flask" and "flasks", not
+"flasky" or "hipflask"); a plural "s"/"es" suffix is allowed after a trigger.
+
+match() returns ranked candidates: most distinct triggers hit, then most total
+hits, then registry order. best() returns the top protocol id or None.
+
+--audit runs the matcher over the whole EQJS corpus (eqjs/<paper>/Q*.json, plus
+the asset_*_jsons.txt dumps with --dumps) and compares the detections with the
+protocols declared on each item's diagrams.
+"""
+
+import argparse
+import json
+import re
+import sys
+import time
+from collections import Counter, deque
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent))
+from import_eqjs_dumps import iter_dump_objects
+
+ROOT = Path(__file__).parent.parent
+REGISTRY_PATH = ROOT / "protocols" / "protocol-registry.json"
+EQJS_DIR = ROOT / "eqjs"
+
+PLURAL_SUFFIXES = ("s", "es")
+_WHITESPACE = re.compile(r"\s+")
+
+
+def normalize(text: str) -> str:
+    """Lower-case and collapse whitespace runs to single spaces."""
+    return _WHITESPACE.sub(" ", text.lower()).strip()
+
+
+def _is_word_char(ch: str) -> bool:
+    return ch.isalnum() or ch == "_"
+
+
+class ProtocolMatcher:
+    """Aho-Corasick automaton over all protocol triggers of a registry."""
+
+    def __init__(self, registry: dict):
+        self.protocol_ids = [p["id"] for p in registry.get("protocols", [])]
+        self._rank = {pid: i for i, pid in enumerate(self.protocol_ids)}
+        # Trie as parallel lists: goto transitions, failure links, outputs
+        self._goto = [{}]
+        self._fail = [0]
+        self._out = [[]]
+        for proto in registry.get("protocols", []):
+            for trigger in proto.get("triggers", []):
+                pattern = normalize(trigger)
+                if pattern:
+                    self._add(pattern, (proto["id"], trigger, len(pattern)))
+        self._build_failure_links()
+
+    def _add(self, pattern: str, output: tuple[str, str, int]):
+        state = 0
+        for ch in pattern:
+            nxt = self._goto[state].get(ch)
+            if nxt is None:
+                nxt = len(self._goto)
+                self._goto[state][ch] = nxt
+                self._goto.append({})
+                self._fail.append(0)
+                self._out.append([])
+            state = nxt
+        self._out[state].append(output)
+
+    def _build_failure_links(self):
+        queue = deque(self._goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for ch, nxt in self._goto[state].items():
+                queue.append(nxt)
+                fail = self._fail[state]
+                while fail and ch not in self._goto[fail]:
+                    fail = self._fail[fail]
+                self._fail[nxt] = self._goto[fail].get(ch, 0) if state else 0
+                self._out[nxt] = self._out[nxt] + self._out[self._fail[nxt]]
+
+    def _on_boundary(self, text: str, start: int, end: int) -> bool:
+        if start > 0 and _is_word_char(text[start - 1]):
+            return False
+        if end == len(text) or not _is_word_char(text[end]):
+            return True
+        for suffix in PLURAL_SUFFIXES:
+            stop = end + len(suffix)
+            if text.startswith(suffix, end) and (stop == len(text) or not _is_word_char(text[stop])):
+                return True
+        return False
+
+    def iter_hits(self, text: str):
+        """Yield (protocol_id, trigger, start) for each word-bounded trigger occurrence."""
+        text = normalize(text)
+        goto, fail, out = self._goto, self._fail, self._out
+        state = 0
+        for i, ch in enumerate(text):
+            while state and ch not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(ch, 0)
+            for protocol_id, trigger, length in out[state]:
+                start = i - length + 1
+                if self._on_boundary(text, start, i + 1):
+                    yield protocol_id, trigger, start
+
+    def match(self, text: str) -> list[dict]:
+        """Ranked protocol candidates: [{protocol_id, hits, triggers: {trigger: count}}]."""
+        triggers = {}
+        for protocol_id, trigger, _start in self.iter_hits(text):
+            triggers.setdefault(protocol_id, Counter())[trigger] += 1
+        candidates = [
+            {"protocol_id": pid, "hits": sum(counts.values()), "triggers": dict(counts)}
+            for pid, counts in triggers.items()
+        ]
+        candidates.sort(key=lambda c: (-len(c["triggers"]), -c["hits"], self._rank[c["protocol_id"]]))
+        return candidates
+
+    def best(self, text: str) -> str | None:
+        """The top-ranked protocol id, or None if no trigger matches."""
+        candidates = self.match(text)
+        return candidates[0]["protocol_id"] if candidates else None
+
+
+def load_registry() -> dict:
+    with open(REGISTRY_PATH) as f:
+        return json.load(f)
+
+
+def item_text(item: dict) -> str:
+    """Question text plus option texts of an EQJS item."""
+    content = item.get("content", {})
+    options = content.get("options", {})
+    return "\n".join([content.get("question_text", ""), *(str(options[k]) for k in sorted(options))])
+
+
+def declared_protocols(item: dict) -> list[str]:
+    """Protocols declared on an EQJS item's stimulus diagrams."""
+    diagrams = item.get("content", {}).get("stimulus", {}).get("diagrams", [])
+    return [d["protocol"] for d in diagrams if d.get("protocol")]
+
+
+def iter_corpus(include_dumps: bool = False):
+    """Yield (source, item) for every EQJS item in the corpus."""
+    for path in sorted(EQJS_DIR.glob("*/Q*.json")):
+        with open(path) as f:
+            yield str(path.relative_to(ROOT)), json.load(f)
+    if include_dumps:
+        for dump_path in sorted(EQJS_DIR.glob("asset_*_jsons.txt")):
+            for index, item, _error in iter_dump_objects(dump_path):
+                if item is not None and "metadata" in item:
+                    yield f"{dump_path.name}#{index}", item
+
+
+def audit_corpus(matcher: ProtocolMatcher, include_dumps: bool = False) -> dict:
+    """Run the matcher over the corpus and compare with declared diagram protocols."""
+    known = set(matcher.protocol_ids)
+    summary = Counter()
+    detected_counts = Counter()
+    items = {}
+    started = time.perf_counter()
+    text_chars = 0
+
+    for source, item in iter_corpus(include_dumps):
+        text = item_text(item)
+        text_chars += len(text)
+        candidates = matcher.match(text)
+        top = candidates[0]["protocol_id"] if candidates else None
+        declared = declared_protocols(item)
+        declared_known = [p for p in declared if p in known]
+
+        summary["items"] += 1
+        if top:
+            detected_counts[top] += 1
+        if not declared and not top:
+            outcome = "no_diagram_no_detection"
+        elif not declared:
+            outcome = "detected_without_diagram"
+        elif not top:
+            outcome = "diagram_not_detected"
+        elif top in declared:
+            outcome = "agree"
+        elif declared_known:
+            outcome = "disagree"
+        else:
+            outcome = "declared_protocol_not_in_registry"
+        summary[outcome] += 1
+        if outcome != "no_diagram_no_detection":
+            items[source] = {
+                "item_id": item.get("metadata", {}).get("id"),
+                "outcome": outcome,
+                "declared": declared,
+                "candidates": candidates,
+            }
+
+    elapsed = time.perf_counter() - started
+    return {
+        "summary": dict(summary),
+        "detected_per_protocol": dict(detected_counts),
+        "elapsed_s": round(elapsed, 3),
+        "chars_scanned": text_chars,
+        "items": items,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Protocol trigger matcher")
+    parser.add_argument("--text", type=str, help="Print ranked candidates for this text")
+    parser.add_argument("--audit", action="store_true", help="Audit detections over the EQJS corpus")
+    parser.add_argument("--dumps", action="store_true", help="Include eqjs/asset_*_jsons.txt in the audit")
+    parser.add_argument("--output", type=str, help="Write the audit report as JSON")
+    args = parser.parse_args()
+
+    matcher = ProtocolMatcher(load_registry())
+
+    if args.text is not None:
+        print(json.dumps(matcher.match(args.text), indent=2))
+        return
+    if not args.audit:
+        parser.print_help()
+        sys.exit(1)
+
+    report = audit_corpus(matcher, args.dumps)
+    print(f"Audited {report['summary'].get('items', 0)} item(s) in {report['elapsed_s']}s "
+          f"({report['chars_scanned']} chars)")
+    for outcome, n in sorted(report["summary"].items()):
+        if outcome != "items":
+            print(f"  {outcome}: {n}")
+    for protocol_id, n in sorted(report["detected_per_protocol"].items()):
+        print(f"  detected {protocol_id}: {n}")
+    if args.output:
+        output_path = Path(args.output)
+        output_path.parent.mkdir(parents=True, exist_ok=True)
+        with open(output_path, "w") as f:
+            json.dump(report, f, indent=2)
+        print(f"Report written to {output_path}")
+
+
+if __name__ == "__main__":
+    main()
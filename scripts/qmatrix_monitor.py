@@ -0,0 +1,570 @@
+#!/usr/bin/env python3
+"""
+Q-matrix early warning and G-DINA flip detection (V8 manual §6.4).
+
+Usage: python scripts/qmatrix_monitor.py update
+       python scripts/qmatrix_monitor.py flags [--concept ID]
+       python scripts/qmatrix_monitor.py validate [--concept ID] [--dry-run]
+       python scripts/qmatrix_monitor.py simulate [--students N]
+
+Each concept's Q-matrix is read from stage1_output.q_matrix of its ai-native
+file: misconception -> {"option": T1 distractor, "attribute_profile": [0/1 per
+misconception attribute]}.
+
+update: streams the §8.1 session logs in metadata/diagnostic-sessions/ into
+running sufficient statistics, reading only the lines appended since the last
+run (byte offset and inode per log file, as convert_bo2_to_dpo.py does). Per
+concept it keeps
+- n, Σθ, Σθ² over T1 responses and, per T1 option, n and Σθ
+  (θ = the session's theta_final)
+- per follow-up tier (T3, T4): sessions answering both T1 and the tier, the
+  T1 option and tier category counts, and their joint counts.
+The state lives in metadata/calibration/qmatrix-monitor/monitor_state.json;
+options are stored raw, so a revised Q-matrix applies to the whole history.
+
+flags: the N >= EARLY_WARNING_N checks, computed from the statistics alone:
+- inversion: point-biserial of choosing a misconception distractor with θ
+  above INVERSION_RPB (a "low knowledge" distractor should correlate
+  negatively)
+- conflation: φ between choosing the M_a distractor on T1 and the M_b
+  category on T3/T4 of the same concept above CONFLATION_R.
+
+validate: for concepts with N >= VALIDATION_N, the Wald-test loop. The
+misconceptions are the attributes (2^K latent classes). Every misconception
+becomes a binary pseudo-item "chose this category", once per tier:
+- T1 distractors, with their attribute_profile as Q-row; these are tested
+- T3/T4 categories, with the misconception's own attribute; these are fixed
+  anchors.
+A saturated G-DINA (one success probability per reduced attribute pattern) is
+fitted by MML-EM, vectorised over students × pseudo-items × classes. For every
+tested row j and attribute k the row is expanded to q_j ∪ {k} and refitted in
+closed form from the class posteriors; W is the Wald statistic of
+P(α_k = 1) - P(α_k = 0) over the other attribute patterns, with the
+P(1 - P)/I group variances. H0 is "attribute k does not affect row j".
+A T1 option excludes the others, so holding a different misconception makes
+a distractor *less* likely; only a significant (p < WALD_ALPHA) effect that
+raises the choice probability counts as "required". A 0 entry that is
+required flips to 1, a 1 entry that isn't flips to 0 (rows keep at least one
+attribute). The loop refits after flips
+and stops when nothing flips, when BIC no longer improves (the last flips are
+then undone), or after MAX_FLIP_ITERATIONS. Reports, not edits: results are
+written to metadata/calibration/qmatrix-validation/{concept_id}.json for
+review.
+
+simulate: a synthetic concept with one deliberately mis-specified
+distractor row, run through the monitor and the Wald loop.
+
+Requires numpy (see eap_scoring.py).
+"""
+
+import argparse
+import json
+import math
+import sys
+import time
+from collections import defaultdict
+from datetime import datetime, timezone
+from itertools import product
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent))
+from eap_scoring import AINATIVE_DIR, ROUTING_LOK
+from calibration_io import SESSION_LOG_DIR, SESSION_PATTERN, iter_session_records, write_json
+
+import numpy as np
+
+ROOT = Path(__file__).parent.parent
+MONITOR_DIR = ROOT / "metadata" / "calibration" / "qmatrix-monitor"
+STATE_PATH = MONITOR_DIR / "monitor_state.json"
+VALIDATION_DIR = ROOT / "metadata" / "calibration" / "qmatrix-validation"
+
+EARLY_WARNING_N = 200
+VALIDATION_N = 500
+INVERSION_RPB = 0.15
+CONFLATION_R = 0.40
+WALD_ALPHA = 0.05
+MAX_FLIP_ITERATIONS = 10
+EM_MAX_ITER = 500
+EM_TOLERANCE = 1e-4
+PROBABILITY_FLOOR = 1e-4
+FOLLOW_UP_TIERS = ("T3", "T4")
+
+
+def load_q_matrices(ainative_dir: Path = AINATIVE_DIR) -> dict[str, dict]:
+    """concept_id -> stage1_output.q_matrix for every ai-native file that has one."""
+    out = {}
+    for path in sorted(ainative_dir.glob("*/*_ainative.json")):
+        with open(path) as f:
+            data = json.load(f)
+        q_matrix = data.get("stage1_output", {}).get("q_matrix")
+        if data.get("source_eqjs_id") and q_matrix:
+            out[data["source_eqjs_id"]] = q_matrix
+    return out
+
+
+# ═══════════════════════════════════════════════════════════════
+# STREAMING SUFFICIENT STATISTICS (early warning)
+# ═══════════════════════════════════════════════════════════════
+
+def _new_concept_stats() -> dict:
+    return {
+        "n": 0, "sum_theta": 0.0, "sum_theta2": 0.0,
+        "options": {},  # T1 option -> [n, Σθ]
+        "tiers": {tier: {"n": 0, "t1": {}, "tier": {}, "joint": {}} for tier in FOLLOW_UP_TIERS},
+    }
+
+
+def _bump(counts: dict, key: str, by: float = 1):
+    counts[key] = counts.get(key, 0) + by
+
+
+class QMatrixMonitor:
+    """Running per-concept statistics for the §6.4 early-warning checks."""
+
+    def __init__(self, state: dict | None = None):
+        state = state or {}
+        self.files = state.get("files", {})
+        self.concepts = state.get("concepts", {})
+
+    def to_state(self) -> dict:
+        return {"files": self.files, "concepts": self.concepts}
+
+    def add_session(self, record: dict):
+        cascade = record.get("cascade", {})
+        option = cascade.get("T1_response")
+        theta = (record.get("estimation", {}).get("theta_final") or {}).get("mean")
+        concept_id = record.get("concept_id")
+        if not concept_id or option is None or theta is None:
+            return
+        stats = self.concepts.setdefault(concept_id, _new_concept_stats())
+        stats["n"] += 1
+        stats["sum_theta"] += theta
+        stats["sum_theta2"] += theta * theta
+        entry = stats["options"].setdefault(option, [0, 0.0])
+        entry[0] += 1
+        entry[1] += theta
+        for tier in FOLLOW_UP_TIERS:
+            category = cascade.get(f"{tier}_maps_to")
+            if not category:
+                continue
+            tier_stats = stats["tiers"][tier]
+            tier_stats["n"] += 1
+            _bump(tier_stats["t1"], option)
+            _bump(tier_stats["tier"], category)
+            _bump(tier_stats["joint"], f"{option}|{category}")
+
+    def update_from_logs(self, log_dir: Path = SESSION_LOG_DIR, pattern: str = SESSION_PATTERN) -> int:
+        """Fold in the session-log lines appended since the last update. Returns sessions read."""
+        read = 0
+        for path in sorted(log_dir.glob(pattern)):
+            stat = path.stat()
+            seen = self.files.get(path.name, {"offset": 0, "inode": None})
+            if seen["inode"] != stat.st_ino or stat.st_size < seen["offset"]:
+                seen = {"offset": 0, "inode": stat.st_ino}
+            with open(path, "rb") as f:
+                f.seek(seen["offset"])
+                for line in f:
+                    if not line.endswith(b"\n"):
+                        break  # still being written
+                    seen["offset"] += len(line)
+                    if line.strip():
+                        try:
+                            self.add_session(json.loads(line))
+                            read += 1
+                        except json.JSONDecodeError:
+                            pass
+            self.files[path.name] = seen
+        return read
+
+    def point_biserials(self, concept_id: str) -> dict[str, float]:
+        """Point-biserial of choosing each T1 option with θ."""
+        stats = self.concepts[concept_id]
+        n = stats["n"]
+        mean = stats["sum_theta"] / n
+        sd = math.sqrt(max(stats["sum_theta2"] / n - mean * mean, 0.0))
+        out = {}
+        for option, (n_option, sum_option) in stats["options"].items():
+            if sd == 0 or n_option in (0, n):
+                continue
+            p = n_option / n
+            mean_in = sum_option / n_option
+            mean_out = (stats["sum_theta"] - sum_option) / (n - n_option)
+            out[option] = (mean_in - mean_out) / sd * math.sqrt(p * (1 - p))
+        return out
+
+    def cross_tier_phi(self, concept_id: str, tier: str, option: str, category: str) -> float | None:
+        """φ between choosing a T1 option and answering a follow-up tier with a category."""
+        stats = self.concepts[concept_id]["tiers"][tier]
+        n = stats["n"]
+        a = stats["t1"].get(option, 0)
+        b = stats["tier"].get(category, 0)
+        if n == 0 or a in (0, n) or b in (0, n):
+            return None
+        both = stats["joint"].get(f"{option}|{category}", 0)
+        return (n * both - a * b) / math.sqrt(a * (n - a) * b * (n - b))
+
+    def flags(self, q_matrices: dict[str, dict], min_n: int = EARLY_WARNING_N) -> list[dict]:
+        """Inversion and conflation warnings for concepts with at least min_n T1 responses."""
+        out = []
+        for concept_id, stats in sorted(self.concepts.items()):
+            q_matrix = q_matrices.get(concept_id)
+            if not q_matrix or stats["n"] < min_n:
+                continue
+            rpb = self.point_biserials(concept_id)
+            for misconception, row in q_matrix.items():
+                value = rpb.get(row.get("option"))
+                # Every misconception distractor is a "low knowledge" choice: expected direction negative
+                if value is not None and value > INVERSION_RPB:
+                    out.append({"concept_id": concept_id, "check": "inversion", "misconception": misconception,
+                                "option": row["option"], "rpb": round(value, 4), "n": stats["n"],
+                                "message": "Q-matrix inversion suspected"})
+            for tier in FOLLOW_UP_TIERS:
+                for m_a, row in q_matrix.items():
+                    for m_b in q_matrix:
+                        if m_a == m_b:
+                            continue
+                        phi = self.cross_tier_phi(concept_id, tier, row.get("option"), m_b)
+                        if phi is not None and phi > CONFLATION_R:
+                            out.append({"concept_id": concept_id, "check": "conflation", "tier": tier,
+                                        "misconception": m_a, "other": m_b, "r_cross": round(phi, 4),
+                                        "n": self.concepts[concept_id]["tiers"][tier]["n"],
+                                        "message": f"{m_a}/{m_b} conflation suspected"})
+        return out
+
+
+def load_monitor(path: Path = STATE_PATH) -> QMatrixMonitor:
+    if path.exists():
+        with open(path) as f:
+            return QMatrixMonitor(json.load(f))
+    return QMatrixMonitor()
+
+
+def save_monitor(monitor: QMatrixMonitor, path: Path = STATE_PATH):
+    write_json(path, monitor.to_state())
+
+
+# ═══════════════════════════════════════════════════════════════
+# G-DINA WALD VALIDATION (batch)
+# ═══════════════════════════════════════════════════════════════
+
+def chi2_sf(x: float, df: int) -> float:
+    """Upper tail of the χ² distribution for integer degrees of freedom."""
+    if x <= 0:
+        return 1.0
+    half = x / 2
+    if df % 2 == 0:
+        term = total = 1.0
+        for i in range(1, df // 2):
+            term *= half / i
+            total += term
+        return min(1.0, math.exp(-half) * total)
+    total, term = 0.0, math.sqrt(x)
+    for i in range(1, (df - 1) // 2 + 1):
+        total += term
+        term *= x / (2 * i + 1)
+    return min(1.0, math.erfc(math.sqrt(half)) + math.sqrt(2 / math.pi) * math.exp(-half) * total)
+
+
+def concept_responses(records: list[dict], q_matrix: dict) -> tuple[list[dict], np.ndarray, np.ndarray]:
+    """Pseudo-items and (students × pseudo-items) responses/observed masks for one concept.
+
+    The latest session per student is used.
+    """
+    misconceptions = list(q_matrix)
+    n_attributes = len(misconceptions)
+    rows = []
+    for m, entry in q_matrix.items():
+        profile = entry.get("attribute_profile") or [int(a == m) for a in misconceptions]
+        rows.append({"tier": "T1", "misconception": m, "option": entry.get("option"),
+                     "q": [int(v) for v in profile[:n_attributes]], "tested": True})
+    for tier in FOLLOW_UP_TIERS:
+        for k, m in enumerate(misconceptions):
+            rows.append({"tier": tier, "misconception": m, "q": [int(i == k) for i in range(n_attributes)],
+                         "tested": False})
+
+    latest = {}
+    for record in records:
+        latest[record.get("student_id")] = record
+    x = np.zeros((len(latest), len(rows)))
+    observed = np.zeros_like(x)
+    for i, record in enumerate(latest.values()):
+        cascade = record.get("cascade", {})
+        for j, row in enumerate(rows):
+            if row["tier"] == "T1":
+                if cascade.get("T1_response") is not None:
+                    observed[i, j] = 1
+                    x[i, j] = cascade["T1_response"] == row["option"]
+            elif cascade.get(f"{row['tier']}_maps_to"):
+                observed[i, j] = 1
+                x[i, j] = cascade[f"{row['tier']}_maps_to"] == row["misconception"]
+    return rows, x, observed
+
+
+class GDINA:
+    """Saturated G-DINA for binary pseudo-items over all 2^K attribute patterns."""
+
+    def __init__(self, x: np.ndarray, observed: np.ndarray, n_attributes: int):
+        self.right = x * observed
+        self.wrong = (1 - x) * observed
+        self.observed = observed
+        self.patterns = np.array(list(product([0, 1], repeat=n_attributes)), dtype=int)
+        self.n_classes = len(self.patterns)
+        self.posterior = None
+        self.log_likelihood = None
+
+    def groups(self, q_row: list[int]) -> tuple[np.ndarray, int]:
+        """Reduced-pattern index of every latent class for a Q-row, and the number of groups."""
+        required = np.flatnonzero(q_row)
+        weights = 2 ** np.arange(len(required))[::-1]
+        return self.patterns[:, required] @ weights, 2 ** len(required)
+
+    def _group_probs(self, right: np.ndarray, total: np.ndarray, q_row: list[int]):
+        group, n_groups = self.groups(q_row)
+        r = np.bincount(group, weights=right, minlength=n_groups)
+        n = np.bincount(group, weights=total, minlength=n_groups)
+        p = np.clip((r + 0.5) / (n + 1.0), PROBABILITY_FLOOR, 1 - PROBABILITY_FLOOR)
+        return p, n, group
+
+    def fit(self, q: list[list[int]]) -> "GDINA":
+        """MML-EM under a Q-matrix (one row per pseudo-item)."""
+        prior = np.full(self.n_classes, 1.0 / self.n_classes)
+        # Start with success rising in the share of required attributes held, so classes can separate
+        held = np.array([self.patterns @ np.asarray(row) / max(sum(row), 1) for row in q])
+        probs = 0.1 + 0.8 * held
+        for _ in range(EM_MAX_ITER):
+            loglik = self.right @ np.log(probs) + self.wrong @ np.log(1 - probs) + np.log(prior)
+            top = loglik.max(axis=1, keepdims=True)
+            posterior = np.exp(loglik - top)
+            marginal = posterior.sum(axis=1, keepdims=True)
+            posterior /= marginal
+            self.log_likelihood = float((np.log(marginal) + top).sum())
+
+            expected_right = self.right.T @ posterior  # (items, classes)
+            expected_total = self.observed.T @ posterior
+            new_probs = np.empty_like(probs)
+            for j, q_row in enumerate(q):
+                p, _, group = self._group_probs(expected_right[j], expected_total[j], q_row)
+                new_probs[j] = p[group]
+            new_prior = np.clip(posterior.mean(axis=0), 1e-8, None)
+            moved = max(np.abs(new_probs - probs).max(), np.abs(new_prior - prior).max())
+            probs, prior = new_probs, new_prior / new_prior.sum()
+            if moved < EM_TOLERANCE:
+                break
+        self.posterior = posterior
+        self.expected_right = expected_right
+        self.expected_total = expected_total
+        self.n_parameters = sum(2 ** int(np.sum(row)) for row in q) + self.n_classes - 1
+        return self
+
+    def bic(self) -> float:
+        return -2 * self.log_likelihood + self.n_parameters * math.log(len(self.observed))
+
+    def wald(self, j: int, q_row: list[int], k: int) -> tuple[float, int, float, bool]:
+        """Wald test of attribute k's effect on pseudo-item j within q_row ∪ {k}.
+
+        Returns (W, df, p-value, whether α_k raises the success probability on average).
+        """
+        expanded = list(q_row)
+        expanded[k] = 1
+        p, n, _ = self._group_probs(self.expected_right[j], self.expected_total[j], expanded)
+        required = list(np.flatnonzero(expanded))
+        bit = 2 ** (len(required) - 1 - required.index(k))
+        without = np.array([g for g in range(len(p)) if not g & bit])
+        with_k = without + bit
+        variance = p * (1 - p) / np.maximum(n, 1e-9)
+        diff = p[with_k] - p[without]
+        w = float((diff ** 2 / (variance[with_k] + variance[without])).sum())
+        df = len(without)
+        raises = float(diff @ n[with_k]) > 0
+        return w, df, chi2_sf(w, df), raises
+
+
+def validate_concept(records: list[dict], q_matrix: dict, verbose: bool = True) -> dict:
+    """§6.4 full validation: Wald-test flip loop under G-DINA."""
+    rows, x, observed = concept_responses(records, q_matrix)
+    misconceptions = list(q_matrix)
+    model = GDINA(x, observed, len(misconceptions))
+    q_current = [list(row["q"]) for row in rows]
+    fit = model.fit(q_current)
+    previous_bic = fit.bic()
+    flips, converged, iteration = [], False, 0
+    while not converged and iteration < MAX_FLIP_ITERATIONS:
+        iteration += 1
+        proposed = [list(row) for row in q_current]
+        flipped = []
+        for j, row in enumerate(rows):
+            if not row["tested"]:
+                continue
+            for k, attribute in enumerate(misconceptions):
+                w, df, p_value, raises = fit.wald(j, q_current[j], k)
+                required = p_value < WALD_ALPHA and raises
+                current = q_current[j][k]
+                if current == 0 and required:
+                    proposed[j][k] = 1
+                elif current == 1 and not required and sum(proposed[j]) > 1:
+                    proposed[j][k] = 0
+                else:
+                    continue
+                flipped.append({"misconception": row["misconception"], "option": row["option"],
+                                "attribute": attribute, "from": current, "to": proposed[j][k],
+                                "wald": round(w, 3), "df": df, "p_value": round(p_value, 5),
+                                "iteration": iteration})
+        if not flipped:
+            converged = True
+            break
+        candidate = GDINA(x, observed, len(misconceptions)).fit(proposed)
+        new_bic = candidate.bic()
+        if verbose:
+            print(f"  iteration {iteration}: {len(flipped)} flip(s), BIC {previous_bic:.1f} -> {new_bic:.1f}")
+        if new_bic >= previous_bic:
+            converged = True  # the flips don't pay for themselves; keep the previous Q
+            break
+        q_current, fit, previous_bic = proposed, candidate, new_bic
+        flips.extend(flipped)
+
+    validated = {}
+    for j, row in enumerate(rows):
+        if row["tested"]:
+            validated[row["misconception"]] = {**q_matrix[row["misconception"]], "attribute_profile": q_current[j]}
+    return {
+        "n_responses": len(x),
+        "attributes": misconceptions,
+        "original_q": q_matrix,
+        "validated_q": validated,
+        "flips": flips,
+        "converged": converged,
+        "iterations": iteration,
+        "final_bic": round(previous_bic, 2),
+        "class_proportions": {"".join(map(str, pattern)): round(float(p), 4)
+                              for pattern, p in zip(fit.patterns, fit.posterior.mean(axis=0))},
+    }
+
+
+def load_sessions_by_concept(log_dir: Path = SESSION_LOG_DIR, pattern: str = SESSION_PATTERN) -> dict[str, list]:
+    out = defaultdict(list)
+    for record in iter_session_records(pattern, log_dir):
+        out[record.get("concept_id")].append(record)
+    return out
+
+
+# ═══════════════════════════════════════════════════════════════
+# SIMULATION
+# ═══════════════════════════════════════════════════════════════
+
+def simulate_sessions(n_students: int, seed: int = 0) -> tuple[list[dict], dict]:
+    """One concept, K = 3 misconceptions; the authored Q-row of M2's distractor wrongly names M3.
+
+    Students hold each misconception with probability 0.3; a held misconception
+    makes its T1 distractor and T3/T4 category likely, θ falls with the number held.
+    """
+    rng = np.random.default_rng(seed)
+    misconceptions = ["M1", "M2", "M3"]
+    options = {"M1": "A", "M2": "B", "M3": "C"}
+    authored = {m: {"option": options[m], "attribute_profile": [int(a == m) for a in misconceptions]}
+                for m in misconceptions}
+    authored["M2"]["attribute_profile"] = [0, 0, 1]
+
+    records = []
+    for s in range(n_students):
+        held = rng.random(3) < 0.3
+        theta = float(rng.normal(-0.8 * held.sum(), 0.6))
+        weights = np.where(held, 4.0, 0.25)
+        t1_weights = np.append(weights, 3.0 if not held.any() else 0.5)
+        t1 = ["A", "B", "C", "D"][rng.choice(4, p=t1_weights / t1_weights.sum())]
+        cascade = {"T1_item_id": "SIM-CONCEPT", "T1_response": t1, "T1_correct": t1 == "D"}
+        if t1 != "D":
+            for tier in FOLLOW_UP_TIERS:
+                tier_weights = np.append(weights, 0.5 if held.any() else 3.0)
+                choice = rng.choice(4, p=tier_weights / tier_weights.sum())
+                cascade[f"{tier}_item_id"] = f"SIM-CONCEPT_{tier}"
+                cascade[f"{tier}_maps_to"] = (misconceptions + [ROUTING_LOK])[choice]
+        records.append({"student_id": f"SIM-{s:05d}", "concept_id": "SIM-CONCEPT", "cascade": cascade,
+                        "estimation": {"theta_final": {"mean": round(theta, 4), "sd": 0.7}}})
+    return records, {"SIM-CONCEPT": authored}
+
+
+# ═══════════════════════════════════════════════════════════════
+# CLI
+# ═══════════════════════════════════════════════════════════════
+
+def print_flags(flags: list[dict], monitor: QMatrixMonitor):
+    for flag in flags:
+        detail = f"rpb {flag['rpb']}" if flag["check"] == "inversion" else f"{flag['tier']} r_cross {flag['r_cross']}"
+        print(f"  FLAG {flag['concept_id']} {flag['misconception']}: {flag['message']} ({detail}, n={flag['n']})")
+    due = [c for c, stats in sorted(monitor.concepts.items()) if stats["n"] >= VALIDATION_N]
+    if due:
+        print(f"  {len(due)} concept(s) with >= {VALIDATION_N} T1 responses, ready for `validate` "
+              f"(which counts distinct students): {', '.join(due)}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Q-matrix early warning and G-DINA flip detection (V8 §6.4)")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    subparsers.add_parser("update", help="Fold new session-log lines into the running statistics")
+    flags_parser = subparsers.add_parser("flags", help="Print early-warning flags (N >= 200)")
+    validate_parser = subparsers.add_parser("validate", help="Run the G-DINA Wald flip loop (N >= 500)")
+    for sub in (flags_parser, validate_parser):
+        sub.add_argument("--concept", type=str, help="Only this concept")
+    validate_parser.add_argument("--dry-run", action="store_true", help="Print results but don't write reports")
+    sim_parser = subparsers.add_parser("simulate", help="Synthetic concept with one mis-specified Q-row")
+    sim_parser.add_argument("--students", type=int, default=2000)
+    args = parser.parse_args()
+
+    if args.command == "update":
+        started = time.perf_counter()
+        monitor = load_monitor()
+        read = monitor.update_from_logs()
+        save_monitor(monitor)
+        print(f"Read {read} new session(s) in {time.perf_counter() - started:.2f}s; "
+              f"{len(monitor.concepts)} concept(s) tracked")
+        print_flags(monitor.flags(load_q_matrices()), monitor)
+
+    elif args.command == "flags":
+        monitor = load_monitor()
+        flags = [f for f in monitor.flags(load_q_matrices()) if not args.concept or f["concept_id"] == args.concept]
+        print(f"{len(flags)} flag(s)")
+        print_flags(flags, monitor)
+
+    elif args.command == "validate":
+        q_matrices = load_q_matrices()
+        sessions = load_sessions_by_concept()
+        for concept_id, records in sorted(sessions.items()):
+            if (args.concept and concept_id != args.concept) or concept_id not in q_matrices:
+                continue
+            n = len({r.get("student_id") for r in records})
+            if n < VALIDATION_N:
+                print(f"{concept_id}: {n} student(s), below N = {VALIDATION_N}; skipped")
+                continue
+            started = time.perf_counter()
+            result = validate_concept(records, q_matrices[concept_id])
+            print(f"{concept_id}: {len(result['flips'])} flip(s), "
+                  f"{'converged' if result['converged'] else 'not converged'}, "
+                  f"BIC {result['final_bic']} ({time.perf_counter() - started:.2f}s)")
+            for flip in result["flips"]:
+                print(f"  FLIP {flip['misconception']} ({flip['option']}) x {flip['attribute']}: "
+                      f"{flip['from']} -> {flip['to']} (W = {flip['wald']}, df {flip['df']}, p = {flip['p_value']})")
+            if not args.dry_run:
+                result = {"concept_id": concept_id, **result, "validated_at": datetime.now(timezone.utc).isoformat()}
+                write_json(VALIDATION_DIR / f"{concept_id}.json", result)
+
+    elif args.command == "simulate":
+        records, q_matrices = simulate_sessions(args.students)
+        started = time.perf_counter()
+        monitor = QMatrixMonitor()
+        for record in records:
+            monitor.add_session(record)
+        flags = monitor.flags(q_matrices)
+        print(f"Streamed {len(records)} session(s) in {time.perf_counter() - started:.3f}s; {len(flags)} flag(s)")
+        print_flags(flags, monitor)
+        started = time.perf_counter()
+        result = validate_concept(records, q_matrices["SIM-CONCEPT"])
+        print(f"Wald validation in {time.perf_counter() - started:.2f}s: {len(result['flips'])} flip(s)")
+        for flip in result["flips"]:
+            print(f"  FLIP {flip['misconception']} x {flip['attribute']}: {flip['from']} -> {flip['to']} "
+                  f"(W = {flip['wald']}, p = {flip['p_value']})")
+        print("  validated Q: " + ", ".join(f"{m} {row['attribute_profile']}"
+                                           for m, row in result["validated_q"].items()))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,169 @@
+#!/usr/bin/env python3
+"""
+Content-addressed on-disk cache for LLM stage responses.
+
+Usage: python scripts/response_cache.py [--evict] [--clear]
+
+Each response is stored under .cache/llm-responses/<aa>/<sha256>.json, keyed by a
+hash of (model, system prompt, user prompt, max_tokens). Re-running a crashed or
+partially failed conversion therefore replays completed stage calls from disk
+instead of paying for them again. The conversion scripts only store a response
+once it parses as JSON (and ignore cached entries that don't), so a malformed
+reply is retried on the next run rather than replayed.
+
+Eviction: entries older than max_age_days are dropped, then the least recently
+used entries are dropped until the cache fits in max_bytes.
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+
+ROOT = Path(__file__).parent.parent
+CACHE_DIR = ROOT / ".cache" / "llm-responses"
+
+DEFAULT_MAX_BYTES = 500 * 1024 * 1024
+DEFAULT_MAX_AGE_DAYS = 30
+
+
+def cache_key(model: str, system_prompt, user_prompt: str, max_tokens: int) -> str:
+    """Hash the full request identity into a cache key."""
+    payload = json.dumps([model, system_prompt, user_prompt, max_tokens], sort_keys=True)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class ResponseCache:
+    """Persistent response cache with age and size based eviction.
+
+    With refresh=True, lookups always miss but new responses are still stored, so a
+    run can overwrite stale entries.
+    """
+
+    def __init__(self, cache_dir: Path = CACHE_DIR, max_bytes: int = DEFAULT_MAX_BYTES,
+                 max_age_days: float = DEFAULT_MAX_AGE_DAYS, refresh: bool = False):
+        self.cache_dir = Path(cache_dir)
+        self.max_bytes = max_bytes
+        self.max_age_seconds = max_age_days * 86400
+        self.refresh = refresh
+        self.hits = 0
+        self.misses = 0
+
+    def _path(self, key: str) -> Path:
+        return self.cache_dir / key[:2] / f"{key}.json"
+
+    def get(self, model: str, system_prompt, user_prompt: str, max_tokens: int) -> str | None:
+        """Return the cached response text, or None on a miss."""
+        if self.refresh:
+            self.misses += 1
+            return None
+        path = self._path(cache_key(model, system_prompt, user_prompt, max_tokens))
+        try:
+            if time.time() - path.stat().st_mtime > self.max_age_seconds:
+                path.unlink()
+                self.misses += 1
+                return None
+            with open(path) as f:
+                entry = json.load(f)
+            os.utime(path)
+        except (FileNotFoundError, json.JSONDecodeError):
+            self.misses += 1
+            return None
+        self.hits += 1
+        return entry.get("text")
+
+    def put(self, model: str, system_prompt, user_prompt: str, max_tokens: int, text: str):
+        """Store a response atomically (temp file + rename)."""
+        key = cache_key(model, system_prompt, user_prompt, max_tokens)
+        path = self._path(key)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        temp_path = path.with_suffix(f".{os.getpid()}.tmp")
+        with open(temp_path, "w") as f:
+            json.dump({
+                "key": key,
+                "model": model,
+                "max_tokens": max_tokens,
+                "cached_at": datetime.now(timezone.utc).isoformat(),
+                "text": text,
+            }, f)
+        os.replace(temp_path, path)
+
+    def evict(self) -> int:
+        """Drop expired entries, then least recently used ones over max_bytes."""
+        if not self.cache_dir.exists():
+            return 0
+        now = time.time()
+        removed = 0
+        entries = []
+        for path in self.cache_dir.glob("*/*.json"):
+            try:
+                stat = path.stat()
+            except FileNotFoundError:
+                continue
+            if now - stat.st_mtime > self.max_age_seconds:
+                path.unlink(missing_ok=True)
+                removed += 1
+            else:
+                entries.append((stat.st_mtime, stat.st_size, path))
+
+        total = sum(size for _, size, _ in entries)
+        for _, size, path in sorted(entries):
+            if total <= self.max_bytes:
+                break
+            path.unlink(missing_ok=True)
+            total -= size
+            removed += 1
+        return removed
+
+    def clear(self) -> int:
+        """Remove every cached response."""
+        removed = 0
+        for path in self.cache_dir.glob("*/*.json"):
+            path.unlink(missing_ok=True)
+            removed += 1
+        return removed
+
+
+def add_cache_arguments(parser: argparse.ArgumentParser):
+    """Add the shared --no-cache / --refresh flags to a cron script's parser."""
+    parser.add_argument("--no-cache", action="store_true",
+                        help="Don't read or write the LLM response cache")
+    parser.add_argument("--refresh", action="store_true",
+                        help="Ignore cached responses but store the new ones")
+
+
+def cache_from_args(args) -> ResponseCache | None:
+    """Build the response cache for a run, evicting stale entries first."""
+    if args.no_cache:
+        return None
+    cache = ResponseCache(refresh=args.refresh)
+    removed = cache.evict()
+    if removed:
+        print(f"Response cache: evicted {removed} entries")
+    return cache
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Maintain the LLM response cache")
+    parser.add_argument("--evict", action="store_true", help="Apply age/size eviction")
+    parser.add_argument("--clear", action="store_true", help="Remove all cached responses")
+    args = parser.parse_args()
+
+    cache = ResponseCache()
+    if args.clear:
+        print(f"Removed {cache.clear()} cached responses.")
+    elif args.evict:
+        print(f"Evicted {cache.evict()} cached responses.")
+    else:
+        files = list(cache.cache_dir.glob("*/*.json")) if cache.cache_dir.exists() else []
+        size = sum(f.stat().st_size for f in files)
+        print(f"Cache: {cache.cache_dir}")
+        print(f"  Entries: {len(files)}")
+        print(f"  Size: {size / (1024 * 1024):.1f} MB")
+
+
+if __name__ == "__main__":
+    main()
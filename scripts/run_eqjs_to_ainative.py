@@ -2,28 +2,51 @@
 """
 Daily cron script: convert new EQJS items to AI-native V8 schema.
 
-Usage: python scripts/run_eqjs_to_ainative.py [--item ITEM_ID] [--dry-run]
+Usage: python scripts/run_eqjs_to_ainative.py [--item ITEM_ID] [--dry-run] [--concurrency N]
+                                             [--batch [--batch-base-url URL]] [--no-resume] [--no-cache] [--refresh]
 
 Algorithm:
-1. List all EQJS files in eqjs/
-2. Check ai-native/ for existing conversions
-3. For each missing item:
+1. Query the pipeline manifest for EQJS items without an AI-native conversion
+   (see manifest.py; run `python scripts/manifest.py reindex` after external changes)
+2. For each missing item:
    a. Run Stage 1 (Q-Matrix Extraction)
    b. Check diagram_dependent
    c. If diagram: run Stage 2-Bo2, then Stage 3 with orthogonality
    d. If not: run Stage 2-Single, then Stage 3
    e. Handle retries (max 3 on REJECTED)
-   f. Write to ai-native/
+   f. Write to ai-native/ and record it in the manifest
    g. Log to metadata/conversion-logs/eqjs-to-ainative/
    h. If Bo2: log to metadata/bo2-generation-logs/
+
+With --concurrency N > 1, up to N items run their Stage 1-2-3 chains at once on
+an async client. All items share one MAX_CALLS_PER_MINUTE rate limiter.
+
+With --batch, every item's pipeline advances in lockstep: all Stage 1 requests
+go out as one message batch job, then all Stage 2 requests, then the Stage 3
+audits and regenerations (see batch_backend.py). No per-minute throttle applies.
+
+Stage responses are cached in .cache/llm-responses/ (see response_cache.py), so a
+re-run replays completed calls. --refresh bypasses cached reads; --no-cache disables it.
+The four V8 stage system prompts are sent as cacheable prompt prefixes (those
+long enough to cache); cache read/write token counts are reported and recorded
+per run as a telemetry span (see prompt_cache.py).
+
+Every API call, rate-limit wait and finished item is recorded as a telemetry span
+in metadata/performance-data/ (summarise with scripts/telemetry.py).
+
+Each completed stage (stage1, every draft, every audit and the retry count) is
+checkpointed to metadata/checkpoints/eqjs-to-ainative/, so an interrupted or
+failed item resumes from its last completed stage. --no-resume starts over.
 """
 
 import argparse
+import asyncio
+import hashlib
 import json
-import math
 import os
 import sys
 import time
+from collections import Counter, deque
 from datetime import datetime, timezone
 from pathlib import Path
 
@@ -34,7 +57,13 @@ except ImportError:
     sys.exit(1)
 
 sys.path.insert(0, str(Path(__file__).parent))
-from validate_ainative import validate_ainative
+import manifest
+from batch_backend import AnthropicBatchBackend, BatchBackend, run_batch
+from lltm import cold_start_params
+from prompt_cache import PromptCacheStats, cached_system_prompt
+from response_cache import add_cache_arguments, cache_from_args
+from telemetry import write_call_span, write_span
+from validate_ainative import validate_ainative_data
 
 ROOT = Path(__file__).parent.parent
 EQJS_DIR = ROOT / "eqjs"
@@ -42,11 +71,19 @@ AINATIVE_DIR = ROOT / "ai-native"
 CONFIG_DIR = ROOT / "config"
 LOG_DIR = ROOT / "metadata" / "conversion-logs" / "eqjs-to-ainative"
 BO2_LOG_DIR = ROOT / "metadata" / "bo2-generation-logs"
+CHECKPOINT_DIR = ROOT / "metadata" / "checkpoints" / "eqjs-to-ainative"
 V8_MANUAL = ROOT / "docs" / "V8-construction-manual.md"
 
+PIPELINE = "eqjs-to-ainative"
 MODEL = "claude-sonnet-4-5-20250929"
 MAX_RETRIES = 3
 MAX_CALLS_PER_MINUTE = 10
+MAX_TOKENS = 4096
+
+RESPONSE_CACHE = None
+PROMPT_CACHE_STATS = PromptCacheStats()
+RESUME_CHECKPOINTS = True
+MANIFEST = None
 
 STAGE1_SYSTEM = ""
 STAGE2_BO2_SYSTEM = ""
@@ -170,60 +207,116 @@ def _set_inline_prompts():
     )
 
 
-def qnorm(p: float) -> float:
-    """Approximate inverse normal CDF (probit) using rational approximation."""
-    if p <= 0:
-        return -3.0
-    if p >= 1:
-        return 3.0
-    if p == 0.5:
-        return 0.0
-    if p < 0.5:
-        t = math.sqrt(-2.0 * math.log(p))
-    else:
-        t = math.sqrt(-2.0 * math.log(1.0 - p))
-    c0, c1, c2 = 2.515517, 0.802853, 0.010328
-    d1, d2, d3 = 1.432788, 0.189269, 0.001308
-    result = t - (c0 + c1 * t + c2 * t * t) / (1.0 + d1 * t + d2 * t * t + d3 * t * t * t)
-    return -result if p < 0.5 else result
-
+def build_request_params(system_prompt: str, user_prompt: str) -> dict:
+    """Message parameters shared by direct, async and batch API calls.
 
-def compute_cold_start_params(eqjs_data: dict) -> dict:
-    """Compute LLTM cold-start calibration parameters from EQJS metadata."""
-    pct = eqjs_data.get("classification", {}).get("asset_percent_correct", 50)
-    beta = -1.0 * qnorm(pct / 100.0)
+    The static system prompt is marked as a cacheable prefix.
+    """
     return {
-        "calibration_phase": "A_cold_start",
-        "lltm_predicted_params": {
-            "alpha": 1.0,
-            "beta": round(beta, 4),
-            "d_steps": [-0.5, 0.0, 0.5],
-        },
-        "n_responses": 0,
+        "model": MODEL,
+        "max_tokens": MAX_TOKENS,
+        "system": cached_system_prompt(system_prompt),
+        "messages": [{"role": "user", "content": user_prompt}],
     }
 
 
-def call_api(client, system_prompt: str, user_prompt: str, retry: int = 0):
-    """Call the Anthropic API with retry logic."""
+def call_api(client, system_prompt: str, user_prompt: str, retry: int = 0,
+             stage: str = "", item_id: str = ""):
+    """Call the Anthropic API with retry logic, serving repeats from the response cache.
+
+    Each attempt is recorded as a telemetry span tagged with stage and item_id.
+    """
+    if retry == 0:
+        cached = cached_response(system_prompt, user_prompt)
+        if cached is not None:
+            write_call_span(PIPELINE, stage, item_id, retry, "response_cache", "ok", 0.0)
+            return cached
+    started = time.monotonic()
     try:
-        response = client.messages.create(
-            model=MODEL,
-            max_tokens=4096,
-            system=system_prompt,
-            messages=[{"role": "user", "content": user_prompt}],
-        )
-        return response.content[0].text
+        response = client.messages.create(**build_request_params(system_prompt, user_prompt))
+        latency = time.monotonic() - started
+        PROMPT_CACHE_STATS.record(response.usage, latency)
+        write_call_span(PIPELINE, stage, item_id, retry, "api", "ok", latency, response.usage)
+        text = response.content[0].text
+        cache_response(system_prompt, user_prompt, text)
+        return text
     except anthropic.APIError as e:
+        latency = time.monotonic() - started
         if retry < MAX_RETRIES:
             wait = 2 ** (retry + 1)
+            write_call_span(PIPELINE, stage, item_id, retry, "api", "error", latency,
+                            error=type(e).__name__, backoff_s=wait)
             print(f"  API error (attempt {retry + 1}/{MAX_RETRIES}): {e}. Retrying in {wait}s...")
             time.sleep(wait)
-            return call_api(client, system_prompt, user_prompt, retry + 1)
+            return call_api(client, system_prompt, user_prompt, retry + 1, stage, item_id)
+        write_call_span(PIPELINE, stage, item_id, retry, "api", "error", latency, error=type(e).__name__)
         print(f"  API error after {MAX_RETRIES} retries: {e}")
         return None
 
 
-def parse_json_response(text: str) -> dict | None:
+class AsyncRateLimiter:
+    """Sliding-window limit of max_calls API calls per period, shared across tasks."""
+
+    def __init__(self, max_calls: int, period: float = 60.0):
+        self.max_calls = max_calls
+        self.period = period
+        self._calls = deque()
+        self._lock = asyncio.Lock()
+
+    async def acquire(self) -> float:
+        """Wait until another call fits in the window, record it and return the wait time."""
+        started = time.monotonic()
+        async with self._lock:
+            while True:
+                now = time.monotonic()
+                while self._calls and now - self._calls[0] >= self.period:
+                    self._calls.popleft()
+                if len(self._calls) < self.max_calls:
+                    self._calls.append(now)
+                    return now - started
+                wait = self.period - (now - self._calls[0])
+                print(f"  Rate limit: waiting {wait:.1f}s")
+                await asyncio.sleep(wait)
+
+
+async def call_api_async(client, system_prompt: str, user_prompt: str,
+                         limiter: AsyncRateLimiter | None = None, retry: int = 0,
+                         stage: str = "", item_id: str = ""):
+    """Async counterpart of call_api for use with anthropic.AsyncAnthropic."""
+    if retry == 0:
+        cached = cached_response(system_prompt, user_prompt)
+        if cached is not None:
+            write_call_span(PIPELINE, stage, item_id, retry, "response_cache", "ok", 0.0)
+            return cached
+    if limiter:
+        waited = await limiter.acquire()
+        if waited >= 0.01:
+            write_span(PIPELINE, "rate_limit", stage=stage, item_id=item_id, sleep_s=round(waited, 3))
+    started = time.monotonic()
+    try:
+        response = await client.messages.create(**build_request_params(system_prompt, user_prompt))
+        latency = time.monotonic() - started
+        PROMPT_CACHE_STATS.record(response.usage, latency)
+        write_call_span(PIPELINE, stage, item_id, retry, "api", "ok", latency, response.usage)
+        text = response.content[0].text
+        cache_response(system_prompt, user_prompt, text)
+        return text
+    except anthropic.APIError as e:
+        latency = time.monotonic() - started
+        if retry < MAX_RETRIES:
+            wait = 2 ** (retry + 1)
+            write_call_span(PIPELINE, stage, item_id, retry, "api", "error", latency,
+                            error=type(e).__name__, backoff_s=wait)
+            print(f"  API error (attempt {retry + 1}/{MAX_RETRIES}): {e}. Retrying in {wait}s...")
+            await asyncio.sleep(wait)
+            return await call_api_async(client, system_prompt, user_prompt, limiter, retry + 1,
+                                        stage, item_id)
+        write_call_span(PIPELINE, stage, item_id, retry, "api", "error", latency, error=type(e).__name__)
+        print(f"  API error after {MAX_RETRIES} retries: {e}")
+        return None
+
+
+def parse_json_response(text: str, quiet: bool = False) -> dict | None:
     """Extract JSON object from API response text."""
     text = text.strip()
     if text.startswith("```"):
@@ -235,10 +328,31 @@ def parse_json_response(text: str) -> dict | None:
     try:
         return json.loads(text)
     except json.JSONDecodeError as e:
-        print(f"  JSON parse error: {e}")
+        if not quiet:
+            print(f"  JSON parse error: {e}")
         return None
 
 
+def cached_response(system_prompt: str, user_prompt: str) -> str | None:
+    """A cached reply for this request, if any (entries that no longer parse are ignored).
+
+    Keyed on the exact system blocks sent (see build_request_params), so any
+    change to what the model is sent misses the cache.
+    """
+    if not RESPONSE_CACHE:
+        return None
+    text = RESPONSE_CACHE.get(MODEL, cached_system_prompt(system_prompt), user_prompt, MAX_TOKENS)
+    if text is None or parse_json_response(text, quiet=True) is None:
+        return None
+    return text
+
+
+def cache_response(system_prompt: str, user_prompt: str, text: str | None):
+    """Cache a reply only once it parses as JSON, so a malformed one is never replayed."""
+    if RESPONSE_CACHE and text is not None and parse_json_response(text, quiet=True) is not None:
+        RESPONSE_CACHE.put(MODEL, cached_system_prompt(system_prompt), user_prompt, MAX_TOKENS, text)
+
+
 def write_log(log_dir: Path, entry: dict):
     """Append a JSONL log entry."""
     log_dir.mkdir(parents=True, exist_ok=True)
@@ -256,16 +370,13 @@ def write_bo2_log(entry: dict):
         f.write(json.dumps(entry) + "\n")
 
 
-def run_stage1(client, eqjs_data: dict) -> dict | None:
+def build_stage1_prompt(eqjs_data: dict) -> tuple[str, str]:
     """Stage 1: Q-Matrix Extraction."""
     user_prompt = f"SEED ITEM JSON:\n{json.dumps(eqjs_data, indent=2)}"
-    response = call_api(client, STAGE1_SYSTEM, user_prompt)
-    if not response:
-        return None
-    return parse_json_response(response)
+    return STAGE1_SYSTEM, user_prompt
 
 
-def run_stage2_bo2(client, eqjs_data: dict, stage1: dict) -> dict | None:
+def build_stage2_bo2_prompt(eqjs_data: dict, stage1: dict) -> tuple[str, str]:
     """Stage 2-Bo2: Generate two orthogonal candidates."""
     question_text = eqjs_data.get("content", {}).get("question_text", "")
     diagrams = eqjs_data.get("content", {}).get("stimulus", {}).get("diagrams", [])
@@ -275,13 +386,10 @@ def run_stage2_bo2(client, eqjs_data: dict, stage1: dict) -> dict | None:
         f"Q-MATRIX JSON: {json.dumps(stage1.get('q_matrix', {}), indent=2)}\n"
         f"TRANSFER DOMAINS: {json.dumps(stage1.get('transfer_domains', []), indent=2)}"
     )
-    response = call_api(client, STAGE2_BO2_SYSTEM, user_prompt)
-    if not response:
-        return None
-    return parse_json_response(response)
+    return STAGE2_BO2_SYSTEM, user_prompt
 
 
-def run_stage2_single(client, eqjs_data: dict, stage1: dict) -> dict | None:
+def build_stage2_single_prompt(eqjs_data: dict, stage1: dict) -> tuple[str, str]:
     """Stage 2-Single: Generate one T3/T4 candidate."""
     question_text = eqjs_data.get("content", {}).get("question_text", "")
     user_prompt = (
@@ -289,13 +397,10 @@ def run_stage2_single(client, eqjs_data: dict, stage1: dict) -> dict | None:
         f"Q-MATRIX JSON: {json.dumps(stage1.get('q_matrix', {}), indent=2)}\n"
         f"TRANSFER DOMAINS: {json.dumps(stage1.get('transfer_domains', []), indent=2)}"
     )
-    response = call_api(client, STAGE2_SINGLE_SYSTEM, user_prompt)
-    if not response:
-        return None
-    return parse_json_response(response)
+    return STAGE2_SINGLE_SYSTEM, user_prompt
 
 
-def run_stage3_audit(client, eqjs_data: dict, stage1: dict, draft: dict, is_bo2: bool) -> dict | None:
+def build_stage3_prompt(eqjs_data: dict, stage1: dict, draft: dict, is_bo2: bool) -> tuple[str, str]:
     """Stage 3: Psychometric Audit."""
     question_text = eqjs_data.get("content", {}).get("question_text", "")
     user_prompt = (
@@ -304,14 +409,11 @@ def run_stage3_audit(client, eqjs_data: dict, stage1: dict, draft: dict, is_bo2:
         f"PROPOSED T3 AND T4 ITEMS: {json.dumps(draft, indent=2)}\n"
         f"IS_BO2: {str(is_bo2).lower()}"
     )
-    response = call_api(client, STAGE3_SYSTEM, user_prompt)
-    if not response:
-        return None
-    return parse_json_response(response)
+    return STAGE3_SYSTEM, user_prompt
 
 
-def run_stage2_with_feedback(client, eqjs_data: dict, stage1: dict, is_bo2: bool,
-                             previous_draft: dict, feedback: str) -> dict | None:
+def build_stage2_feedback_prompt(eqjs_data: dict, stage1: dict, is_bo2: bool,
+                                 previous_draft: dict, feedback: str) -> tuple[str, str]:
     """Re-run Stage 2 with audit feedback appended."""
     question_text = eqjs_data.get("content", {}).get("question_text", "")
     if is_bo2:
@@ -336,12 +438,172 @@ def run_stage2_with_feedback(client, eqjs_data: dict, stage1: dict, is_bo2: bool
             f"Generate an IMPROVED version addressing the feedback above."
         )
         system = STAGE2_SINGLE_SYSTEM
-    response = call_api(client, system, user_prompt)
+    return system, user_prompt
+
+
+def _parse_stage_response(response: str | None) -> dict | None:
+    """Parse a stage response, treating a failed API call as no output."""
     if not response:
         return None
     return parse_json_response(response)
 
 
+def get_checkpoint_path(eqjs_path: Path) -> Path:
+    """Map an EQJS file path to its stage checkpoint path."""
+    return CHECKPOINT_DIR / eqjs_path.parent.name / f"{eqjs_path.stem}.json"
+
+
+def load_checkpoint(checkpoint_path: Path | None, eqjs_data: dict) -> dict:
+    """Load an item's stage checkpoint, or start a fresh one.
+
+    A checkpoint is discarded if resuming is disabled or the EQJS source has
+    changed since it was written.
+    """
+    source_hash = hashlib.sha256(json.dumps(eqjs_data, sort_keys=True).encode("utf-8")).hexdigest()
+    fresh = {"source_hash": source_hash, "stage1": None, "drafts": [], "audits": [], "retries": 0}
+    if not checkpoint_path or not RESUME_CHECKPOINTS or not checkpoint_path.exists():
+        return fresh
+    try:
+        with open(checkpoint_path) as f:
+            checkpoint = json.load(f)
+    except json.JSONDecodeError:
+        return fresh
+    if checkpoint.get("source_hash") != source_hash:
+        return fresh
+    return checkpoint
+
+
+def save_checkpoint(checkpoint_path: Path | None, checkpoint: dict):
+    """Atomically persist an item's stage checkpoint."""
+    if not checkpoint_path:
+        return
+    checkpoint["updated_at"] = datetime.now(timezone.utc).isoformat()
+    checkpoint_path.parent.mkdir(parents=True, exist_ok=True)
+    temp_path = checkpoint_path.with_suffix(".tmp.json")
+    with open(temp_path, "w") as f:
+        json.dump(checkpoint, f, indent=2)
+    os.replace(temp_path, checkpoint_path)
+
+
+def item_pipeline(eqjs_data: dict, checkpoint_path: Path | None = None):
+    """Stage 1-2-3 chain for one item, independent of how the API is called.
+
+    Generator: yields (stage, system_prompt, user_prompt) requests and expects the
+    response text (None on API failure) to be sent back. Returns a result dict whose
+    status is "stage1_failed", "stage2_failed" or "complete".
+
+    Every completed stage (stage1, each draft, each audit, retry count) is saved to
+    checkpoint_path, and stages already in the checkpoint are replayed without an
+    API call.
+    """
+    checkpoint = load_checkpoint(checkpoint_path, eqjs_data)
+    drafts, audits = checkpoint["drafts"], checkpoint["audits"]
+
+    # Stage 1
+    stage1 = checkpoint["stage1"]
+    if stage1:
+        print("  Stage 1: resumed from checkpoint")
+    else:
+        print("  Stage 1: Q-Matrix Extraction...")
+        stage1 = _parse_stage_response((yield ("stage1", *build_stage1_prompt(eqjs_data))))
+        if not stage1:
+            print("  FAILED at Stage 1")
+            return {"status": "stage1_failed"}
+        checkpoint["stage1"] = stage1
+        save_checkpoint(checkpoint_path, checkpoint)
+
+    is_bo2 = stage1.get("diagram_dependent", False)
+    print(f"  diagram_dependent={is_bo2} -> {'Bo2' if is_bo2 else 'Single'} pathway")
+
+    # Stage 2
+    if drafts:
+        print("  Stage 2: resumed from checkpoint")
+        draft = drafts[0]
+    else:
+        print("  Stage 2: Generating candidates...")
+        if is_bo2:
+            request = build_stage2_bo2_prompt(eqjs_data, stage1)
+        else:
+            request = build_stage2_single_prompt(eqjs_data, stage1)
+        draft = _parse_stage_response((yield ("stage2", *request)))
+        if not draft:
+            print("  FAILED at Stage 2")
+            return {"status": "stage2_failed", "is_bo2": is_bo2}
+        drafts.append(draft)
+        save_checkpoint(checkpoint_path, checkpoint)
+
+    # Stage 3 with retry loop
+    retries = 0
+    audit = None
+    while retries <= MAX_RETRIES:
+        if len(audits) > retries:
+            print(f"  Stage 3: attempt {retries + 1} resumed from checkpoint")
+            audit = audits[retries]
+        else:
+            print(f"  Stage 3: Auditing (attempt {retries + 1})...")
+            request = build_stage3_prompt(eqjs_data, stage1, draft, is_bo2)
+            audit = _parse_stage_response((yield ("stage3", *request)))
+            if not audit:
+                print("  FAILED at Stage 3 audit call")
+                break
+            audits.append(audit)
+            save_checkpoint(checkpoint_path, checkpoint)
+        if audit.get("status") == "APPROVED":
+            print("  Audit: APPROVED")
+            break
+        retries += 1
+        if retries > checkpoint["retries"]:
+            checkpoint["retries"] = retries
+            save_checkpoint(checkpoint_path, checkpoint)
+        feedback = audit.get("critical_feedback", "No specific feedback.")
+        print(f"  Audit: REJECTED - {feedback}")
+        if retries <= MAX_RETRIES:
+            if len(drafts) > retries:
+                print(f"  Regenerated draft (retry {retries}) resumed from checkpoint")
+                draft = drafts[retries]
+                continue
+            print(f"  Regenerating with feedback (retry {retries})...")
+            request = build_stage2_feedback_prompt(eqjs_data, stage1, is_bo2, draft, feedback)
+            draft = _parse_stage_response((yield ("stage2_retry", *request)))
+            if not draft:
+                print("  FAILED during regeneration")
+                break
+            drafts.append(draft)
+            save_checkpoint(checkpoint_path, checkpoint)
+
+    return {
+        "status": "complete", "stage1": stage1, "draft": draft,
+        "audit": audit, "is_bo2": is_bo2, "retries": retries,
+    }
+
+
+def run_pipeline(client, eqjs_data: dict, checkpoint_path: Path | None = None,
+                 item_id: str = "") -> dict:
+    """Drive item_pipeline with blocking API calls."""
+    pipeline = item_pipeline(eqjs_data, checkpoint_path)
+    response = None
+    try:
+        while True:
+            stage, system_prompt, user_prompt = pipeline.send(response)
+            response = call_api(client, system_prompt, user_prompt, stage=stage, item_id=item_id)
+    except StopIteration as stop:
+        return stop.value
+
+
+async def run_pipeline_async(client, eqjs_data: dict, limiter: AsyncRateLimiter,
+                             checkpoint_path: Path | None = None, item_id: str = "") -> dict:
+    """Drive item_pipeline with non-blocking API calls."""
+    pipeline = item_pipeline(eqjs_data, checkpoint_path)
+    response = None
+    try:
+        while True:
+            stage, system_prompt, user_prompt = pipeline.send(response)
+            response = await call_api_async(client, system_prompt, user_prompt, limiter,
+                                            stage=stage, item_id=item_id)
+    except StopIteration as stop:
+        return stop.value
+
+
 def build_t2_rubric(stage1: dict) -> dict:
     """Build T2 rubric from Stage 1 output."""
     return {
@@ -402,23 +664,13 @@ def build_ainative_output(eqjs_data, stage1, draft, audit, is_bo2, retries):
             "retries": retries,
             "evaluation_details": audit.get("evaluation", {}) if audit else {},
         },
-        "calibration_config": compute_cold_start_params(eqjs_data),
+        "calibration_config": cold_start_params(eqjs_data),
     }
 
 
 def find_eqjs_files(item_filter=None):
-    """Find all EQJS files, optionally filtered by item ID."""
-    files = []
-    for paper_dir in sorted(EQJS_DIR.iterdir()):
-        if not paper_dir.is_dir() or paper_dir.name == ".gitkeep":
-            continue
-        for f in sorted(paper_dir.glob("Q*.json")):
-            if item_filter:
-                item_id = f"{paper_dir.name}_Q{f.stem[1:]}"
-                if item_id != item_filter:
-                    continue
-            files.append(f)
-    return files
+    """Find unconverted EQJS files from the manifest, optionally filtered by item ID."""
+    return manifest.find_unconverted(MANIFEST, item_filter)
 
 
 def get_ainative_path(eqjs_path: Path) -> Path:
@@ -428,12 +680,20 @@ def get_ainative_path(eqjs_path: Path) -> Path:
     return AINATIVE_DIR / paper_code / f"{qno}_ainative.json"
 
 
-def process_item(eqjs_path: Path, client, dry_run: bool = False):
-    """Process a single EQJS item through the Stage 1-2-3 pipeline."""
+def load_item(eqjs_path: Path, dry_run: bool = False) -> tuple[dict, str] | None:
+    """Load an EQJS item for processing.
+
+    Returns (eqjs_data, item_id), or None if the item is already converted or this
+    is a dry run. The file check guards existing (possibly human_approved) output
+    even when the manifest is missing or stale; the manifest is brought up to date.
+    """
     ainative_path = get_ainative_path(eqjs_path)
     if ainative_path.exists():
         print(f"  Already converted: {ainative_path}")
-        return
+        with open(ainative_path) as f:
+            status = json.load(f).get("approval_status", "unknown")
+        manifest.record_ainative(MANIFEST, ainative_path, status)
+        return None
 
     with open(eqjs_path) as f:
         eqjs_data = json.load(f)
@@ -448,68 +708,43 @@ def process_item(eqjs_path: Path, client, dry_run: bool = False):
             "item_id": item_id,
             "status": "dry_run",
         })
-        return
+        return None
 
-    # Stage 1
-    print("  Stage 1: Q-Matrix Extraction...")
-    stage1 = run_stage1(client, eqjs_data)
-    if not stage1:
-        print("  FAILED at Stage 1")
-        write_log(LOG_DIR, {
-            "timestamp": datetime.now(timezone.utc).isoformat(),
-            "item_id": item_id, "status": "stage1_failed",
-        })
-        return
+    return eqjs_data, item_id
 
-    is_bo2 = stage1.get("diagram_dependent", False)
-    print(f"  diagram_dependent={is_bo2} -> {'Bo2' if is_bo2 else 'Single'} pathway")
 
-    # Stage 2
-    print("  Stage 2: Generating candidates...")
-    draft = run_stage2_bo2(client, eqjs_data, stage1) if is_bo2 else run_stage2_single(client, eqjs_data, stage1)
-    if not draft:
-        print("  FAILED at Stage 2")
-        write_log(LOG_DIR, {
+def finish_item(eqjs_path: Path, eqjs_data: dict, item_id: str, result: dict):
+    """Write the AI-native file and logs for a pipeline result."""
+    write_span(PIPELINE, "item", item_id=item_id, status=result["status"],
+               retries=result.get("retries"))
+    if result["status"] != "complete":
+        entry = {
             "timestamp": datetime.now(timezone.utc).isoformat(),
-            "item_id": item_id, "status": "stage2_failed",
-            "diagram_dependent": is_bo2,
-        })
+            "item_id": item_id, "status": result["status"],
+        }
+        if "is_bo2" in result:
+            entry["diagram_dependent"] = result["is_bo2"]
+        write_log(LOG_DIR, entry)
         return
 
-    # Stage 3 with retry loop
-    retries = 0
-    audit = None
-    while retries <= MAX_RETRIES:
-        print(f"  Stage 3: Auditing (attempt {retries + 1})...")
-        audit = run_stage3_audit(client, eqjs_data, stage1, draft, is_bo2)
-        if not audit:
-            print("  FAILED at Stage 3 audit call")
-            break
-        if audit.get("status") == "APPROVED":
-            print("  Audit: APPROVED")
-            break
-        retries += 1
-        feedback = audit.get("critical_feedback", "No specific feedback.")
-        print(f"  Audit: REJECTED - {feedback}")
-        if retries <= MAX_RETRIES:
-            print(f"  Regenerating with feedback (retry {retries})...")
-            draft = run_stage2_with_feedback(client, eqjs_data, stage1, is_bo2, draft, feedback)
-            if not draft:
-                print("  FAILED during regeneration")
-                break
+    stage1, draft, audit = result["stage1"], result["draft"], result["audit"]
+    is_bo2, retries = result["is_bo2"], result["retries"]
 
     # Build and write output
+    ainative_path = get_ainative_path(eqjs_path)
     ainative = build_ainative_output(eqjs_data, stage1, draft, audit, is_bo2, retries)
+    validation = validate_ainative_data(ainative)
+    if not validation["valid"]:
+        print(f"  Validation warnings (writing anyway): {validation['errors']}")
+
     ainative_path.parent.mkdir(parents=True, exist_ok=True)
     temp_path = ainative_path.with_suffix(".tmp.json")
     with open(temp_path, "w") as f:
         json.dump(ainative, f, indent=2)
-
-    validation = validate_ainative(str(temp_path))
-    if not validation["valid"]:
-        print(f"  Validation warnings (writing anyway): {validation['errors']}")
     temp_path.rename(ainative_path)
     print(f"  Written: {ainative_path}")
+    manifest.record_ainative(MANIFEST, ainative_path, ainative["approval_status"])
+    get_checkpoint_path(eqjs_path).unlink(missing_ok=True)
 
     # Logging
     write_log(LOG_DIR, {
@@ -559,30 +794,179 @@ def process_item(eqjs_path: Path, client, dry_run: bool = False):
         })
 
 
+def process_item(eqjs_path: Path, client, dry_run: bool = False):
+    """Process a single EQJS item through the Stage 1-2-3 pipeline."""
+    loaded = load_item(eqjs_path, dry_run)
+    if not loaded:
+        return
+    eqjs_data, item_id = loaded
+    result = run_pipeline(client, eqjs_data, get_checkpoint_path(eqjs_path), item_id)
+    finish_item(eqjs_path, eqjs_data, item_id, result)
+
+
+async def process_item_async(eqjs_path: Path, client, limiter: AsyncRateLimiter,
+                             semaphore: asyncio.Semaphore, dry_run: bool = False):
+    """Process a single EQJS item on the async client, bounded by the semaphore."""
+    async with semaphore:
+        print(f"\n{'=' * 60}")
+        loaded = load_item(eqjs_path, dry_run)
+        if not loaded:
+            return
+        eqjs_data, item_id = loaded
+        result = await run_pipeline_async(client, eqjs_data, limiter,
+                                          get_checkpoint_path(eqjs_path), item_id)
+        finish_item(eqjs_path, eqjs_data, item_id, result)
+
+
+async def process_items_concurrently(eqjs_files: list[Path], client, concurrency: int,
+                                     dry_run: bool = False):
+    """Run up to `concurrency` items at once, sharing one API rate limiter."""
+    limiter = AsyncRateLimiter(MAX_CALLS_PER_MINUTE)
+    semaphore = asyncio.Semaphore(concurrency)
+    results = await asyncio.gather(
+        *(process_item_async(path, client, limiter, semaphore, dry_run) for path in eqjs_files),
+        return_exceptions=True,
+    )
+    for eqjs_path, result in zip(eqjs_files, results):
+        if isinstance(result, Exception):
+            print(f"  ERROR processing {eqjs_path}: {result!r}")
+
+
+def process_items_batched(eqjs_files: list[Path], backend: BatchBackend, dry_run: bool = False):
+    """Advance every item's pipeline in lockstep, submitting each wave as one batch.
+
+    Wave 1 holds every item's Stage 1 request, wave 2 their Stage 2 requests, and
+    so on through the Stage 3 audits and regenerations. Cached responses are
+    answered locally and never submitted.
+    """
+    active = {}
+    requests = {}
+
+    def advance(custom_id: str, response: str | None):
+        eqjs_path, eqjs_data, item_id, pipeline = active[custom_id]
+        print(f"  [{item_id}]")
+        try:
+            requests[custom_id] = pipeline.send(response)
+        except StopIteration as stop:
+            del active[custom_id]
+            finish_item(eqjs_path, eqjs_data, item_id, stop.value)
+
+    for index, eqjs_path in enumerate(eqjs_files):
+        print(f"\n{'=' * 60}")
+        loaded = load_item(eqjs_path, dry_run)
+        if not loaded:
+            continue
+        eqjs_data, item_id = loaded
+        custom_id = f"item-{index}"
+        pipeline = item_pipeline(eqjs_data, get_checkpoint_path(eqjs_path))
+        active[custom_id] = (eqjs_path, eqjs_data, item_id, pipeline)
+        advance(custom_id, None)
+
+    wave = 0
+    while requests:
+        wave += 1
+        wave_requests, requests = requests, {}
+        stages = Counter(stage for stage, _, _ in wave_requests.values())
+        print(f"\n{'=' * 60}")
+        print(f"Batch wave {wave}: {dict(stages)}")
+
+        responses = {}
+        to_submit = {}
+        for custom_id, (stage, system_prompt, user_prompt) in wave_requests.items():
+            cached = cached_response(system_prompt, user_prompt)
+            if cached is not None:
+                write_call_span(PIPELINE, stage, active[custom_id][2], 0, "response_cache", "ok", 0.0)
+                responses[custom_id] = cached
+            else:
+                to_submit[custom_id] = build_request_params(system_prompt, user_prompt)
+
+        def on_result(custom_id: str, text: str | None, usage):
+            PROMPT_CACHE_STATS.record(usage)
+            write_call_span(PIPELINE, wave_requests[custom_id][0], active[custom_id][2], 0,
+                            "batch", "ok" if text is not None else "error", usage=usage)
+
+        if to_submit:
+            for custom_id, text in run_batch(backend, to_submit, on_result=on_result).items():
+                responses[custom_id] = text
+                _stage, system_prompt, user_prompt = wave_requests[custom_id]
+                cache_response(system_prompt, user_prompt, text)
+
+        for custom_id in wave_requests:
+            advance(custom_id, responses.get(custom_id))
+
+
+def report_cache_stats():
+    """Print response and prompt cache statistics and record the prompt-cache totals as a span."""
+    if RESPONSE_CACHE:
+        print(f"\nResponse cache: {RESPONSE_CACHE.hits} hit(s), {RESPONSE_CACHE.misses} miss(es)")
+    PROMPT_CACHE_STATS.report()
+    if PROMPT_CACHE_STATS.calls:
+        write_span(PIPELINE, "prompt_cache", **PROMPT_CACHE_STATS.summary())
+
+
 def main():
     parser = argparse.ArgumentParser(description="Convert EQJS items to AI-native V8 schema")
     parser.add_argument("--item", type=str, help="Process only this item (format: paper_code_Qn)")
     parser.add_argument("--dry-run", action="store_true", help="Don't call API")
+    parser.add_argument("--concurrency", type=int, default=1,
+                        help="Process up to N items at once on an async client (default: 1)")
+    parser.add_argument("--batch", action="store_true",
+                        help="Submit each stage wave as one message batch job instead of direct calls")
+    parser.add_argument("--batch-base-url", type=str,
+                        help="Batch API base URL (e.g. a local stand-in batch server)")
+    parser.add_argument("--no-resume", action="store_true",
+                        help="Ignore saved stage checkpoints and start items from Stage 1")
+    add_cache_arguments(parser)
     args = parser.parse_args()
 
+    global RESPONSE_CACHE, RESUME_CHECKPOINTS, MANIFEST
+    RESUME_CHECKPOINTS = not args.no_resume
     load_v8_prompts()
 
+    if args.concurrency < 1:
+        print("ERROR: --concurrency must be at least 1")
+        sys.exit(1)
+    if args.batch and args.concurrency > 1:
+        print("ERROR: --batch and --concurrency are mutually exclusive")
+        sys.exit(1)
+
     if not args.dry_run:
         api_key = os.environ.get("ANTHROPIC_API_KEY")
         if not api_key:
             print("ERROR: ANTHROPIC_API_KEY environment variable not set")
             sys.exit(1)
-        client = anthropic.Anthropic(api_key=api_key)
+        if args.batch:
+            client = anthropic.Anthropic(api_key=api_key, base_url=args.batch_base_url)
+        elif args.concurrency > 1:
+            client = anthropic.AsyncAnthropic(api_key=api_key)
+        else:
+            client = anthropic.Anthropic(api_key=api_key)
+        RESPONSE_CACHE = cache_from_args(args)
     else:
         client = None
 
     LOG_DIR.mkdir(parents=True, exist_ok=True)
+    MANIFEST = manifest.connect()
     eqjs_files = find_eqjs_files(args.item)
     if not eqjs_files:
-        print("No EQJS files found to process.")
+        print("No unconverted EQJS files found.")
+        return
+
+    print(f"Found {len(eqjs_files)} unconverted EQJS file(s).")
+
+    if args.batch:
+        process_items_batched(eqjs_files, AnthropicBatchBackend(client), args.dry_run)
+        report_cache_stats()
+        print("\nDone.")
+        return
+
+    if args.concurrency > 1:
+        print(f"Concurrency: {args.concurrency} items at a time")
+        asyncio.run(process_items_concurrently(eqjs_files, client, args.concurrency, args.dry_run))
+        report_cache_stats()
+        print("\nDone.")
         return
 
-    print(f"Found {len(eqjs_files)} EQJS file(s) to check.")
     call_count = 0
     minute_start = time.time()
 
@@ -594,12 +978,14 @@ def main():
                 wait = 60 - elapsed
                 print(f"  Rate limit: waiting {wait:.1f}s")
                 time.sleep(wait)
+                write_span(PIPELINE, "rate_limit", sleep_s=round(wait, 3))
             call_count = 4
             minute_start = time.time()
 
         print(f"\n{'=' * 60}")
         process_item(eqjs_path, client, args.dry_run)
 
+    report_cache_stats()
     print("\nDone.")
 
 
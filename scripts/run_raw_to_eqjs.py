@@ -2,23 +2,32 @@
 """
 Daily cron script: convert new raw questions to EQJS-2.0.
 
-Usage: python scripts/run_raw_to_eqjs.py [--paper PAPER_CODE] [--dry-run]
+Usage: python scripts/run_raw_to_eqjs.py [--paper PAPER_CODE] [--dry-run] [--batch [--batch-base-url URL]]
+                                         [--no-cache] [--refresh]
 
 Algorithm:
 1. List all paper folders in raw/
 2. For each paper, list expected question numbers
-3. Check eqjs/{paper}/ for existing conversions
+3. Check the pipeline manifest (manifest.py) for existing conversions
 4. For each missing question:
    a. Load working-state-capsule.md
    b. Load question text, statistics, examiner comments
-   c. Detect diagram -> load protocol if needed
+   c. Detect diagram -> load protocol if needed (trigger automaton, see protocol_matcher.py)
    d. Call Anthropic API with assembled prompt
    e. Parse and validate response
-   f. Write to eqjs/ if valid
+   f. Write to eqjs/ if valid and record it in the manifest
    g. Log to metadata/conversion-logs/raw-to-eqjs/
 
 Rate limit: max 10 API calls per minute.
 Retry: 3 attempts with exponential backoff on API errors.
+Cache: responses are cached in .cache/llm-responses/ (see response_cache.py).
+Prompt cache: the capsule system prompt is sent as a cacheable prefix once it
+is long enough to cache, and the cache read/write token counts are recorded
+per run as a telemetry span (see prompt_cache.py).
+Telemetry: every API call is recorded as a span in metadata/performance-data/
+(summarise with scripts/telemetry.py).
+Batch: with --batch, all questions go out as one message batch job with no
+per-minute throttle (see batch_backend.py).
 """
 
 import argparse
@@ -27,6 +36,7 @@ import os
 import sys
 import time
 from datetime import datetime, timezone
+from functools import lru_cache
 from pathlib import Path
 
 try:
@@ -35,7 +45,13 @@ except ImportError:
     print("ERROR: anthropic package not installed. Run: pip install anthropic")
     sys.exit(1)
 
-from validate_eqjs import validate_eqjs
+import manifest
+from batch_backend import AnthropicBatchBackend, BatchBackend, run_batch
+from prompt_cache import PromptCacheStats, cached_system_prompt
+from protocol_matcher import ProtocolMatcher
+from response_cache import add_cache_arguments, cache_from_args
+from telemetry import write_call_span, write_span
+from validate_eqjs import validate_eqjs_data
 
 ROOT = Path(__file__).parent.parent
 RAW_DIR = ROOT / "raw"
@@ -44,9 +60,16 @@ CONFIG_DIR = ROOT / "config"
 LOG_DIR = ROOT / "metadata" / "conversion-logs" / "raw-to-eqjs"
 REGISTRY_PATH = ROOT / "protocols" / "protocol-registry.json"
 
+PIPELINE = "raw-to-eqjs"
+STAGE = "eqjs_conversion"
 MODEL = "claude-sonnet-4-5-20250929"
 MAX_CALLS_PER_MINUTE = 10
 MAX_RETRIES = 3
+MAX_TOKENS = 4096
+
+RESPONSE_CACHE = None
+PROMPT_CACHE_STATS = PromptCacheStats()
+MANIFEST = None
 
 
 def load_working_state_capsule() -> str:
@@ -62,14 +85,15 @@ def load_protocol_registry() -> dict:
         return json.load(f)
 
 
-def detect_protocol(question_text: str, registry: dict) -> str | None:
-    """Match question text against protocol trigger keywords."""
-    text_lower = question_text.lower()
-    for proto in registry.get("protocols", []):
-        for trigger in proto.get("triggers", []):
-            if trigger.lower() in text_lower:
-                return proto["id"]
-    return None
+@lru_cache(maxsize=None)
+def get_protocol_matcher() -> ProtocolMatcher:
+    """Compile the registry's triggers into a matcher once per run."""
+    return ProtocolMatcher(load_protocol_registry())
+
+
+def detect_protocol(question_text: str, matcher: ProtocolMatcher) -> str | None:
+    """Match question text against protocol trigger keywords (best-ranked protocol)."""
+    return matcher.best(question_text)
 
 
 def load_raw_question(paper_dir: Path, qno: int) -> dict | None:
@@ -137,27 +161,54 @@ def build_user_prompt(question_data: dict, protocol_id: str | None, paper_code:
     return "\n".join(parts)
 
 
-def call_api(client: anthropic.Anthropic, system_prompt: str, user_prompt: str, retry: int = 0) -> str | None:
-    """Call the Anthropic API with retry logic."""
+def build_request_params(system_prompt: str, user_prompt: str) -> dict:
+    """Message parameters shared by direct and batch API calls.
+
+    The static system prompt (the working-state capsule) is marked as a cacheable prefix.
+    """
+    return {
+        "model": MODEL,
+        "max_tokens": MAX_TOKENS,
+        "system": cached_system_prompt(system_prompt),
+        "messages": [{"role": "user", "content": user_prompt}],
+    }
+
+
+def call_api(client: anthropic.Anthropic, system_prompt: str, user_prompt: str, retry: int = 0,
+             item_id: str = "") -> str | None:
+    """Call the Anthropic API with retry logic, serving repeats from the response cache.
+
+    Each attempt is recorded as a telemetry span tagged with item_id.
+    """
+    if retry == 0:
+        cached = cached_response(system_prompt, user_prompt)
+        if cached is not None:
+            write_call_span(PIPELINE, STAGE, item_id, retry, "response_cache", "ok", 0.0)
+            return cached
+    started = time.monotonic()
     try:
-        response = client.messages.create(
-            model=MODEL,
-            max_tokens=4096,
-            system=system_prompt,
-            messages=[{"role": "user", "content": user_prompt}],
-        )
-        return response.content[0].text
+        response = client.messages.create(**build_request_params(system_prompt, user_prompt))
+        latency = time.monotonic() - started
+        PROMPT_CACHE_STATS.record(response.usage, latency)
+        write_call_span(PIPELINE, STAGE, item_id, retry, "api", "ok", latency, response.usage)
+        text = response.content[0].text
+        cache_response(system_prompt, user_prompt, text)
+        return text
     except anthropic.APIError as e:
+        latency = time.monotonic() - started
         if retry < MAX_RETRIES:
             wait = 2 ** (retry + 1)
+            write_call_span(PIPELINE, STAGE, item_id, retry, "api", "error", latency,
+                            error=type(e).__name__, backoff_s=wait)
             print(f"  API error (attempt {retry + 1}/{MAX_RETRIES}): {e}. Retrying in {wait}s...")
             time.sleep(wait)
-            return call_api(client, system_prompt, user_prompt, retry + 1)
+            return call_api(client, system_prompt, user_prompt, retry + 1, item_id)
+        write_call_span(PIPELINE, STAGE, item_id, retry, "api", "error", latency, error=type(e).__name__)
         print(f"  API error after {MAX_RETRIES} retries: {e}")
         return None
 
 
-def parse_json_response(response_text: str) -> dict | None:
+def parse_json_response(response_text: str, quiet: bool = False) -> dict | None:
     """Extract JSON from the API response."""
     text = response_text.strip()
     # Remove markdown fences if present
@@ -171,8 +222,29 @@ def parse_json_response(response_text: str) -> dict | None:
     try:
         return json.loads(text)
     except json.JSONDecodeError as e:
-        print(f"  Failed to parse JSON: {e}")
+        if not quiet:
+            print(f"  Failed to parse JSON: {e}")
+        return None
+
+
+def cached_response(system_prompt: str, user_prompt: str) -> str | None:
+    """A cached reply for this request, if any (entries that no longer parse are ignored).
+
+    Keyed on the exact system blocks sent (see build_request_params), so any
+    change to what the model is sent misses the cache.
+    """
+    if not RESPONSE_CACHE:
+        return None
+    text = RESPONSE_CACHE.get(MODEL, cached_system_prompt(system_prompt), user_prompt, MAX_TOKENS)
+    if text is None or parse_json_response(text, quiet=True) is None:
         return None
+    return text
+
+
+def cache_response(system_prompt: str, user_prompt: str, text: str | None):
+    """Cache a reply only once it parses as JSON, so a malformed one is never replayed."""
+    if RESPONSE_CACHE and text is not None and parse_json_response(text, quiet=True) is not None:
+        RESPONSE_CACHE.put(MODEL, cached_system_prompt(system_prompt), user_prompt, MAX_TOKENS, text)
 
 
 def write_log(log_dir: Path, entry: dict):
@@ -194,35 +266,156 @@ def get_paper_question_numbers(paper_dir: Path) -> list[int]:
     return sorted(numbers)
 
 
-def process_paper(paper_code: str, client: anthropic.Anthropic, dry_run: bool = False):
-    """Process all unconverted questions in a paper."""
+def prepare_question(paper_code: str, paper_dir: Path, qno: int, matcher: ProtocolMatcher,
+                     dry_run: bool = False) -> tuple[str, str | None] | None:
+    """Load a raw question and build its prompt.
+
+    Returns (user_prompt, protocol_id), or None if there is no source file or this
+    is a dry run.
+    """
+    question_data = load_raw_question(paper_dir, qno)
+    if not question_data:
+        print(f"  Q{qno}: no source file found, skipping")
+        write_log(LOG_DIR, {
+            "timestamp": datetime.now(timezone.utc).isoformat(),
+            "paper_code": paper_code,
+            "question": qno,
+            "status": "skipped",
+            "reason": "no_source_file"
+        })
+        return None
+
+    # Detect protocol
+    protocol_id = detect_protocol(question_data.get("text", ""), matcher)
+    if protocol_id:
+        print(f"  Q{qno}: detected protocol {protocol_id}")
+
+    # Build prompt
+    user_prompt = build_user_prompt(question_data, protocol_id, paper_code)
+
+    if dry_run:
+        print(f"  Q{qno}: [DRY RUN] would call API with {len(user_prompt)} char prompt")
+        write_log(LOG_DIR, {
+            "timestamp": datetime.now(timezone.utc).isoformat(),
+            "paper_code": paper_code,
+            "question": qno,
+            "status": "dry_run",
+            "protocol_detected": protocol_id
+        })
+        return None
+
+    return user_prompt, protocol_id
+
+
+def finish_question(paper_code: str, qno: int, protocol_id: str | None, response_text: str | None):
+    """Parse, validate and write one API response, logging the outcome.
+
+    The outcome is also recorded as an item telemetry span.
+    """
+    eqjs_paper_dir = EQJS_DIR / paper_code
+    eqjs_path = eqjs_paper_dir / f"Q{qno}.json"
+
+    if not response_text:
+        write_log(LOG_DIR, {
+            "timestamp": datetime.now(timezone.utc).isoformat(),
+            "paper_code": paper_code,
+            "question": qno,
+            "status": "api_error",
+            "protocol_detected": protocol_id
+        })
+        write_span(PIPELINE, "item", item_id=f"{paper_code}_Q{qno}", status="api_error")
+        return
+
+    # Parse response
+    eqjs_data = parse_json_response(response_text)
+    if not eqjs_data:
+        write_log(LOG_DIR, {
+            "timestamp": datetime.now(timezone.utc).isoformat(),
+            "paper_code": paper_code,
+            "question": qno,
+            "status": "parse_error",
+            "protocol_detected": protocol_id
+        })
+        write_span(PIPELINE, "item", item_id=f"{paper_code}_Q{qno}", status="parse_error")
+        return
+
+    # Validate
+    validation = validate_eqjs_data(eqjs_data)
+    if not validation["valid"]:
+        print(f"  Q{qno}: validation FAILED: {validation['errors']}")
+        write_log(LOG_DIR, {
+            "timestamp": datetime.now(timezone.utc).isoformat(),
+            "paper_code": paper_code,
+            "question": qno,
+            "status": "validation_failed",
+            "errors": validation["errors"],
+            "warnings": validation["warnings"],
+            "protocol_detected": protocol_id
+        })
+        write_span(PIPELINE, "item", item_id=f"{paper_code}_Q{qno}", status="validation_failed")
+        return
+
+    # Write to temp file, then rename to final
+    temp_path = eqjs_paper_dir / f"Q{qno}_temp.json"
+    with open(temp_path, "w") as f:
+        json.dump(eqjs_data, f, indent=2)
+    temp_path.rename(eqjs_path)
+    print(f"  Q{qno}: SUCCESS -> {eqjs_path}")
+    manifest.record_eqjs(MANIFEST, eqjs_path)
+
+    if validation["warnings"]:
+        print(f"  Q{qno}: warnings: {validation['warnings']}")
+
+    write_log(LOG_DIR, {
+        "timestamp": datetime.now(timezone.utc).isoformat(),
+        "paper_code": paper_code,
+        "question": qno,
+        "status": "success",
+        "output_file": str(eqjs_path),
+        "warnings": validation["warnings"],
+        "protocol_detected": protocol_id
+    })
+    write_span(PIPELINE, "item", item_id=f"{paper_code}_Q{qno}", status="success")
+
+
+def find_unconverted_questions(paper_code: str) -> list[int]:
+    """List a paper's question numbers that have no EQJS file yet."""
     paper_dir = RAW_DIR / paper_code
     if not paper_dir.exists():
         print(f"Paper directory not found: {paper_dir}")
-        return
+        return []
 
     eqjs_paper_dir = EQJS_DIR / paper_code
     eqjs_paper_dir.mkdir(parents=True, exist_ok=True)
 
-    system_prompt = load_working_state_capsule()
-    registry = load_protocol_registry()
     question_numbers = get_paper_question_numbers(paper_dir)
-
     if not question_numbers:
         print(f"No questions found in {paper_dir}")
-        return
+        return []
 
     print(f"Paper {paper_code}: found questions {question_numbers}")
-    call_count = 0
-    minute_start = time.time()
-
+    missing = []
     for qno in question_numbers:
-        # Check if already converted
-        eqjs_path = eqjs_paper_dir / f"Q{qno}.json"
-        if eqjs_path.exists():
+        if manifest.has_eqjs(MANIFEST, paper_code, qno):
             print(f"  Q{qno}: already converted, skipping")
             continue
+        missing.append(qno)
+    return missing
+
+
+def process_paper(paper_code: str, client: anthropic.Anthropic, dry_run: bool = False):
+    """Process all unconverted questions in a paper."""
+    question_numbers = find_unconverted_questions(paper_code)
+    if not question_numbers:
+        return
 
+    paper_dir = RAW_DIR / paper_code
+    system_prompt = load_working_state_capsule()
+    matcher = get_protocol_matcher()
+    call_count = 0
+    minute_start = time.time()
+
+    for qno in question_numbers:
         # Rate limiting
         call_count += 1
         if call_count > MAX_CALLS_PER_MINUTE:
@@ -231,121 +424,101 @@ def process_paper(paper_code: str, client: anthropic.Anthropic, dry_run: bool =
                 wait = 60 - elapsed
                 print(f"  Rate limit: waiting {wait:.1f}s")
                 time.sleep(wait)
+                write_span(PIPELINE, "rate_limit", sleep_s=round(wait, 3))
             call_count = 1
             minute_start = time.time()
 
-        # Load question
-        question_data = load_raw_question(paper_dir, qno)
-        if not question_data:
-            print(f"  Q{qno}: no source file found, skipping")
-            write_log(LOG_DIR, {
-                "timestamp": datetime.now(timezone.utc).isoformat(),
-                "paper_code": paper_code,
-                "question": qno,
-                "status": "skipped",
-                "reason": "no_source_file"
-            })
-            continue
-
-        # Detect protocol
-        protocol_id = detect_protocol(question_data.get("text", ""), registry)
-        if protocol_id:
-            print(f"  Q{qno}: detected protocol {protocol_id}")
-
-        # Build prompt
-        user_prompt = build_user_prompt(question_data, protocol_id, paper_code)
-
-        if dry_run:
-            print(f"  Q{qno}: [DRY RUN] would call API with {len(user_prompt)} char prompt")
-            write_log(LOG_DIR, {
-                "timestamp": datetime.now(timezone.utc).isoformat(),
-                "paper_code": paper_code,
-                "question": qno,
-                "status": "dry_run",
-                "protocol_detected": protocol_id
-            })
+        prepared = prepare_question(paper_code, paper_dir, qno, matcher, dry_run)
+        if not prepared:
             continue
+        user_prompt, protocol_id = prepared
 
         # Call API
         print(f"  Q{qno}: calling API...")
-        response_text = call_api(client, system_prompt, user_prompt)
-        if not response_text:
-            write_log(LOG_DIR, {
-                "timestamp": datetime.now(timezone.utc).isoformat(),
-                "paper_code": paper_code,
-                "question": qno,
-                "status": "api_error",
-                "protocol_detected": protocol_id
-            })
-            continue
+        response_text = call_api(client, system_prompt, user_prompt, item_id=f"{paper_code}_Q{qno}")
+        finish_question(paper_code, qno, protocol_id, response_text)
 
-        # Parse response
-        eqjs_data = parse_json_response(response_text)
-        if not eqjs_data:
-            write_log(LOG_DIR, {
-                "timestamp": datetime.now(timezone.utc).isoformat(),
-                "paper_code": paper_code,
-                "question": qno,
-                "status": "parse_error",
-                "protocol_detected": protocol_id
-            })
-            continue
 
-        # Write to temp file for validation
-        temp_path = eqjs_paper_dir / f"Q{qno}_temp.json"
-        with open(temp_path, "w") as f:
-            json.dump(eqjs_data, f, indent=2)
-
-        # Validate
-        validation = validate_eqjs(str(temp_path))
-        if not validation["valid"]:
-            print(f"  Q{qno}: validation FAILED: {validation['errors']}")
-            temp_path.unlink()
-            write_log(LOG_DIR, {
-                "timestamp": datetime.now(timezone.utc).isoformat(),
-                "paper_code": paper_code,
-                "question": qno,
-                "status": "validation_failed",
-                "errors": validation["errors"],
-                "warnings": validation["warnings"],
-                "protocol_detected": protocol_id
-            })
-            continue
+def process_papers_batched(papers: list[str], backend: BatchBackend, dry_run: bool = False):
+    """Convert every unconverted question of every paper in one message batch job."""
+    system_prompt = load_working_state_capsule()
+    matcher = get_protocol_matcher()
+    questions = {}
+    responses = {}
+    to_submit = {}
 
-        # Rename temp to final
-        temp_path.rename(eqjs_path)
-        print(f"  Q{qno}: SUCCESS -> {eqjs_path}")
+    for paper_code in papers:
+        print(f"\n{'='*60}")
+        print(f"Preparing: {paper_code}")
+        print(f"{'='*60}")
+        paper_dir = RAW_DIR / paper_code
+        for qno in find_unconverted_questions(paper_code):
+            prepared = prepare_question(paper_code, paper_dir, qno, matcher, dry_run)
+            if not prepared:
+                continue
+            user_prompt, protocol_id = prepared
+            custom_id = f"{len(questions)}-Q{qno}"
+            questions[custom_id] = (paper_code, qno, protocol_id, user_prompt)
+            cached = cached_response(system_prompt, user_prompt)
+            if cached is not None:
+                write_call_span(PIPELINE, STAGE, f"{paper_code}_Q{qno}", 0, "response_cache", "ok", 0.0)
+                responses[custom_id] = cached
+            else:
+                to_submit[custom_id] = build_request_params(system_prompt, user_prompt)
+
+    if not questions:
+        return
 
-        if validation["warnings"]:
-            print(f"  Q{qno}: warnings: {validation['warnings']}")
+    def on_result(custom_id: str, text: str | None, usage):
+        paper_code, qno = questions[custom_id][:2]
+        PROMPT_CACHE_STATS.record(usage)
+        write_call_span(PIPELINE, STAGE, f"{paper_code}_Q{qno}", 0, "batch",
+                        "ok" if text is not None else "error", usage=usage)
 
-        write_log(LOG_DIR, {
-            "timestamp": datetime.now(timezone.utc).isoformat(),
-            "paper_code": paper_code,
-            "question": qno,
-            "status": "success",
-            "output_file": str(eqjs_path),
-            "warnings": validation["warnings"],
-            "protocol_detected": protocol_id
-        })
+    print(f"\nBatch: {len(to_submit)} request(s) to submit, {len(responses)} served from cache")
+    if to_submit:
+        for custom_id, text in run_batch(backend, to_submit, on_result=on_result).items():
+            responses[custom_id] = text
+            cache_response(system_prompt, questions[custom_id][3], text)
+
+    for custom_id, (paper_code, qno, protocol_id, _user_prompt) in questions.items():
+        finish_question(paper_code, qno, protocol_id, responses.get(custom_id))
+
+
+def report_cache_stats():
+    """Print response and prompt cache statistics and record the prompt-cache totals as a span."""
+    if RESPONSE_CACHE:
+        print(f"\nResponse cache: {RESPONSE_CACHE.hits} hit(s), {RESPONSE_CACHE.misses} miss(es)")
+    PROMPT_CACHE_STATS.report()
+    if PROMPT_CACHE_STATS.calls:
+        write_span(PIPELINE, "prompt_cache", **PROMPT_CACHE_STATS.summary())
 
 
 def main():
     parser = argparse.ArgumentParser(description="Convert raw questions to EQJS-2.0")
     parser.add_argument("--paper", type=str, help="Process only this paper code")
     parser.add_argument("--dry-run", action="store_true", help="Don't call API, just show what would happen")
+    parser.add_argument("--batch", action="store_true",
+                        help="Submit all questions as one message batch job instead of direct calls")
+    parser.add_argument("--batch-base-url", type=str,
+                        help="Batch API base URL (e.g. a local stand-in batch server)")
+    add_cache_arguments(parser)
     args = parser.parse_args()
 
+    global RESPONSE_CACHE, MANIFEST
+
     if not args.dry_run:
         api_key = os.environ.get("ANTHROPIC_API_KEY")
         if not api_key:
             print("ERROR: ANTHROPIC_API_KEY environment variable not set")
             sys.exit(1)
-        client = anthropic.Anthropic(api_key=api_key)
+        client = anthropic.Anthropic(api_key=api_key, base_url=args.batch_base_url if args.batch else None)
+        RESPONSE_CACHE = cache_from_args(args)
     else:
         client = None
 
     LOG_DIR.mkdir(parents=True, exist_ok=True)
+    MANIFEST = manifest.connect()
 
     if args.paper:
         papers = [args.paper]
@@ -357,12 +530,16 @@ def main():
         return
 
     print(f"Processing papers: {papers}")
-    for paper_code in papers:
-        print(f"\n{'='*60}")
-        print(f"Processing: {paper_code}")
-        print(f"{'='*60}")
-        process_paper(paper_code, client, args.dry_run)
+    if args.batch:
+        process_papers_batched(papers, AnthropicBatchBackend(client), args.dry_run)
+    else:
+        for paper_code in papers:
+            print(f"\n{'='*60}")
+            print(f"Processing: {paper_code}")
+            print(f"{'='*60}")
+            process_paper(paper_code, client, args.dry_run)
 
+    report_cache_stats()
     print("\nDone.")
 
 
@@ -0,0 +1,754 @@
+#!/usr/bin/env python3
+"""
+Async diagnostic session server for the V8 runtime cascade (manual §7).
+
+Usage: python scripts/session_server.py serve [--host HOST] [--port PORT]
+       python scripts/session_server.py simulate [--students N] [--rater stub|batched|llm]
+
+The calibrated item pool (T1 MCQs, T3 probes, T4 transfers with their GPCM/NRM
+likelihood tables, see eap_scoring.py) and the mixture class parameters are
+loaded at start-up. Item selection uses a SelectionIndex built with the pool:
+every item's Fisher information on the θ grid, and per (concept, tier) the
+SELECTION_CANDIDATES most informative items at each grid point, so choosing
+an item is a lookup rather than a scan. When metadata/calibration/item-params/
+changes (checked at most every POOL_CHECK_SECONDS as sessions start), the
+pool and index are rebuilt in a worker thread and swapped in; sessions
+already running finish on the pool they started with. Each session then
+runs run_diagnostic_session():
+
+  prior (§5.4) -> select T1 -> T1 response -> T2 reasoning -> T2 rater (§5.1)
+  -> joint score (§5.2) -> EAP/GPCM -> mastery gate -> select T3 -> T3 response
+  -> routing_LoK gate -> EAP/NRM -> select T4 -> T4 response -> EAP/NRM
+  -> mixture adjustment (§5.5) -> diagnostic vector (§5.6) -> save
+
+Sessions run concurrently on one event loop; nothing blocks except the
+student's answers and the T2 rater, any t2_scorer.T2Rater (--rater):
+- stub: StubT2Rater scores each response locally by rubric concept overlap
+- batched: BatchedT2Rater over the stub backend (caching, micro-batching)
+- llm: BatchedT2Rater over the §5.1 LLM rater (needs ANTHROPIC_API_KEY)
+--rater-latency simulates LLM latency for the stub raters.
+
+Per-step latency is measured for every non-waiting step (and separately for
+the rater) and reported as p50/p95/max.
+
+serve: one session per TCP connection, newline-delimited JSON. The client sends
+{"student_id", "concept_id"}; the server sends {"type": "question", ...}
+prompts, the client answers {"answer": ...}; the session ends with
+{"type": "result", "session": <§8.1 record>}. Sessions are appended to
+metadata/diagnostic-sessions/{date}_sessions.jsonl. Priors (§5.4) are read
+from the memory-mapped profile store (profile_store.py), and each saved
+session's final θ/SE is written back to it.
+
+simulate: N simulated students answer from a true θ, all at once, and the
+latency report is printed. Sessions are not saved unless --save is given.
+
+Items come from approved ai-native files (auto_approved or human_approved):
+T1 is the source EQJS question, T3/T4 the selected pathway's probe and
+transfer. Parameters come from §8.2 records when calibrated
+({item_id}, {item_id}_T3, {item_id}_T4), otherwise from the cold-start LLTM
+parameters and DEFAULT_NRM_SLOPES. person_fit_lz_star is not computed yet.
+
+Requires numpy (see eap_scoring.py).
+"""
+
+import argparse
+import asyncio
+import json
+import math
+import os
+import random
+import sys
+import time
+from collections import defaultdict
+from datetime import datetime, timezone
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent))
+from eap_scoring import (GRID, GRID_POINTS, GRID_SPACING, NO_RESPONSE, ROUTING_LOK, ItemBank, eap_update,
+                         gaussian_prior)
+from profile_store import ProfileStore, open_store, validate_student_id
+from t2_scorer import (DEFAULT_MAX_WAIT_MS, AnthropicT2Backend, BatchedT2Rater, StubT2Backend, StubT2Rater,
+                       T2Rater, T2ScoringError, default_cache)
+from telemetry import percentile
+
+import numpy as np
+
+ROOT = Path(__file__).parent.parent
+AINATIVE_DIR = ROOT / "ai-native"
+ITEM_PARAMS_DIR = ROOT / "metadata" / "calibration" / "item-params"
+MIXTURE_PARAMS_PATH = ROOT / "metadata" / "calibration" / "mixture-params.json"
+SESSION_LOG_DIR = ROOT / "metadata" / "diagnostic-sessions"
+
+USABLE_STATUSES = {"auto_approved", "human_approved"}
+SELECTION_CANDIDATES = 5
+POOL_CHECK_SECONDS = 5.0
+MASTERY = "Mastery"
+LACK_OF_KNOWLEDGE = "Lack_of_Knowledge"
+ABERRANT = "Aberrant"
+# Cold-start NRM slopes: mastery rises with θ, misconceptions fall
+DEFAULT_NRM_SLOPES = {MASTERY: 1.0, "misconception": -0.5}
+DEFAULT_MIXTURE_PARAMS = {
+    "class_1": {"label": "engaged", "pi": 0.85},
+    "class_2": {"label": "aberrant", "pi": 0.15, "guessing": 0.5},
+}
+
+
+# ═══════════════════════════════════════════════════════════════
+# ITEM POOL
+# ═══════════════════════════════════════════════════════════════
+
+def item_information(bank: ItemBank, item_id: str, slopes: np.ndarray) -> np.ndarray:
+    """Fisher information of an item across the grid.
+
+    slopes are the per-category score slopes: α·k for GPCM, a_k for NRM, so
+    I(θ) = Σ s_k² P_k - (Σ s_k P_k)² in both cases.
+    """
+    rows = list(bank.rows[item_id].values())
+    probs = bank.table[rows]
+    mean = slopes @ probs
+    return (slopes ** 2) @ probs - mean ** 2
+
+
+def grid_index(theta: float) -> int:
+    """Nearest quadrature point to θ."""
+    return min(max(int(round((theta - GRID[0]) / GRID_SPACING)), 0), GRID_POINTS - 1)
+
+
+def params_signature(item_params_dir: Path = ITEM_PARAMS_DIR) -> int | None:
+    """Changes whenever a §8.2 record is written (atomic replace) or removed."""
+    try:
+        return item_params_dir.stat().st_mtime_ns
+    except FileNotFoundError:
+        return None
+
+
+class SelectionIndex:
+    """Per (concept, tier) candidate lists ranked by Fisher information at each grid point.
+
+    select_item_mfi / select_item_diagnostic become a grid lookup plus a scan
+    of at most SELECTION_CANDIDATES items; the full bucket is only scanned if
+    every candidate is excluded.
+    """
+
+    def __init__(self, buckets: dict, information: dict, candidates: int = SELECTION_CANDIDATES):
+        self.information = information
+        self.items = {}
+        self.ranked = {}
+        for key, items in buckets.items():
+            if not items:
+                continue
+            info = np.vstack([information[item["item_id"]] for item in items])
+            self.items[key] = items
+            self.ranked[key] = np.argsort(-info, axis=0, kind="stable")[:candidates].T.tolist()
+
+    def select(self, concept_id: str, tier: str, theta: float, exclude=()) -> dict | None:
+        items = self.items.get((concept_id, tier))
+        if not items:
+            return None
+        index = grid_index(theta)
+        for i in self.ranked[(concept_id, tier)][index]:
+            if items[i]["item_id"] not in exclude:
+                return items[i]
+        remaining = [item for item in items if item["item_id"] not in exclude]
+        if not remaining:
+            return None
+        return max(remaining, key=lambda item: self.information[item["item_id"]][index])
+
+
+class ItemPool:
+    """Approved concepts and their T1/T3/T4 items, held in memory."""
+
+    def __init__(self):
+        self.bank = ItemBank()
+        self.items = {}
+        self.concepts = defaultdict(lambda: {"T1": [], "T3": [], "T4": []})
+        self.information = {}
+        self.index = None
+        self.sources = (AINATIVE_DIR, ITEM_PARAMS_DIR)
+        self.signature = None
+
+    @classmethod
+    def load(cls, ainative_dir: Path = AINATIVE_DIR, item_params_dir: Path = ITEM_PARAMS_DIR) -> "ItemPool":
+        signature = params_signature(item_params_dir)
+        records = {}
+        if item_params_dir.exists():
+            for path in sorted(item_params_dir.glob("*.json")):
+                with open(path) as f:
+                    record = json.load(f)
+                records[record["item_id"]] = record
+
+        pool = cls()
+        for path in sorted(ainative_dir.glob("*/*_ainative.json")):
+            with open(path) as f:
+                data = json.load(f)
+            if data.get("approval_status") in USABLE_STATUSES:
+                pool.add_concept(data, records)
+        pool.build_index()
+        pool.sources = (ainative_dir, item_params_dir)
+        pool.signature = signature
+        return pool
+
+    def add_concept(self, ainative: dict, records: dict):
+        concept_id = ainative["source_eqjs_id"]
+        eqjs = {}
+        source = ROOT / ainative.get("source_eqjs_file", "")
+        if source.is_file():
+            with open(source) as f:
+                eqjs = json.load(f)
+        content = eqjs.get("content", {})
+        candidates = ainative.get("candidates", {})
+        pathway = candidates.get(f"pathway_{candidates.get('selected_candidate') or 'A'}", {})
+        q_matrix = ainative.get("stage1_output", {}).get("q_matrix", {})
+        base = {"concept_id": concept_id, "q_matrix": list(q_matrix), "t2_rubric": ainative.get("t2_rubric", {})}
+
+        t1 = {**base, "item_id": concept_id, "tier": "T1",
+              "prompt": content.get("question_text", ""), "options": content.get("options", {}),
+              "correct_answer": eqjs.get("solution", {}).get("correct_answer")}
+        record = records.get(t1["item_id"])
+        if record:
+            self.bank.add_record(record)
+            params = record["parameters"]
+        else:
+            params = ainative.get("calibration_config", {}).get("lltm_predicted_params",
+                                                                 {"alpha": 1.0, "beta": 0.0, "d_steps": [-0.5, 0.0, 0.5]})
+            self.bank.add_gpcm(t1["item_id"], params["alpha"], params["beta"], params["d_steps"])
+        self._register(t1, params["alpha"] * np.arange(len(params["d_steps"]) + 1))
+
+        for tier, key in (("T3", "T3_probe"), ("T4", "T4_transfer")):
+            probe = pathway.get(key)
+            if not probe:
+                continue
+            options = probe.get("options", {})
+            item = {**base, "item_id": f"{concept_id}_{tier}", "tier": tier, "prompt": probe.get("prompt", ""),
+                    "options": {k: v.get("text", "") for k, v in options.items()},
+                    "maps_to": {k: v.get("maps_to") for k, v in options.items()}}
+            categories = [c for c in dict.fromkeys(item["maps_to"].values()) if c and c != ROUTING_LOK]
+            record = records.get(item["item_id"])
+            if record:
+                slopes = record["parameters"]["category_slopes"]
+                intercepts = record["parameters"]["category_intercepts"]
+            else:
+                slopes = {c: DEFAULT_NRM_SLOPES[MASTERY if c == MASTERY else "misconception"] for c in categories}
+                intercepts = {c: 0.0 for c in categories}
+            self.bank.add_nrm(item["item_id"], slopes, intercepts)
+            self._register(item, np.array([slopes[c] for c in slopes]))
+
+    def _register(self, item: dict, slopes: np.ndarray):
+        self.items[item["item_id"]] = item
+        self.concepts[item["concept_id"]][item["tier"]].append(item)
+        self.information[item["item_id"]] = item_information(self.bank, item["item_id"], slopes)
+        self.index = None
+
+    def build_index(self):
+        buckets = {(concept_id, tier): items for concept_id, tiers in self.concepts.items()
+                   for tier, items in tiers.items()}
+        self.index = SelectionIndex(buckets, self.information)
+
+    def select(self, concept_id: str, tier: str, theta: float, exclude=()) -> dict | None:
+        """Most informative item of a tier at θ (select_item_mfi / select_item_diagnostic)."""
+        if self.index is None:
+            self.build_index()
+        return self.index.select(concept_id, tier, theta, exclude)
+
+
+# ═══════════════════════════════════════════════════════════════
+# SCORING STEPS (§5.2, §5.5, §5.6)
+# ═══════════════════════════════════════════════════════════════
+
+def compute_joint_score(t1_correct: bool, t2_score: int) -> int:
+    """§5.2 joint T1+T2 score."""
+    if not t1_correct:
+        return 0 if t2_score <= 1 else 1
+    return 2 if t2_score <= 1 else 3
+
+
+def initialize_prior(profile: dict | None) -> tuple[float, float]:
+    """§5.4 prior: last posterior for returning students, N(0, 1) otherwise."""
+    if profile and profile.get("last_theta_estimate") is not None:
+        return profile["last_theta_estimate"], profile.get("last_theta_se", 1.0)
+    return 0.0, 1.0
+
+
+def posterior_update(bank: ItemBank, prior: np.ndarray, item_id: str, category) -> dict:
+    """EAP update of one student's posterior density."""
+    result = eap_update(bank, prior[None, :], np.array([bank.row(item_id, category)]))
+    return {"theta": float(result["theta"][0]), "se": float(result["se"][0]), "posterior": result["posterior"][0]}
+
+
+def check_t3_t4_consistency(t3_category: str, t4_category: str) -> str:
+    """§5.5 T3 <-> T4 consistency heuristic."""
+    return "consistent" if t3_category == t4_category else "inconsistent"
+
+
+def mixture_irt_adjustment(bank: ItemBank, prior: np.ndarray, responses: list[tuple[str, object]],
+                           tier_posteriors: list[dict], consistency: str, class_params: dict) -> dict:
+    """§5.5 post-cascade mixture adjustment.
+
+    The engaged class uses the calibrated tables; the aberrant class mixes them
+    with uniform guessing at rate class_2.guessing. Class likelihoods are the
+    response-pattern likelihoods integrated over the prior on the grid.
+    """
+    guessing = class_params["class_2"].get("guessing", 0.5)
+    engaged = prior.copy()
+    aberrant = prior.copy()
+    for item_id, category in responses:
+        row = bank.row(item_id, category)
+        if row == NO_RESPONSE:
+            continue
+        probs = bank.table[row]
+        n_categories = len(bank.rows[item_id])
+        engaged *= probs
+        aberrant *= guessing / n_categories + (1 - guessing) * probs
+    l_engaged, l_aberrant = engaged.sum(), aberrant.sum()
+
+    pi_aberrant = class_params["class_2"]["pi"]
+    if consistency == "inconsistent":
+        pi_aberrant = min(pi_aberrant * 2.0, 0.50)
+    p_engaged = (1 - pi_aberrant) * l_engaged
+    p_aberrant = pi_aberrant * l_aberrant
+    total = p_engaged + p_aberrant
+    p_engaged, p_aberrant = p_engaged / total, p_aberrant / total
+
+    final = tier_posteriors[-1]
+    aberrance_flag = p_aberrant > 0.50
+    return {
+        "theta": final["theta"],
+        "se": final["se"] * 1.5 if aberrance_flag else final["se"],
+        "P_engaged": float(p_engaged),
+        "P_aberrant": float(p_aberrant),
+        "aberrance_flag": bool(aberrance_flag),
+    }
+
+
+def compute_entropy(probabilities) -> float:
+    """Shannon entropy in bits."""
+    return -sum(p * math.log2(p) for p in probabilities if p > 0)
+
+
+def assemble_diagnostic_vector(q_matrix: list[str], terminated_at: str, tier_posteriors: list[dict],
+                               t3_category=None, t4_category=None, mixture: dict | None = None) -> dict:
+    """§5.6 final diagnostic vector."""
+    if terminated_at == "mastery_gate":
+        probs = {MASTERY: 0.95, **{m: 0.01 for m in q_matrix}, LACK_OF_KNOWLEDGE: 0.02, ABERRANT: 0.02}
+        entropy = compute_entropy(probs.values())
+        hard = MASTERY if entropy < 1.0 else "Inconclusive"
+        theta, se = tier_posteriors[0]["theta"], tier_posteriors[0]["se"]
+    elif terminated_at == "T3_LoK":
+        probs = {MASTERY: 0.03, **{m: 0.02 for m in q_matrix}, LACK_OF_KNOWLEDGE: 0.90, ABERRANT: 0.05}
+        entropy = compute_entropy(probs.values())
+        hard = LACK_OF_KNOWLEDGE
+        theta, se = tier_posteriors[0]["theta"], tier_posteriors[0]["se"]
+    elif terminated_at in ("no_T3_item", "no_T4_item"):
+        # The pool has no item for the next tier: only the tiers answered so far inform the vector
+        categories = [MASTERY, *q_matrix, LACK_OF_KNOWLEDGE, ABERRANT]
+        probs = {c: 1.0 / len(categories) for c in categories}
+        if t3_category in probs and t3_category != LACK_OF_KNOWLEDGE:
+            probs[t3_category] += 0.35
+        total = sum(probs.values())
+        probs = {c: p / total for c, p in probs.items()}
+        entropy = compute_entropy(probs.values())
+        hard = "Inconclusive"
+        theta, se = tier_posteriors[-1]["theta"], tier_posteriors[-1]["se"]
+    else:
+        categories = [MASTERY, *q_matrix, LACK_OF_KNOWLEDGE]
+        probs = {c: 1.0 / len(categories) for c in categories}
+        for signal in (t3_category, t4_category):
+            if signal in probs and signal != LACK_OF_KNOWLEDGE:
+                probs[signal] += 0.35
+        probs[ABERRANT] = mixture["P_aberrant"]
+        total = sum(probs.values())
+        probs = {c: p / total for c, p in probs.items()}
+        entropy = compute_entropy(probs.values())
+        hard = max(probs, key=probs.get) if entropy < 1.0 else "Inconclusive"
+        theta, se = mixture["theta"], mixture["se"]
+
+    return {
+        "P_mastery": round(probs[MASTERY], 4),
+        **{f"P_{m}": round(probs[m], 4) for m in q_matrix},
+        "P_lack_of_knowledge": round(probs[LACK_OF_KNOWLEDGE], 4),
+        "P_aberrant": round(probs[ABERRANT], 4),
+        "theta": round(theta, 4),
+        "theta_se": round(se, 4),
+        "entropy_bits": round(entropy, 4),
+        "hard_classification": hard,
+    }
+
+
+# ═══════════════════════════════════════════════════════════════
+# SESSION CONTROLLER (§7)
+# ═══════════════════════════════════════════════════════════════
+
+class LatencyStats:
+    """Per-step latency samples in seconds."""
+
+    def __init__(self):
+        self.samples = defaultdict(list)
+
+    def record(self, step: str, seconds: float):
+        self.samples[step].append(seconds)
+
+    def summary(self) -> dict:
+        return {
+            step: {
+                "n": len(values),
+                "p50_ms": round(percentile(values, 50) * 1000, 3),
+                "p95_ms": round(percentile(values, 95) * 1000, 3),
+                "max_ms": round(max(values) * 1000, 3),
+            }
+            for step, values in self.samples.items()
+        }
+
+    def report(self):
+        print(f"{'step':<16} {'n':>7} {'p50 ms':>9} {'p95 ms':>9} {'max ms':>9}")
+        for step, s in self.summary().items():
+            print(f"{step:<16} {s['n']:>7} {s['p50_ms']:>9.3f} {s['p95_ms']:>9.3f} {s['max_ms']:>9.3f}")
+
+
+class DiagnosticService:
+    """Runs §7 diagnostic sessions against an in-memory item pool."""
+
+    def __init__(self, pool: ItemPool, rater: T2Rater, class_params: dict | None = None,
+                 save_sessions: bool = True, store: ProfileStore | None = None):
+        self.pool = pool
+        self.rater = rater
+        self.class_params = class_params or DEFAULT_MIXTURE_PARAMS
+        self.save_sessions = save_sessions
+        self.store = store
+        self.profiles = {}
+        self.latency = LatencyStats()
+        self._next_pool_check = time.monotonic() + POOL_CHECK_SECONDS
+        self._reload = None
+
+    def refresh_pool(self):
+        """Start a background pool rebuild if item-params/ changed since the pool was loaded."""
+        now = time.monotonic()
+        if self._reload is not None or now < self._next_pool_check:
+            return
+        self._next_pool_check = now + POOL_CHECK_SECONDS
+        ainative_dir, item_params_dir = self.pool.sources
+        if params_signature(item_params_dir) != self.pool.signature:
+            self._reload = asyncio.ensure_future(asyncio.to_thread(ItemPool.load, ainative_dir, item_params_dir))
+            self._reload.add_done_callback(self._swap_pool)
+
+    def _swap_pool(self, task: asyncio.Future):
+        self._reload = None
+        if task.cancelled():
+            return
+        if task.exception():
+            print(f"WARNING: item pool reload failed: {task.exception()}")
+            return
+        self.pool = task.result()
+        print(f"Item pool reloaded: {len(self.pool.items)} item(s) over {len(self.pool.concepts)} concept(s)")
+
+    def _timed(self, step: str, started: float):
+        self.latency.record(step, time.perf_counter() - started)
+
+    async def load_profile(self, student_id: str) -> dict | None:
+        """§5.4 load_student_history: this run's sessions first, then the profile store.
+
+        Store calls run in a worker thread: they take fcntl locks and may wait
+        for another process's update or a table rehash.
+        """
+        if student_id in self.profiles:
+            return self.profiles[student_id]
+        return await asyncio.to_thread(self.store.get, student_id) if self.store else None
+
+    async def save_session(self, record: dict):
+        """Append the session to the log, then update the student's profile."""
+        estimate = record["estimation"]["theta_final"]
+        if self.save_sessions:
+            t = time.perf_counter()
+            SESSION_LOG_DIR.mkdir(parents=True, exist_ok=True)
+            date_str = datetime.now(timezone.utc).strftime("%Y-%m-%d")
+            with open(SESSION_LOG_DIR / f"{date_str}_sessions.jsonl", "a") as f:
+                f.write(json.dumps(record) + "\n")
+            self._timed("save", t)
+        if self.save_sessions and self.store:
+            await asyncio.to_thread(self.store.update_theta, record["student_id"], record["concept_id"],
+                                    estimate["mean"], estimate["sd"])
+        else:
+            self.profiles[record["student_id"]] = {
+                "last_theta_estimate": estimate["mean"], "last_theta_se": estimate["sd"],
+            }
+
+    async def run_diagnostic_session(self, student_id: str, concept_id: str, ask) -> dict:
+        """Run one cascade. ask(prompt) is an async callable returning the student's answer."""
+        validate_student_id(student_id)
+        self.refresh_pool()
+        pool, bank = self.pool, self.pool.bank
+        session_started = datetime.now(timezone.utc)
+
+        # ─── INITIALIZATION ───
+        profile = await self.load_profile(student_id)
+        t = time.perf_counter()
+        prior_mean, prior_sd = initialize_prior(profile)
+        prior = gaussian_prior(prior_mean, prior_sd)[0]
+        t1_item = pool.select(concept_id, "T1", prior_mean)
+        self._timed("init_select_t1", t)
+        if t1_item is None:
+            raise KeyError(f"Unknown concept: {concept_id}")
+
+        # ─── T1 / T2 ───
+        t1_response = await ask({"tier": "T1", "item_id": t1_item["item_id"], "prompt": t1_item["prompt"],
+                                 "options": t1_item["options"]})
+        t2_text = await ask({"tier": "T2", "item_id": t1_item["item_id"],
+                             "prompt": "Explain the reasoning behind your answer."})
+        t = time.perf_counter()
+        t2_result = await self.rater.score(t1_item, t1_response, t2_text)
+        self._timed("t2_rater", t)
+
+        t = time.perf_counter()
+        t1_correct = t1_response == t1_item["correct_answer"]
+        joint_score = compute_joint_score(t1_correct, t2_result["T2_score"])
+        posterior_1 = posterior_update(bank, prior, t1_item["item_id"], joint_score)
+        self._timed("eap_t1t2", t)
+
+        cascade = {
+            "T1_item_id": t1_item["item_id"], "T1_response": t1_response, "T1_correct": t1_correct,
+            "T2_response_text": t2_text, "T2_score": t2_result["T2_score"],
+            "T2_scoring_rationale": t2_result.get("scoring_rationale"),
+            "T1T2_joint_score": joint_score,
+        }
+        estimation = {
+            "theta_prior": {"mean": prior_mean, "sd": prior_sd},
+            "theta_post_T1T2": _estimate(posterior_1),
+        }
+        q_matrix = t1_item["q_matrix"]
+
+        # ─── MASTERY GATE ───
+        if joint_score == 3:
+            diagnostic = assemble_diagnostic_vector(q_matrix, "mastery_gate", [posterior_1])
+            return await self._finish(student_id, concept_id, session_started, cascade, estimation,
+                                      posterior_1, diagnostic)
+
+        # ─── T3 ───
+        t = time.perf_counter()
+        t3_item = pool.select(concept_id, "T3", posterior_1["theta"])
+        self._timed("select_t3", t)
+        if t3_item is None:
+            diagnostic = assemble_diagnostic_vector(q_matrix, "no_T3_item", [posterior_1])
+            return await self._finish(student_id, concept_id, session_started, cascade, estimation,
+                                      posterior_1, diagnostic)
+        t3_response = await ask({"tier": "T3", "item_id": t3_item["item_id"], "prompt": t3_item["prompt"],
+                                 "options": t3_item["options"]})
+        t3_category = t3_item["maps_to"].get(t3_response)
+        cascade.update({"T3_item_id": t3_item["item_id"], "T3_response": t3_response, "T3_maps_to": t3_category})
+
+        if t3_category == ROUTING_LOK:
+            t = time.perf_counter()
+            diagnostic = assemble_diagnostic_vector(q_matrix, "T3_LoK", [posterior_1])
+            self._timed("assemble", t)
+            return await self._finish(student_id, concept_id, session_started, cascade, estimation,
+                                      posterior_1, diagnostic)
+
+        t = time.perf_counter()
+        posterior_2 = posterior_update(bank, posterior_1["posterior"], t3_item["item_id"], t3_category)
+        t4_item = pool.select(concept_id, "T4", posterior_2["theta"])
+        self._timed("eap_t3_select_t4", t)
+        estimation["theta_post_T3"] = _estimate(posterior_2)
+        if t4_item is None:
+            diagnostic = assemble_diagnostic_vector(q_matrix, "no_T4_item", [posterior_1, posterior_2], t3_category)
+            return await self._finish(student_id, concept_id, session_started, cascade, estimation,
+                                      posterior_2, diagnostic)
+
+        # ─── T4 ───
+        t4_response = await ask({"tier": "T4", "item_id": t4_item["item_id"], "prompt": t4_item["prompt"],
+                                 "options": t4_item["options"]})
+        t4_category = t4_item["maps_to"].get(t4_response)
+        cascade.update({"T4_item_id": t4_item["item_id"], "T4_response": t4_response, "T4_maps_to": t4_category})
+
+        t = time.perf_counter()
+        posterior_3 = posterior_update(bank, posterior_2["posterior"], t4_item["item_id"], t4_category)
+        estimation["theta_post_T4"] = _estimate(posterior_3)
+        self._timed("eap_t4", t)
+
+        # ─── MIXTURE + DIAGNOSTIC ───
+        t = time.perf_counter()
+        consistency = check_t3_t4_consistency(t3_category, t4_category)
+        responses = [(t1_item["item_id"], joint_score), (t3_item["item_id"], t3_category),
+                     (t4_item["item_id"], t4_category)]
+        mixture = mixture_irt_adjustment(bank, prior, responses, [posterior_1, posterior_2, posterior_3],
+                                         consistency, self.class_params)
+        diagnostic = assemble_diagnostic_vector(q_matrix, "full_cascade", [posterior_1, posterior_2, posterior_3],
+                                                t3_category, t4_category, mixture)
+        self._timed("mixture_assemble", t)
+        estimation.update({
+            "mixture_P_engaged": round(mixture["P_engaged"], 4),
+            "mixture_P_aberrant": round(mixture["P_aberrant"], 4),
+            "aberrance_flag": mixture["aberrance_flag"],
+            "t3_t4_consistency": consistency,
+        })
+        final = {"theta": mixture["theta"], "se": mixture["se"]}
+        return await self._finish(student_id, concept_id, session_started, cascade, estimation, final, diagnostic)
+
+    async def _finish(self, student_id, concept_id, started, cascade, estimation, final, diagnostic) -> dict:
+        estimation["theta_final"] = _estimate(final)
+        record = {
+            "session_id": f"SES-{started.strftime('%Y-%m-%d')}-{student_id}-{started.strftime('%H%M%S%f')}",
+            "student_id": student_id,
+            "concept_id": concept_id,
+            "timestamp": started.isoformat(),
+            "cascade": cascade,
+            "estimation": estimation,
+            "diagnostic_output": diagnostic,
+        }
+        await self.save_session(record)
+        return record
+
+
+def _estimate(posterior: dict) -> dict:
+    return {"mean": round(posterior["theta"], 4), "sd": round(posterior["se"], 4)}
+
+
+def load_mixture_params() -> dict:
+    """Mixture class parameters (§6.3), or the defaults if not yet calibrated."""
+    if MIXTURE_PARAMS_PATH.exists():
+        with open(MIXTURE_PARAMS_PATH) as f:
+            return json.load(f)
+    return DEFAULT_MIXTURE_PARAMS
+
+
+# ═══════════════════════════════════════════════════════════════
+# TRANSPORTS
+# ═══════════════════════════════════════════════════════════════
+
+async def handle_connection(service: DiagnosticService, reader: asyncio.StreamReader,
+                            writer: asyncio.StreamWriter):
+    """Serve one session over newline-delimited JSON."""
+    async def send(message: dict):
+        writer.write((json.dumps(message) + "\n").encode())
+        await writer.drain()
+
+    async def receive() -> dict:
+        line = await reader.readline()
+        if not line:
+            raise ConnectionError("client disconnected")
+        return json.loads(line)
+
+    async def ask(prompt: dict):
+        await send({"type": "question", **prompt})
+        return (await receive()).get("answer", "")
+
+    try:
+        hello = await receive()
+        record = await service.run_diagnostic_session(hello["student_id"], hello["concept_id"], ask)
+        await send({"type": "result", "session": record})
+    except (ConnectionError, json.JSONDecodeError, KeyError, ValueError, T2ScoringError) as e:
+        try:
+            await send({"type": "error", "error": str(e)})
+        except ConnectionError:
+            pass
+    finally:
+        writer.close()
+
+
+async def serve(service: DiagnosticService, host: str, port: int):
+    server = await asyncio.start_server(lambda r, w: handle_connection(service, r, w), host, port)
+    print(f"Serving {len(service.pool.concepts)} concept(s) on {host}:{port}")
+    try:
+        async with server:
+            await server.serve_forever()
+    finally:
+        service.latency.report()
+
+
+def simulated_student(service: DiagnosticService, concept_id: str, true_theta: float, rng: random.Random):
+    """An ask() callable answering like a student with ability true_theta."""
+    bank = service.pool.bank
+    index = int(np.abs(GRID - true_theta).argmin())
+
+    async def ask(prompt: dict):
+        item = service.pool.items[prompt["item_id"]]
+        if prompt["tier"] == "T1":
+            p_correct = 1 / (1 + math.exp(-(true_theta - 0.0)))
+            wrong = [k for k in item["options"] if k != item["correct_answer"]] or [item["correct_answer"]]
+            return item["correct_answer"] if rng.random() < p_correct else rng.choice(wrong)
+        if prompt["tier"] == "T2":
+            concepts = item["t2_rubric"].get("correct_concepts", [])
+            known = [c for c in concepts if rng.random() < 1 / (1 + math.exp(-true_theta))]
+            return "because " + " and ".join(known) if known else "because of energy"
+        categories = list(bank.rows[item["item_id"]])
+        probs = bank.table[[bank.rows[item["item_id"]][c] for c in categories], index]
+        category = rng.choices(categories, weights=probs)[0]
+        if true_theta < -1.5 and ROUTING_LOK in item["maps_to"].values() and rng.random() < 0.5:
+            category = ROUTING_LOK
+        return next(k for k, v in item["maps_to"].items() if v == category)
+
+    return ask
+
+
+async def simulate(service: DiagnosticService, n_students: int, seed: int = 0):
+    rng = random.Random(seed)
+    concepts = list(service.pool.concepts)
+    if not concepts:
+        print("No approved concepts in the item pool.")
+        return
+
+    async def one(i: int):
+        concept_id = concepts[i % len(concepts)]
+        ask = simulated_student(service, concept_id, rng.gauss(0, 1), rng)
+        return await service.run_diagnostic_session(f"SIM-{i:05d}", concept_id, ask)
+
+    started = time.perf_counter()
+    records = await asyncio.gather(*(one(i) for i in range(n_students)))
+    elapsed = time.perf_counter() - started
+    outcomes = defaultdict(int)
+    for record in records:
+        outcomes[record["diagnostic_output"]["hard_classification"]] += 1
+    print(f"Ran {n_students} concurrent session(s) over {len(concepts)} concept(s) in {elapsed:.2f}s")
+    print(f"Classifications: {dict(outcomes)}")
+    service.latency.report()
+
+
+def build_rater(args) -> T2Rater:
+    """T2 rater for --rater: stub (per response), batched (stub backend) or llm."""
+    if args.rater == "stub":
+        return StubT2Rater(latency=args.rater_latency)
+    if args.rater == "batched":
+        backend = StubT2Backend(latency=args.rater_latency)
+        return BatchedT2Rater(backend, default_cache(use_disk=False), max_wait_ms=args.t2_max_wait_ms)
+    api_key = os.environ.get("ANTHROPIC_API_KEY")
+    if not api_key:
+        print("ERROR: ANTHROPIC_API_KEY environment variable not set")
+        sys.exit(1)
+    import anthropic
+    backend = AnthropicT2Backend(anthropic.AsyncAnthropic(api_key=api_key))
+    return BatchedT2Rater(backend, default_cache(), max_wait_ms=args.t2_max_wait_ms)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Async V8 diagnostic session server")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    serve_parser = subparsers.add_parser("serve", help="Serve sessions over TCP (newline-delimited JSON)")
+    serve_parser.add_argument("--host", default="127.0.0.1")
+    serve_parser.add_argument("--port", type=int, default=8765)
+    sim_parser = subparsers.add_parser("simulate", help="Run N simulated concurrent sessions")
+    sim_parser.add_argument("--students", type=int, default=500)
+    sim_parser.add_argument("--save", action="store_true", help="Append simulated sessions to the session log")
+    for sub in (serve_parser, sim_parser):
+        sub.add_argument("--rater", choices=["stub", "batched", "llm"], default="stub",
+                         help="T2 rater: local stub, batched stub, or batched LLM (see t2_scorer.py)")
+        sub.add_argument("--rater-latency", type=float, default=0.0,
+                         help="Simulated T2 rater latency in seconds (stub and batched raters)")
+        sub.add_argument("--t2-max-wait-ms", type=float, default=DEFAULT_MAX_WAIT_MS,
+                         help=f"T2 micro-batch window in ms (default: {DEFAULT_MAX_WAIT_MS})")
+    args = parser.parse_args()
+
+    pool = ItemPool.load()
+    rater = build_rater(args)
+    if args.command == "serve":
+        service = DiagnosticService(pool, rater, load_mixture_params(), store=open_store(writable=True))
+        try:
+            asyncio.run(serve(service, args.host, args.port))
+        except KeyboardInterrupt:
+            pass
+    else:
+        service = DiagnosticService(pool, rater, load_mixture_params(), save_sessions=args.save,
+                                    store=open_store(writable=args.save))
+        asyncio.run(simulate(service, args.students))
+    if isinstance(rater, BatchedT2Rater):
+        rater.report()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,461 @@
+#!/usr/bin/env python3
+"""
+Batched, cached T2 reasoning scorer (V8 manual §5.1).
+
+Usage: python scripts/t2_scorer.py --simulate N [--distinct K] [--backend-latency S]
+                                   [--max-batch B] [--max-wait-ms MS]
+
+The §5.1 rubric takes one LLM call per student response. During a live exam
+window most responses are short and near-identical ("because of energy"), so
+BatchedT2Rater sits between the session server and the rater model:
+
+1. Responses are normalised (lower case, punctuation and whitespace collapsed;
+   the rubric ignores grammar and formatting) and keyed by sha256 of the
+   normalised text plus the item's t2_rubric from the ai-native file. §5.1
+   scores the reasoning text alone (§5.2 combines it with T1), so the T1
+   option is not part of the key or the prompt.
+2. A key seen before is answered from an in-memory LRU, then from the disk
+   cache in .cache/t2-scores/ (a ResponseCache, so `response_cache.py`
+   eviction applies). Blank responses score 0 without a call.
+3. A key already waiting for the rater joins that request instead of adding
+   another.
+4. Remaining responses are queued per item and flushed as one multi-response
+   request when max_batch are waiting or max_wait_ms after the first arrived.
+
+score() returns {"T2_score", "concepts_identified", "mechanistic_chain",
+"scoring_rationale"} to each caller asynchronously. Any T2Backend can do the
+scoring: AnthropicT2Backend sends the §5.1 system prompt (cached prefix) with
+numbered responses and parses one result per response; StubT2Backend scores
+locally by rubric concept overlap. Rater calls are recorded as telemetry spans
+under the "t2-scoring" pipeline.
+
+--simulate fires N responses drawn from K distinct answers at once against
+the stub backend and reports call volume and latency.
+"""
+
+import abc
+import argparse
+import asyncio
+import json
+import random
+import re
+import sys
+import time
+from collections import OrderedDict, defaultdict
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent))
+from prompt_cache import PromptCacheStats, cached_system_prompt
+from response_cache import ResponseCache
+from telemetry import percentile, write_call_span
+
+try:
+    import anthropic
+except ImportError:
+    anthropic = None  # Only AnthropicT2Backend needs it
+
+ROOT = Path(__file__).parent.parent
+V8_MANUAL = ROOT / "docs" / "V8-construction-manual.md"
+CACHE_DIR = ROOT / ".cache" / "t2-scores"
+
+PIPELINE = "t2-scoring"
+MODEL = "claude-sonnet-4-5-20250929"
+MAX_TOKENS = 4096
+MAX_RETRIES = 3
+DEFAULT_MAX_BATCH = 25
+DEFAULT_MAX_WAIT_MS = 50
+DEFAULT_MAX_CONCURRENCY = 8
+MEMORY_CACHE_SIZE = 50_000
+
+BATCH_INSTRUCTIONS = """You will receive several numbered student T2 responses to the same question.
+Score each response independently with the rubric above.
+
+Return ONLY a JSON object of the form:
+{"scores": [{"response_id": <number>, "T2_score": 0-3, "concepts_identified": [...],
+             "mechanistic_chain": "...", "scoring_rationale": "..."}]}
+with exactly one entry per response_id."""
+
+INLINE_RUBRIC_PROMPT = """You are a Science Reasoning Scorer. Score the student's reasoning response on a
+0-3 scale based ONLY on scientific concept presence and correctness. Ignore grammar, spelling, fluency,
+organization, vocabulary, length and terminology.
+
+Score 0: No relevant scientific concept present (blank, incoherent, off-topic).
+Score 1: A relevant concept is present but applied incorrectly or the causal chain is incomplete.
+Score 2: The correct concept is present and partially applied, with a mechanistic error or missing link.
+Score 3: The correct concept is present and correctly applied with a complete causal chain."""
+
+_NON_WORD = re.compile(r"[^a-z0-9]+")
+
+
+def normalize_response(text: str) -> str:
+    """Lower-case and reduce to space-separated words."""
+    return _NON_WORD.sub(" ", (text or "").lower()).strip()
+
+
+def score_key(item: dict, normalized_text: str) -> str:
+    """Cache key payload: the item's t2_rubric plus the normalised response."""
+    return json.dumps([item.get("t2_rubric", {}), normalized_text], sort_keys=True)
+
+
+def load_rubric_prompt() -> str:
+    """The §5.1 [SYSTEM] prompt from the V8 manual, or the inline fallback.
+
+    The manual's single-response OUTPUT FORMAT is dropped: BATCH_INSTRUCTIONS
+    replaces it with the batched "scores" format.
+    """
+    if not V8_MANUAL.exists():
+        return INLINE_RUBRIC_PROMPT
+    content = V8_MANUAL.read_text()
+    idx = content.find("§5.1 T2 Scoring Rubric")
+    fence = content.find("```", idx) if idx != -1 else -1
+    if fence == -1:
+        return INLINE_RUBRIC_PROMPT
+    start = content.find("\n", fence) + 1
+    end = content.find("[HUMAN]", start)
+    prompt = content[start:end].replace("[SYSTEM]", "", 1) if end != -1 else ""
+    prompt = prompt.split("OUTPUT FORMAT:", 1)[0].strip()
+    return prompt or INLINE_RUBRIC_PROMPT
+
+
+def parse_scores(text: str) -> dict[int, dict]:
+    """Parse a batched rater reply into {response_id: result}."""
+    text = text.strip()
+    if text.startswith("```"):
+        text = text.split("\n", 1)[1] if "\n" in text else ""
+        text = text.rsplit("```", 1)[0]
+    try:
+        data = json.loads(text)
+    except json.JSONDecodeError as e:
+        print(f"  T2 rater JSON parse error: {e}")
+        return {}
+    scores = data.get("scores", []) if isinstance(data, dict) else data
+    results = {}
+    for entry in scores if isinstance(scores, list) else []:
+        if isinstance(entry, dict) and isinstance(entry.get("response_id"), int):
+            results[entry.pop("response_id")] = entry
+    return results
+
+
+def is_valid_result(result: dict | None) -> bool:
+    return isinstance(result, dict) and result.get("T2_score") in (0, 1, 2, 3)
+
+
+def blank_result() -> dict:
+    return {
+        "T2_score": 0,
+        "concepts_identified": [],
+        "mechanistic_chain": "",
+        "scoring_rationale": "Blank response: no scientific concept present.",
+    }
+
+
+# ═══════════════════════════════════════════════════════════════
+# RATER INTERFACE
+# ═══════════════════════════════════════════════════════════════
+
+class T2ScoringError(RuntimeError):
+    """The rater could not score a response."""
+
+
+class T2Rater(abc.ABC):
+    """Interface for the §5.1 T2 reasoning scorer used by session_server.py."""
+
+    @abc.abstractmethod
+    async def score(self, item: dict, t1_response: str, t2_text: str) -> dict:
+        """Return {"T2_score": 0-3, "scoring_rationale": str, ...}."""
+
+
+def stub_score(item: dict, t2_text: str) -> dict:
+    """Local stand-in for the rater: one point per rubric concept mentioned, up to 3."""
+    words = set(normalize_response(t2_text).split())
+    concepts = item.get("t2_rubric", {}).get("correct_concepts", [])
+    present = [c for c in concepts if set(normalize_response(c).split()) <= words]
+    return {
+        "T2_score": min(3, len(present)),
+        "concepts_identified": present,
+        "mechanistic_chain": "",
+        "scoring_rationale": f"Stub rater: {len(present)} of {len(concepts)} rubric concepts present.",
+    }
+
+
+class StubT2Rater(T2Rater):
+    """Unbatched local rater with optional simulated latency per response."""
+
+    def __init__(self, latency: float = 0.0):
+        self.latency = latency
+
+    async def score(self, item: dict, t1_response: str, t2_text: str) -> dict:
+        if self.latency:
+            await asyncio.sleep(self.latency)
+        return stub_score(item, t2_text)
+
+
+# ═══════════════════════════════════════════════════════════════
+# BACKENDS
+# ═══════════════════════════════════════════════════════════════
+
+class T2Backend(abc.ABC):
+    """Scores several responses to one item in a single request."""
+
+    @abc.abstractmethod
+    async def score_batch(self, item: dict, texts: list[str]) -> list[dict | None]:
+        """Return one result per text, None where the rater gave none."""
+
+
+class StubT2Backend(T2Backend):
+    """Local backend: stub_score with a simulated per-request latency."""
+
+    def __init__(self, latency: float = 0.0):
+        self.latency = latency
+
+    async def score_batch(self, item: dict, texts: list[str]) -> list[dict | None]:
+        if self.latency:
+            await asyncio.sleep(self.latency)
+        return [stub_score(item, text) for text in texts]
+
+
+class AnthropicT2Backend(T2Backend):
+    """§5.1 rater over anthropic.AsyncAnthropic, several responses per call."""
+
+    def __init__(self, client, max_concurrency: int = DEFAULT_MAX_CONCURRENCY):
+        if anthropic is None:
+            print("ERROR: anthropic package not installed. Run: pip install anthropic")
+            sys.exit(1)
+        self.client = client
+        self.system_prompt = f"{load_rubric_prompt()}\n\n{BATCH_INSTRUCTIONS}"
+        self.semaphore = asyncio.Semaphore(max_concurrency)
+        self.prompt_cache_stats = PromptCacheStats()
+
+    def build_user_prompt(self, item: dict, texts: list[str]) -> str:
+        rubric = item.get("t2_rubric", {})
+        correct = item.get("correct_answer") or ""
+        lines = [
+            f"QUESTION: {item.get('prompt', '')}",
+            f"CORRECT ANSWER: {correct} — {rubric.get('correct_mechanism', '')}".rstrip(" —"),
+            f"RUBRIC CONCEPTS: {json.dumps(rubric.get('correct_concepts', []))}",
+            "",
+            "STUDENT T2 RESPONSES:",
+        ]
+        lines += [f"[{i}] {text}" for i, text in enumerate(texts, 1)]
+        return "\n".join(lines)
+
+    async def score_batch(self, item: dict, texts: list[str]) -> list[dict | None]:
+        user_prompt = self.build_user_prompt(item, texts)
+        item_id = item.get("item_id", "")
+        async with self.semaphore:
+            for attempt in range(MAX_RETRIES + 1):
+                started = time.monotonic()
+                try:
+                    response = await self.client.messages.create(
+                        model=MODEL,
+                        max_tokens=MAX_TOKENS,
+                        system=cached_system_prompt(self.system_prompt),
+                        messages=[{"role": "user", "content": user_prompt}],
+                    )
+                except anthropic.APIError as e:
+                    latency = time.monotonic() - started
+                    if attempt == MAX_RETRIES:
+                        write_call_span(PIPELINE, "T2", item_id, attempt, "api", "error", latency,
+                                        error=type(e).__name__, batch_size=len(texts))
+                        print(f"  T2 rater error after {MAX_RETRIES} retries: {e}")
+                        return [None] * len(texts)
+                    wait = 2 ** (attempt + 1)
+                    write_call_span(PIPELINE, "T2", item_id, attempt, "api", "error", latency,
+                                    error=type(e).__name__, backoff_s=wait, batch_size=len(texts))
+                    await asyncio.sleep(wait)
+                    continue
+                latency = time.monotonic() - started
+                self.prompt_cache_stats.record(response.usage, latency)
+                write_call_span(PIPELINE, "T2", item_id, attempt, "api", "ok", latency, response.usage,
+                                batch_size=len(texts))
+                results = parse_scores(response.content[0].text)
+                return [results.get(i) for i in range(1, len(texts) + 1)]
+        return [None] * len(texts)
+
+
+# ═══════════════════════════════════════════════════════════════
+# CACHE + MICRO-BATCHING
+# ═══════════════════════════════════════════════════════════════
+
+class T2ScoreCache:
+    """In-memory LRU over an optional on-disk ResponseCache."""
+
+    def __init__(self, disk: ResponseCache | None = None, max_entries: int = MEMORY_CACHE_SIZE,
+                 model: str = MODEL):
+        self.disk = disk
+        self.max_entries = max_entries
+        self.model = model
+        self._memory = OrderedDict()
+
+    def get(self, key: str) -> tuple[dict | None, str | None]:
+        """Return (result, "memory" | "disk") or (None, None) on a miss."""
+        result = self._memory.get(key)
+        if result is not None:
+            self._memory.move_to_end(key)
+            return result, "memory"
+        if self.disk:
+            text = self.disk.get(self.model, "t2", key, MAX_TOKENS)
+            if text is not None:
+                result = json.loads(text)
+                self._remember(key, result)
+                return result, "disk"
+        return None, None
+
+    def put(self, key: str, result: dict):
+        self._remember(key, result)
+        if self.disk:
+            self.disk.put(self.model, "t2", key, MAX_TOKENS, json.dumps(result))
+
+    def _remember(self, key: str, result: dict):
+        self._memory[key] = result
+        self._memory.move_to_end(key)
+        if len(self._memory) > self.max_entries:
+            self._memory.popitem(last=False)
+
+
+class BatchedT2Rater(T2Rater):
+    """Caches, coalesces and micro-batches T2 scoring requests to a backend."""
+
+    def __init__(self, backend: T2Backend, cache: T2ScoreCache | None = None,
+                 max_batch: int = DEFAULT_MAX_BATCH, max_wait_ms: float = DEFAULT_MAX_WAIT_MS):
+        self.backend = backend
+        self.cache = cache or T2ScoreCache()
+        self.max_batch = max_batch
+        self.max_wait = max_wait_ms / 1000
+        self._pending = defaultdict(list)  # item_id -> [(key, item, text)]
+        self._inflight = {}  # key -> Future shared by every caller with that key
+        self._timer = None
+        self._tasks = set()
+        self.stats = defaultdict(int)
+        self.batch_sizes = []
+        self.batch_latency = []
+
+    async def score(self, item: dict, t1_response: str, t2_text: str) -> dict:
+        self.stats["responses"] += 1
+        normalized = normalize_response(t2_text)
+        if not normalized:
+            self.stats["blank"] += 1
+            return blank_result()
+
+        key = score_key(item, normalized)
+        result, source = self.cache.get(key)
+        if result is not None:
+            self.stats[f"{source}_hits"] += 1
+            return dict(result)
+
+        future = self._inflight.get(key)
+        if future is not None:
+            self.stats["coalesced"] += 1
+        else:
+            future = asyncio.get_running_loop().create_future()
+            self._inflight[key] = future
+            group = self._pending[item["item_id"]]
+            group.append((key, item, t2_text))
+            if len(group) >= self.max_batch:
+                self._flush(item["item_id"])
+            elif self._timer is None:
+                self._timer = asyncio.create_task(self._flush_after_wait())
+        return dict(await asyncio.shield(future))
+
+    async def _flush_after_wait(self):
+        await asyncio.sleep(self.max_wait)
+        self._timer = None
+        for item_id in list(self._pending):
+            self._flush(item_id)
+
+    def _flush(self, item_id: str):
+        entries = self._pending.pop(item_id, [])
+        if entries:
+            task = asyncio.create_task(self._score_batch(entries))
+            self._tasks.add(task)
+            task.add_done_callback(self._tasks.discard)
+
+    async def _score_batch(self, entries: list[tuple[str, dict, str]]):
+        self.stats["batches"] += 1
+        self.batch_sizes.append(len(entries))
+        started = time.perf_counter()
+        try:
+            results = await self.backend.score_batch(entries[0][1], [text for _, _, text in entries])
+        except Exception as e:
+            results = [None] * len(entries)
+            print(f"  T2 backend failed: {e}")
+        self.batch_latency.append(time.perf_counter() - started)
+
+        for (key, _item, _text), result in zip(entries, results):
+            future = self._inflight.pop(key)
+            if is_valid_result(result):
+                self.cache.put(key, result)
+                future.set_result(result)
+            else:
+                self.stats["failures"] += 1
+                future.set_exception(T2ScoringError("rater returned no valid score"))
+
+    def summary(self) -> dict:
+        scored = sum(self.batch_sizes)
+        return {
+            **dict(self.stats),
+            "rater_calls": len(self.batch_sizes),
+            "scored_by_rater": scored,
+            "mean_batch_size": round(scored / len(self.batch_sizes), 2) if self.batch_sizes else None,
+            "batch_p95_ms": round(percentile(self.batch_latency, 95) * 1000, 1) if self.batch_latency else None,
+        }
+
+    def report(self):
+        s = self.summary()
+        print(f"T2 scoring: {s.get('responses', 0)} response(s), {s['rater_calls']} rater call(s) "
+              f"for {s['scored_by_rater']} response(s) (mean batch {s['mean_batch_size']})")
+        print(f"  memory hits: {s.get('memory_hits', 0)}  disk hits: {s.get('disk_hits', 0)}  "
+              f"coalesced: {s.get('coalesced', 0)}  blank: {s.get('blank', 0)}  "
+              f"failures: {s.get('failures', 0)}")
+
+
+def default_cache(use_disk: bool = True) -> T2ScoreCache:
+    return T2ScoreCache(ResponseCache(CACHE_DIR) if use_disk else None)
+
+
+async def simulate(n_responses: int, distinct: int, rater: BatchedT2Rater, seed: int = 0):
+    """Fire n_responses near-identical answers at once and report call volume and latency."""
+    rng = random.Random(seed)
+    concepts = ["energy", "heat is released", "bonds break", "bonds form", "temperature rises"]
+    item = {"item_id": "SIM_T1", "prompt": "Why does the temperature rise?", "correct_answer": "B",
+            "t2_rubric": {"correct_concepts": concepts[1:]}}
+    answers = [f"because {' and '.join(rng.sample(concepts, rng.randint(1, 3)))}" for _ in range(distinct)]
+    styles = [str, str.upper, lambda s: s.capitalize() + ".", lambda s: "  " + s.replace(" ", "  ")]
+
+    latencies = []
+
+    async def one():
+        text = rng.choice(styles)(rng.choice(answers))
+        started = time.perf_counter()
+        await rater.score(item, "B", text)
+        latencies.append(time.perf_counter() - started)
+
+    started = time.perf_counter()
+    await asyncio.gather(*(one() for _ in range(n_responses)))
+    elapsed = time.perf_counter() - started
+    print(f"Scored {n_responses} response(s) ({distinct} distinct answers) in {elapsed:.2f}s")
+    print(f"  per-response latency p50 {percentile(latencies, 50) * 1000:.1f} ms, "
+          f"p95 {percentile(latencies, 95) * 1000:.1f} ms")
+    rater.report()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Batched, cached T2 reasoning scorer (V8 §5.1)")
+    parser.add_argument("--simulate", type=int, help="Score N simulated concurrent responses (stub backend)")
+    parser.add_argument("--distinct", type=int, default=40, help="Distinct answers in the simulation")
+    parser.add_argument("--backend-latency", type=float, default=1.0,
+                        help="Simulated seconds per rater call (default: 1.0)")
+    parser.add_argument("--max-batch", type=int, default=DEFAULT_MAX_BATCH)
+    parser.add_argument("--max-wait-ms", type=float, default=DEFAULT_MAX_WAIT_MS)
+    args = parser.parse_args()
+
+    if not args.simulate:
+        parser.print_help()
+        sys.exit(1)
+    rater = BatchedT2Rater(StubT2Backend(args.backend_latency), default_cache(use_disk=False),
+                           args.max_batch, args.max_wait_ms)
+    asyncio.run(simulate(args.simulate, args.distinct, rater))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,185 @@
+#!/usr/bin/env python3
+"""
+Per-stage latency and token telemetry for the conversion cron scripts.
+
+Usage: python scripts/telemetry.py [--date YYYY-MM-DD] [--pipeline NAME]
+
+Every API call in run_raw_to_eqjs.py and run_eqjs_to_ainative.py emits one span
+(stage, item_id, attempt, wall latency, tokens from response.usage, backoff and
+rate-limit sleep), appended to metadata/performance-data/{date}_{pipeline}_spans.jsonl.
+Rate-limit waits and finished items are recorded as spans of their own.
+
+The CLI summarises the spans per day and pipeline: p50/p95 latency per stage,
+tokens per item, items per hour and time lost to sleeps.
+"""
+
+import argparse
+import json
+import math
+import uuid
+from collections import defaultdict
+from datetime import datetime, timezone
+from pathlib import Path
+
+ROOT = Path(__file__).parent.parent
+PERF_DIR = ROOT / "metadata" / "performance-data"
+
+RUN_ID = f"{datetime.now(timezone.utc).strftime('%Y%m%dT%H%M%S')}-{uuid.uuid4().hex[:6]}"
+
+
+def usage_fields(usage) -> dict:
+    """Token counts from a response.usage object (zeros if missing)."""
+    return {
+        "input_tokens": getattr(usage, "input_tokens", 0) or 0,
+        "output_tokens": getattr(usage, "output_tokens", 0) or 0,
+        "cache_read_input_tokens": getattr(usage, "cache_read_input_tokens", 0) or 0,
+        "cache_creation_input_tokens": getattr(usage, "cache_creation_input_tokens", 0) or 0,
+    }
+
+
+def write_span(pipeline: str, kind: str, **fields):
+    """Append one telemetry span to the day's span log for a pipeline.
+
+    kind is "api_call", "rate_limit", "item" or "prompt_cache" (one per run).
+    """
+    PERF_DIR.mkdir(parents=True, exist_ok=True)
+    now = datetime.now(timezone.utc)
+    span = {
+        "timestamp": now.isoformat(),
+        "run_id": RUN_ID,
+        "pipeline": pipeline,
+        "kind": kind,
+        **fields,
+    }
+    log_path = PERF_DIR / f"{now.strftime('%Y-%m-%d')}_{pipeline}_spans.jsonl"
+    with open(log_path, "a") as f:
+        f.write(json.dumps(span) + "\n")
+
+
+def write_call_span(pipeline: str, stage: str, item_id: str, attempt: int, source: str,
+                    status: str, latency_s: float | None = None, usage=None, **fields):
+    """Record one API call span; source is "api", "response_cache" or "batch"."""
+    write_span(
+        pipeline, "api_call",
+        stage=stage, item_id=item_id, attempt=attempt, source=source, status=status,
+        latency_s=round(latency_s, 3) if latency_s is not None else None,
+        **usage_fields(usage), **fields,
+    )
+
+
+def load_spans(date: str | None = None, pipeline: str | None = None) -> list[dict]:
+    """Load spans, optionally restricted to one day and/or pipeline."""
+    if not PERF_DIR.exists():
+        return []
+    spans = []
+    for path in sorted(PERF_DIR.glob("*_spans.jsonl")):
+        if date and not path.name.startswith(date):
+            continue
+        with open(path) as f:
+            for line in f:
+                line = line.strip()
+                if not line:
+                    continue
+                try:
+                    span = json.loads(line)
+                except json.JSONDecodeError:
+                    continue
+                if pipeline and span.get("pipeline") != pipeline:
+                    continue
+                spans.append(span)
+    return spans
+
+
+def percentile(values: list[float], pct: float) -> float | None:
+    """Nearest-rank percentile."""
+    if not values:
+        return None
+    ordered = sorted(values)
+    rank = max(1, math.ceil(pct / 100.0 * len(ordered)))
+    return ordered[rank - 1]
+
+
+def summarize(spans: list[dict]) -> dict:
+    """Summarise spans per (day, pipeline)."""
+    groups = defaultdict(list)
+    for span in spans:
+        groups[(span["timestamp"][:10], span.get("pipeline", "unknown"))].append(span)
+
+    summary = {}
+    for (day, pipeline), group in sorted(groups.items()):
+        calls = [s for s in group if s.get("kind") == "api_call"]
+        items = [s for s in group if s.get("kind") == "item"]
+
+        stages = {}
+        for stage in sorted({s.get("stage", "") for s in calls}):
+            latencies = [s["latency_s"] for s in calls
+                         if s.get("stage") == stage and s.get("source") == "api"
+                         and s.get("latency_s") is not None]
+            stage_calls = [s for s in calls if s.get("stage") == stage]
+            stages[stage] = {
+                "calls": len(stage_calls),
+                "errors": sum(1 for s in stage_calls if s.get("status") != "ok"),
+                "cached": sum(1 for s in stage_calls if s.get("source") == "response_cache"),
+                "p50_latency_s": percentile(latencies, 50),
+                "p95_latency_s": percentile(latencies, 95),
+                "input_tokens": sum(s.get("input_tokens", 0) for s in stage_calls),
+                "output_tokens": sum(s.get("output_tokens", 0) for s in stage_calls),
+            }
+
+        item_ids = {s.get("item_id") for s in calls if s.get("item_id")}
+        total_tokens = sum(s.get("input_tokens", 0) + s.get("cache_read_input_tokens", 0)
+                           + s.get("cache_creation_input_tokens", 0) + s.get("output_tokens", 0)
+                           for s in calls)
+        # Busy time is the sum of each run's first-to-last span, so idle gaps between runs don't count
+        runs = defaultdict(list)
+        for s in group:
+            runs[s.get("run_id")].append(datetime.fromisoformat(s["timestamp"]))
+        hours = sum((max(times) - min(times)).total_seconds() for times in runs.values()) / 3600
+
+        summary[f"{day} {pipeline}"] = {
+            "items_finished": len(items),
+            "items_per_hour": round(len(items) / hours, 1) if hours > 0 else None,
+            "tokens_per_item": round(total_tokens / len(item_ids)) if item_ids else None,
+            "backoff_s": round(sum(s.get("backoff_s", 0) for s in calls), 1),
+            "rate_limit_sleep_s": round(sum(s.get("sleep_s", 0) for s in group
+                                            if s.get("kind") == "rate_limit"), 1),
+            "stages": stages,
+        }
+    return summary
+
+
+def _fmt(value: float | None) -> str:
+    return f"{value:.2f}s" if value is not None else "-"
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Summarise conversion pipeline telemetry")
+    parser.add_argument("--date", type=str, help="Only this day (YYYY-MM-DD)")
+    parser.add_argument("--pipeline", type=str, help="Only this pipeline (e.g. eqjs-to-ainative)")
+    parser.add_argument("--json", action="store_true", help="Print the summary as JSON")
+    args = parser.parse_args()
+
+    summary = summarize(load_spans(args.date, args.pipeline))
+    if args.json:
+        print(json.dumps(summary, indent=2))
+        return
+    if not summary:
+        print("No telemetry spans found.")
+        return
+
+    for key, day in summary.items():
+        print("=" * 60)
+        print(key)
+        print("=" * 60)
+        print(f"  Items finished: {day['items_finished']}"
+              f" ({day['items_per_hour'] or '-'} / hour)")
+        print(f"  Tokens per item: {day['tokens_per_item'] or '-'}")
+        print(f"  Backoff sleep: {day['backoff_s']}s, rate-limit sleep: {day['rate_limit_sleep_s']}s")
+        for stage, s in day["stages"].items():
+            print(f"  {stage:<14} calls={s['calls']:<4} errors={s['errors']:<3} cached={s['cached']:<4}"
+                  f" p50={_fmt(s['p50_latency_s'])} p95={_fmt(s['p95_latency_s'])}"
+                  f" in={s['input_tokens']} out={s['output_tokens']}")
+
+
+if __name__ == "__main__":
+    main()
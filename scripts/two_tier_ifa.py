@@ -0,0 +1,486 @@
+#!/usr/bin/env python3
+"""
+Two-tier item factor analysis calibration (V8 manual §6.2).
+
+Usage: python scripts/two_tier_ifa.py [--sessions GLOB] [--responses FILE.jsonl] [--workers N]
+                                      [--thetas FILE.jsonl] [--dry-run]
+       python scripts/two_tier_ifa.py --simulate TESTLETS STUDENTS [--testlets-per-student K]
+
+Every item loads on the primary θ and on the specific ζ_s of its concept
+testlet s; θ and all ζ_s are independent N(0, 1) (the §6.2 identification
+constraints). Items are GPCM: logit_k = k(α θ + γ ζ_s) - c_k.
+
+From the session logs each concept is one testlet of three items: T1 (T1T2
+joint score 0-3), T3 and T4 (1 if maps_to is Mastery, else 0), which is where
+the local dependence lives. A responses JSONL can give any other layout:
+{"student_id", "item_id", "score", "testlet"}.
+
+Dimension reduction: because the ζ_s are orthogonal, a student's likelihood
+factors over testlets,
+    L(θ) = Π_s ∫ Π_{j in s} P_j(x_j | θ, ζ) φ(ζ) dζ,
+so MML-EM integrates over (θ, ζ_s) pairs (21 × 21 Gauss-Hermite nodes) per
+testlet instead of over P + S dimensions at once. Cost is linear in the number
+of testlets.
+
+Each EM iteration runs over testlet blocks in a ProcessPoolExecutor, with the
+block's responses held in each worker:
+1. For each (student, testlet) it computes L(θ_q, ζ_r) as one matrix product
+   of a segment × response-row indicator with the log-probability table, then
+   integrates ζ out.
+2. The parent sums the per-testlet terms into each student's posterior over θ.
+3. The workers spread that posterior over (θ, ζ) within each testlet into
+   expected counts (the transposed indicator product), then Newton-fit every item of the block (multinomial
+   logit, see calibrate_items.py). ζ_s is only defined up to sign: its
+   orientation is kept across iterations and reported with Σ γ >= 0.
+Testlets with a single item have no identifiable γ, which is fixed at 0.
+EM stops when no parameter moves more than --tolerance, when the relative
+log-likelihood gain drops below LOGLIK_TOLERANCE (weakly identified γ can keep
+creeping long after the fit has stopped improving), or at --max-iter.
+
+Results go into the two_tier_params section of existing §8.2 records in
+metadata/calibration/item-params/ (run calibrate_items.py first), for items
+with at least MIN_RESPONSES responses: alpha, beta, d_steps, gamma and
+testlet_variance (mean γ² over the testlet's items, the logit-scale variance
+of the specific effect), plus the §8.2 names. The runtime parameters are not
+touched. --thetas writes the primary θ EAP and SE per student.
+
+Requires numpy (see eap_scoring.py).
+"""
+
+import argparse
+import sys
+import time
+from collections import defaultdict
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime, timezone
+from functools import lru_cache
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent))
+from calibrate_items import (ITEM_PARAMS_DIR, MIN_GPCM_SLOPE, MIN_RESPONSES, gpcm_from_w, gpcm_to_w, load_records,
+                             newton_fit)
+from calibration_io import add_cohort_arguments, iter_jsonl, load_sessions, write_jsonl, write_record
+
+import numpy as np
+
+QUADRATURE_POINTS = 21
+NODES, WEIGHTS = np.polynomial.hermite_e.hermegauss(QUADRATURE_POINTS)
+WEIGHTS = WEIGHTS / WEIGHTS.sum()
+LOG_WEIGHTS = np.log(WEIGHTS)
+N_NODES = QUADRATURE_POINTS ** 2
+
+DEFAULT_MAX_ITER = 200
+DEFAULT_TOLERANCE = 1e-3
+LOGLIK_TOLERANCE = 1e-7  # relative log-likelihood gain per iteration
+BLOCK_RESPONSES = 20_000
+START_GAMMA = 0.5
+MASTERY = "Mastery"
+
+
+# ═══════════════════════════════════════════════════════════════
+# ITEM MODEL: logit_k = k(α θ + γ ζ) - c_k on the (θ, ζ) node grid
+# ═══════════════════════════════════════════════════════════════
+
+@lru_cache(maxsize=None)
+def design(n_categories: int, specific: bool) -> np.ndarray:
+    """Design tensor (categories, θ×ζ nodes, params) for w = (α[, γ], c_1..c_{K-1})."""
+    theta = np.repeat(NODES, QUADRATURE_POINTS)
+    zeta = np.tile(NODES, QUADRATURE_POINTS)
+    first_c = 2 if specific else 1
+    x = np.zeros((n_categories, N_NODES, first_c + n_categories - 1))
+    for k in range(1, n_categories):
+        x[k, :, 0] = k * theta
+        if specific:
+            x[k, :, 1] = k * zeta
+        x[k, :, first_c + k - 1] = -1.0
+    return x
+
+
+def prior_mean(n_parameters: int) -> np.ndarray:
+    mean = np.zeros(n_parameters)
+    mean[0] = 1.0
+    return mean
+
+
+def log_probs(n_categories: int, specific: bool, w: np.ndarray) -> np.ndarray:
+    logits = design(n_categories, specific) @ w
+    logits -= logits.max(axis=0)
+    return logits - np.log(np.exp(logits).sum(axis=0))
+
+
+def start_w(n_categories: int, specific: bool) -> np.ndarray:
+    d_steps = np.linspace(0.5, -0.5, n_categories - 1) if n_categories > 2 else [0.0]
+    w = gpcm_to_w(1.0, 0.0, d_steps)
+    return np.insert(w, 1, START_GAMMA) if specific else w
+
+
+def split_w(w: np.ndarray, specific: bool) -> tuple[np.ndarray, float]:
+    """(GPCM w without γ, γ)."""
+    if specific:
+        return np.delete(w, 1), float(w[1])
+    return w, 0.0
+
+
+def _logsumexp(values: np.ndarray, axis: int) -> np.ndarray:
+    top = values.max(axis=axis, keepdims=True)
+    return (np.log(np.exp(values - top).sum(axis=axis, keepdims=True)) + top).squeeze(axis)
+
+
+# ═══════════════════════════════════════════════════════════════
+# RESPONSE DATA AND TESTLET BLOCKS
+# ═══════════════════════════════════════════════════════════════
+
+class TwoTierData:
+    """Scored responses grouped into testlets."""
+
+    def __init__(self):
+        self.items = {}  # item_id -> {"testlet", "max_score", "tier"}
+        self.students = {}
+        self.responses = []  # (student index, item_id, score)
+
+    def add(self, student_id: str, item_id: str, score: int, testlet: str, tier: str | None = None):
+        spec = self.items.setdefault(item_id, {"testlet": testlet, "max_score": 1, "tier": tier})
+        spec["max_score"] = max(spec["max_score"], int(score))
+        student = self.students.setdefault(student_id, len(self.students))
+        self.responses.append((student, item_id, int(score)))
+
+    def add_session(self, record: dict):
+        cascade = record.get("cascade", {})
+        student, concept = record.get("student_id"), record.get("concept_id")
+        if cascade.get("T1_item_id") and cascade.get("T1T2_joint_score") is not None:
+            self.add(student, cascade["T1_item_id"], cascade["T1T2_joint_score"], concept, "T1")
+        for tier in ("T3", "T4"):
+            if cascade.get(f"{tier}_item_id") and cascade.get(f"{tier}_maps_to"):
+                self.add(student, cascade[f"{tier}_item_id"], int(cascade[f"{tier}_maps_to"] == MASTERY),
+                         concept, tier)
+
+
+def load_response_file(data: TwoTierData, path: Path):
+    for r in iter_jsonl(path):
+        data.add(r["student_id"], r["item_id"], r["score"], r.get("testlet") or r["item_id"], r.get("tier"))
+
+
+def build_blocks(data: TwoTierData, item_ids: list[str]) -> list[dict]:
+    """Group whole testlets into blocks of about BLOCK_RESPONSES responses.
+
+    Each block holds a (student, testlet) segment × table row indicator matrix,
+    so a segment's log-likelihood is one row of indicator @ log_table and the
+    expected counts are indicator.T @ posterior weights.
+    """
+    item_index = {item_id: i for i, item_id in enumerate(item_ids)}
+    testlets = sorted({data.items[i]["testlet"] for i in item_ids})
+    testlet_index = {t: s for s, t in enumerate(testlets)}
+    n = len(data.responses)
+    students = np.fromiter((r[0] for r in data.responses), dtype=np.int64, count=n)
+    items = np.fromiter((item_index[r[1]] for r in data.responses), dtype=np.int64, count=n)
+    scores = np.fromiter((r[2] for r in data.responses), dtype=np.int64, count=n)
+    item_testlet = np.array([testlet_index[data.items[i]["testlet"]] for i in item_ids])
+    testlet_sizes = np.bincount(item_testlet, minlength=len(testlets))
+    response_testlet = item_testlet[items]
+
+    per_testlet = np.bincount(response_testlet, minlength=len(testlets))
+    blocks, current, size = [], [], 0
+    for s in range(len(testlets)):
+        current.append(s)
+        size += per_testlet[s]
+        if size >= BLOCK_RESPONSES or s == len(testlets) - 1:
+            blocks.append(current)
+            current, size = [], 0
+
+    out = []
+    for block_testlets in blocks:
+        block_items = np.flatnonzero(np.isin(item_testlet, block_testlets))
+        sizes = np.array([data.items[item_ids[i]]["max_score"] + 1 for i in block_items])
+        item_offset = np.zeros(len(item_ids), dtype=np.int64)
+        item_offset[block_items] = np.concatenate([[0], np.cumsum(sizes)[:-1]])
+        selected = np.flatnonzero(np.isin(response_testlet, block_testlets))
+        seg_key = response_testlet[selected] * len(data.students) + students[selected]
+        segments, response_seg = np.unique(seg_key, return_inverse=True)
+        indicator = np.zeros((len(segments), int(sizes.sum())))
+        np.add.at(indicator, (response_seg, item_offset[items[selected]] + scores[selected]), 1.0)
+        out.append({
+            "items": block_items,
+            "sizes": sizes,
+            "specific": list(testlet_sizes[item_testlet[block_items]] > 1),
+            "item_testlet": item_testlet[block_items],
+            "indicator": indicator,
+            "seg_student": segments % len(data.students),
+        })
+    return out
+
+
+# ═══════════════════════════════════════════════════════════════
+# WORKERS (one testlet block per task)
+# ═══════════════════════════════════════════════════════════════
+
+_BLOCKS = []
+
+
+def _init_worker(blocks: list[dict]):
+    global _BLOCKS
+    _BLOCKS = blocks
+
+
+def _testlet_likelihood(block: dict, log_table: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+    """L(θ_q, ζ_r) per segment, shape (segments, Q, Q), and ∫ L φ(ζ) dζ, shape (segments, Q).
+
+    Testlets hold a handful of items, so exp() of the summed log-likelihood
+    stays well inside float range.
+    """
+    likelihood = np.exp(block["indicator"] @ log_table).reshape(-1, QUADRATURE_POINTS, QUADRATURE_POINTS)
+    return likelihood, likelihood @ WEIGHTS
+
+
+def block_marginals(task: tuple) -> np.ndarray:
+    """Pass 1: per (student, testlet) log ∫ L dζ at each θ node."""
+    b, log_table = task
+    return np.log(_testlet_likelihood(_BLOCKS[b], log_table)[1])
+
+
+def block_update(task: tuple) -> tuple[list[np.ndarray], np.ndarray]:
+    """Pass 2: expected counts from the θ posteriors, then the M-step for the block's items."""
+    b, log_table, weights, log_posterior = task
+    block = _BLOCKS[b]
+    likelihood, marginal = _testlet_likelihood(block, log_table)
+    # P(θ_q, ζ_r | student) within the testlet: posterior(θ_q) × L(θ_q, ζ_r) φ_r / ∫ L φ dζ
+    scale = np.exp(log_posterior) / marginal
+    joint = (likelihood * WEIGHTS * scale[:, :, None]).reshape(len(marginal), N_NODES)
+    counts = block["indicator"].T @ joint
+
+    new_weights = []
+    start = 0
+    for size, specific, w in zip(block["sizes"], block["specific"], weights):
+        x = design(size, specific)
+        new_weights.append(newton_fit(x, counts[start:start + size].reshape(size, N_NODES), w,
+                                      prior_mean(len(w)), MIN_GPCM_SLOPE))
+        start += size
+
+    # ζ is only defined up to sign; keep each testlet's orientation from the last iteration
+    agreement = defaultdict(float)
+    for specific, testlet, old, new in zip(block["specific"], block["item_testlet"], weights, new_weights):
+        if specific:
+            agreement[testlet] += old[1] * new[1]
+    for specific, testlet, w in zip(block["specific"], block["item_testlet"], new_weights):
+        if specific and agreement[testlet] < 0:
+            w[1] = -w[1]
+    log_table = np.vstack([log_probs(size, specific, w)
+                           for size, specific, w in zip(block["sizes"], block["specific"], new_weights)])
+    return new_weights, log_table
+
+
+# ═══════════════════════════════════════════════════════════════
+# EM DRIVER
+# ═══════════════════════════════════════════════════════════════
+
+class TwoTierCalibrator:
+    """MML-EM for the two-tier model with per-testlet (θ, ζ) integration."""
+
+    def __init__(self, data: TwoTierData, workers: int | None = None):
+        self.data = data
+        self.item_ids = sorted(data.items, key=lambda i: (data.items[i]["testlet"], i))
+        self.blocks = build_blocks(data, self.item_ids)
+        self.workers = workers
+        self.w = {}
+        self.tables = []
+        for block in self.blocks:
+            for i, size, specific in zip(block["items"], block["sizes"], block["specific"]):
+                self.w[i] = start_w(size, specific)
+            self.tables.append(np.vstack([log_probs(size, specific, self.w[i])
+                                          for i, size, specific in zip(block["items"], block["sizes"],
+                                                                       block["specific"])]))
+        counts = defaultdict(int)
+        for _, item_id, _ in data.responses:
+            counts[item_id] += 1
+        self.n_responses = np.array([counts[i] for i in self.item_ids])
+        self.log_posterior = None
+        self.log_likelihood = None
+        self.iterations = 0
+
+    def _posterior(self, marginals: list[np.ndarray]) -> np.ndarray:
+        total = np.zeros((len(self.data.students), QUADRATURE_POINTS))
+        for block, marginal in zip(self.blocks, marginals):
+            for q in range(QUADRATURE_POINTS):
+                total[:, q] += np.bincount(block["seg_student"], weights=marginal[:, q],
+                                           minlength=len(self.data.students))
+        total += LOG_WEIGHTS
+        normaliser = _logsumexp(total, axis=1)
+        self.log_likelihood = float(normaliser.sum())
+        return total - normaliser[:, None]
+
+    def run(self, max_iter: int = DEFAULT_MAX_ITER, tolerance: float = DEFAULT_TOLERANCE,
+            verbose: bool = True) -> bool:
+        indices = range(len(self.blocks))
+        moved = float("inf")
+        previous = -float("inf")
+        with ProcessPoolExecutor(max_workers=self.workers, initializer=_init_worker,
+                                 initargs=(self.blocks,)) as pool:
+            for iteration in range(1, max_iter + 1):
+                marginals = list(pool.map(block_marginals, zip(indices, self.tables)))
+                self.log_posterior = self._posterior(marginals)
+                tasks = [(b, self.tables[b], [self.w[i] for i in block["items"]],
+                          self.log_posterior[block["seg_student"]])
+                         for b, block in enumerate(self.blocks)]
+                moved = 0.0
+                for b, (weights, table) in enumerate(pool.map(block_update, tasks)):
+                    for i, w in zip(self.blocks[b]["items"], weights):
+                        moved = max(moved, float(np.abs(w - self.w[i]).max()))
+                        self.w[i] = w
+                    self.tables[b] = table
+                self.iterations = iteration
+                if verbose and (iteration == 1 or iteration % 10 == 0):
+                    print(f"  EM iteration {iteration}: log-likelihood {self.log_likelihood:.2f}, "
+                          f"max change {moved:.5f}")
+                gain = self.log_likelihood - previous
+                previous = self.log_likelihood
+                if moved < tolerance or 0 <= gain < LOGLIK_TOLERANCE * abs(previous):
+                    break
+            marginals = list(pool.map(block_marginals, zip(indices, self.tables)))
+            self.log_posterior = self._posterior(marginals)
+        return moved < tolerance or 0 <= gain < LOGLIK_TOLERANCE * abs(previous)
+
+    def item_params(self) -> dict[str, dict]:
+        """alpha, beta, d_steps, gamma and testlet_variance per item."""
+        gammas = defaultdict(list)
+        gamma_sum = defaultdict(float)
+        for block in self.blocks:
+            for i, testlet, specific in zip(block["items"], block["item_testlet"], block["specific"]):
+                gamma_sum[testlet] += split_w(self.w[i], specific)[1]
+        params = {}
+        for block in self.blocks:
+            for i, testlet_index, specific in zip(block["items"], block["item_testlet"], block["specific"]):
+                gpcm_w, gamma = split_w(self.w[i], specific)
+                if gamma_sum[testlet_index] < 0:
+                    gamma = -gamma  # report each testlet with Σ γ >= 0
+                values = gpcm_from_w(gpcm_w)
+                item_id = self.item_ids[i]
+                testlet = self.data.items[item_id]["testlet"]
+                params[item_id] = {
+                    "testlet_cluster": testlet,
+                    "alpha": round(float(values[0]), 4),
+                    "beta": round(float(values[1]), 4),
+                    "d_steps": [round(float(v), 4) for v in values[2:]],
+                    "gamma": round(gamma, 4),
+                    "n_responses": int(self.n_responses[i]),
+                }
+                gammas[testlet].append(gamma)
+        for p in params.values():
+            p["testlet_variance"] = round(float(np.mean(np.square(gammas[p["testlet_cluster"]]))), 4)
+            # §8.2 two_tier_params names
+            p["primary_loading_alpha"] = p["alpha"]
+            p["specific_loading_gamma"] = p["gamma"]
+        return params
+
+    def student_thetas(self) -> list[dict]:
+        posterior = np.exp(self.log_posterior)
+        theta = posterior @ NODES
+        se = np.sqrt(posterior @ NODES ** 2 - theta ** 2)
+        return [{"student_id": s, "theta": round(float(theta[n]), 4), "theta_se": round(float(se[n]), 4)}
+                for s, n in self.data.students.items()]
+
+
+# ═══════════════════════════════════════════════════════════════
+# SIMULATION
+# ═══════════════════════════════════════════════════════════════
+
+def simulate_data(n_testlets: int, n_students: int, testlets_per_student: int, seed: int = 0):
+    """Synthetic concept testlets: one 0-3 item and two 0/1 items sharing ζ_s."""
+    rng = np.random.default_rng(seed)
+    truth = {}
+    for s in range(n_testlets):
+        gamma = rng.uniform(0.3, 1.2)
+        for j, n_categories in enumerate((4, 2, 2)):
+            d_steps = np.sort(rng.normal(0, 0.5, n_categories - 1))[::-1] if n_categories > 2 else np.zeros(1)
+            d_steps = d_steps - d_steps.mean()
+            truth[f"SIM-{s:05d}-{j}"] = (f"C{s:05d}", rng.uniform(0.7, 1.8), rng.normal(0, 0.8), d_steps,
+                                        gamma * rng.uniform(0.7, 1.3))
+    item_ids = list(truth)
+
+    data = TwoTierData()
+    theta = rng.normal(size=n_students)
+    stride = max(n_testlets // testlets_per_student, 1)
+    first = rng.integers(n_testlets, size=n_students)
+    for n in range(n_students):
+        for t in (first[n] + stride * np.arange(testlets_per_student)) % n_testlets:
+            zeta = rng.normal()
+            for j in range(3):
+                item_id = item_ids[3 * t + j]
+                testlet, alpha, beta, d_steps, gamma = truth[item_id]
+                steps = alpha * (theta[n] - beta + d_steps) + gamma * zeta
+                logits = np.concatenate([[0.0], np.cumsum(steps)])
+                p = np.exp(logits - logits.max())
+                data.add(f"S{n}", item_id, rng.choice(len(p), p=p / p.sum()), testlet)
+    return data, truth, theta
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Two-tier IFA calibration (V8 §6.2)")
+    add_cohort_arguments(parser, responses_help="Additional {student_id, item_id, score, testlet} JSONL",
+                         simulate_help="Fit a synthetic cohort and report parameter recovery",
+                         dry_run_help="Fit but don't update records", items_per_student=4, unit="testlets")
+    parser.add_argument("--workers", type=int, help="Worker processes (default: CPU count)")
+    parser.add_argument("--max-iter", type=int, default=DEFAULT_MAX_ITER)
+    parser.add_argument("--tolerance", type=float, default=DEFAULT_TOLERANCE)
+    parser.add_argument("--thetas", type=str, help="Write primary θ EAP/SE per student to this JSONL")
+    args = parser.parse_args()
+
+    started = time.perf_counter()
+    truth = None
+    data = TwoTierData()
+    if args.simulate:
+        data, truth, true_theta = simulate_data(*args.simulate, args.testlets_per_student)
+    else:
+        load_sessions(data, args.sessions)
+        if args.responses:
+            load_response_file(data, Path(args.responses))
+    if not data.responses:
+        print("No responses found.")
+        return
+
+    calibrator = TwoTierCalibrator(data, args.workers)
+    n_testlets = len({spec["testlet"] for spec in data.items.values()})
+    print(f"Loaded {len(data.responses)} response(s) from {len(data.students)} student(s) on "
+          f"{len(data.items)} item(s) in {n_testlets} testlet(s), {len(calibrator.blocks)} block(s), "
+          f"{time.perf_counter() - started:.1f}s")
+    converged = calibrator.run(args.max_iter, args.tolerance)
+    params = calibrator.item_params()
+    print(f"EM {'converged' if converged else 'stopped without converging'} after "
+          f"{calibrator.iterations} iteration(s) in {time.perf_counter() - started:.1f}s")
+
+    if truth:
+        errors = defaultdict(list)
+        for item_id, p in params.items():
+            _testlet, alpha, beta, _d, gamma = truth[item_id]
+            errors["alpha"].append(p["alpha"] - alpha)
+            errors["beta"].append(p["beta"] - beta)
+            errors["gamma"].append(p["gamma"] - gamma)
+        for name, values in errors.items():
+            values = np.asarray(values)
+            print(f"  {name}: bias {values.mean():+.3f}, RMSE {np.sqrt((values ** 2).mean()):.3f}")
+        estimated = np.array([t["theta"] for t in calibrator.student_thetas()])
+        print(f"  theta: correlation with truth {np.corrcoef(estimated, true_theta)[0, 1]:.3f}")
+    elif not args.dry_run:
+        records = load_records()
+        now = datetime.now(timezone.utc).isoformat()
+        updated = missing = 0
+        for item_id, p in params.items():
+            if p["n_responses"] < MIN_RESPONSES:
+                continue
+            if item_id not in records:
+                missing += 1
+                continue
+            record = records[item_id]
+            record["two_tier_params"] = {**p, "calibrated_at": now}
+            write_record(ITEM_PARAMS_DIR, record)
+            updated += 1
+        print(f"Updated two_tier_params in {updated} record(s) in {ITEM_PARAMS_DIR}")
+        if missing:
+            print(f"  {missing} item(s) have no §8.2 record yet (run calibrate_items.py first)")
+
+    if args.thetas:
+        thetas_path = Path(args.thetas)
+        write_jsonl(thetas_path, calibrator.student_thetas())
+        print(f"Primary θ estimates written to {thetas_path}")
+
+
+if __name__ == "__main__":
+    main()
@@ -3,30 +3,42 @@
 
 import json
 import sys
+from functools import lru_cache
 from pathlib import Path
-from jsonschema import validate, ValidationError
+from jsonschema.validators import validator_for
+
+from validate_eqjs import schema_errors
 
 SCHEMA_PATH = Path(__file__).parent.parent / "config" / "ainative-schema-v8.json"
 
 
+@lru_cache(maxsize=None)
+def get_validator():
+    """Compile the AI-native V8 schema once per process."""
+    with open(SCHEMA_PATH) as f:
+        schema = json.load(f)
+    cls = validator_for(schema)
+    cls.check_schema(schema)
+    return cls(schema)
+
+
 def validate_ainative(filepath: str) -> dict:
     """Validate an AI-native file. Returns {valid, errors, warnings}."""
-    errors = []
-    warnings = []
-
     try:
         with open(filepath) as f:
             data = json.load(f)
     except (json.JSONDecodeError, FileNotFoundError) as e:
         return {"valid": False, "errors": [str(e)], "warnings": []}
+    return validate_ainative_data(data)
+
+
+def validate_ainative_data(data: dict) -> dict:
+    """Validate an in-memory AI-native item. Returns {valid, errors, warnings}."""
+    errors = []
+    warnings = []
 
     # Schema validation
-    try:
-        with open(SCHEMA_PATH) as f:
-            schema = json.load(f)
-        validate(instance=data, schema=schema)
-    except ValidationError as e:
-        errors.append(f"Schema: {e.message}")
+    errors.extend(schema_errors(get_validator(), data))
 
     # Q-matrix minimum
     q_matrix = data.get("stage1_output", {}).get("q_matrix", {})
@@ -0,0 +1,95 @@
+#!/usr/bin/env python3
+"""
+Validate the whole eqjs/ and ai-native/ trees in one pass.
+
+Usage: python scripts/validate_all.py [--workers N] [--output REPORT.json] [--only eqjs|ainative]
+
+Files are validated across a process pool. Each worker compiles each schema
+once (see get_validator in validate_eqjs / validate_ainative) and reports every
+error, not just the first. The result is a single JSON report:
+{generated_at, summary: {eqjs: {...}, ainative: {...}}, files: {path: result}}.
+"""
+
+import argparse
+import json
+import sys
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime, timezone
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent))
+from validate_ainative import validate_ainative
+from validate_eqjs import validate_eqjs
+
+ROOT = Path(__file__).parent.parent
+EQJS_DIR = ROOT / "eqjs"
+AINATIVE_DIR = ROOT / "ai-native"
+
+VALIDATORS = {"eqjs": validate_eqjs, "ainative": validate_ainative}
+
+
+def collect_files(only: str | None = None) -> list[tuple[str, str]]:
+    """List (kind, path) pairs for every EQJS and AI-native file in the trees."""
+    files = []
+    if only in (None, "eqjs"):
+        files += [("eqjs", str(f)) for f in sorted(EQJS_DIR.glob("*/Q*.json"))]
+    if only in (None, "ainative"):
+        files += [("ainative", str(f)) for f in sorted(AINATIVE_DIR.glob("*/*_ainative.json"))]
+    return files
+
+
+def _validate_file(task: tuple[str, str]) -> dict:
+    kind, path = task
+    return VALIDATORS[kind](path)
+
+
+def validate_all(files: list[tuple[str, str]], workers: int | None = None) -> dict:
+    """Validate files across a process pool and assemble the report."""
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        results = list(pool.map(_validate_file, files, chunksize=16))
+
+    summary = {kind: {"files": 0, "valid": 0, "invalid": 0, "with_warnings": 0} for kind in VALIDATORS}
+    report_files = {}
+    for (kind, path), result in zip(files, results):
+        counts = summary[kind]
+        counts["files"] += 1
+        counts["valid" if result["valid"] else "invalid"] += 1
+        if result["warnings"]:
+            counts["with_warnings"] += 1
+        rel = str(Path(path).resolve().relative_to(ROOT)) if Path(path).resolve().is_relative_to(ROOT) else path
+        report_files[rel] = {"kind": kind, **result}
+
+    return {
+        "generated_at": datetime.now(timezone.utc).isoformat(),
+        "summary": summary,
+        "files": report_files,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Validate all EQJS and AI-native files")
+    parser.add_argument("--workers", type=int, help="Worker processes (default: CPU count)")
+    parser.add_argument("--output", type=str, help="Write the JSON report here instead of stdout")
+    parser.add_argument("--only", choices=list(VALIDATORS), help="Validate only one tree")
+    args = parser.parse_args()
+
+    files = collect_files(args.only)
+    report = validate_all(files, args.workers)
+
+    if args.output:
+        output_path = Path(args.output)
+        output_path.parent.mkdir(parents=True, exist_ok=True)
+        with open(output_path, "w") as f:
+            json.dump(report, f, indent=2)
+        for kind, counts in report["summary"].items():
+            print(f"{kind}: {counts['valid']}/{counts['files']} valid, {counts['invalid']} invalid")
+        print(f"Report written to {output_path}")
+    else:
+        print(json.dumps(report, indent=2))
+
+    invalid = sum(counts["invalid"] for counts in report["summary"].values())
+    sys.exit(0 if invalid == 0 else 1)
+
+
+if __name__ == "__main__":
+    main()
@@ -3,8 +3,9 @@
 
 import json
 import sys
+from functools import lru_cache
 from pathlib import Path
-from jsonschema import validate, ValidationError
+from jsonschema.validators import validator_for
 
 SCHEMA_PATH = Path(__file__).parent.parent / "config" / "eqjs-schema-2.0.json"
 REGISTRY_PATH = Path(__file__).parent.parent / "protocols" / "protocol-registry.json"
@@ -20,23 +21,47 @@ def load_registry():
         return json.load(f)
 
 
-def validate_eqjs(filepath: str) -> dict:
-    """Validate an EQJS file. Returns {valid, errors, warnings}."""
+@lru_cache(maxsize=None)
+def get_validator():
+    """Compile the EQJS schema once per process."""
+    schema = load_schema()
+    cls = validator_for(schema)
+    cls.check_schema(schema)
+    return cls(schema)
+
+
+@lru_cache(maxsize=None)
+def get_valid_protocols() -> frozenset:
+    """Protocol IDs from the registry, loaded once per process."""
+    return frozenset(p["id"] for p in load_registry().get("protocols", []))
+
+
+def schema_errors(validator, data: dict) -> list[str]:
+    """All schema violations (not just the first), in document order."""
     errors = []
-    warnings = []
+    for e in sorted(validator.iter_errors(data), key=lambda e: list(map(str, e.absolute_path))):
+        location = "/".join(str(p) for p in e.absolute_path)
+        errors.append(f"Schema: {e.message}" + (f" (at {location})" if location else ""))
+    return errors
+
 
+def validate_eqjs(filepath: str) -> dict:
+    """Validate an EQJS file. Returns {valid, errors, warnings}."""
     try:
         with open(filepath) as f:
             data = json.load(f)
     except (json.JSONDecodeError, FileNotFoundError) as e:
         return {"valid": False, "errors": [str(e)], "warnings": []}
+    return validate_eqjs_data(data)
+
+
+def validate_eqjs_data(data: dict) -> dict:
+    """Validate an in-memory EQJS item. Returns {valid, errors, warnings}."""
+    errors = []
+    warnings = []
 
     # Schema validation
-    try:
-        schema = load_schema()
-        validate(instance=data, schema=schema)
-    except ValidationError as e:
-        errors.append(f"Schema: {e.message}")
+    errors.extend(schema_errors(get_validator(), data))
 
     # MCQ-INV-001: exactly 4 options
     options = data.get("content", {}).get("options", {})
@@ -52,8 +77,7 @@ def validate_eqjs(filepath: str) -> dict:
     stimulus = data.get("content", {}).get("stimulus", {})
     diagrams = stimulus.get("diagrams", [])
     if diagrams:
-        registry = load_registry()
-        valid_protocols = {p["id"] for p in registry.get("protocols", [])}
+        valid_protocols = get_valid_protocols()
         for diag in diagrams:
             proto = diag.get("protocol", "")
             if proto and proto not in valid_protocols: